@@ -0,0 +1,29 @@
+"""
+App Pages Package
+One module per Streamlit page, each exposing render(); app.py imports a page
+module only when it is first shown, so heavy dependencies (Gemini, RAG,
+image analysis) load on demand
+"""
+import importlib
+
+# Sidebar label -> module in this package (sidebar order)
+PAGES = {
+    "Character Studio": "character_studio",
+    "Story Lab": "story_lab",
+    "Comic Factory": "comic_factory",
+    "Ask the Universe": "ask_universe",
+    "Story Archive": "story_archive",
+    "Image Magic": "image_magic",
+}
+
+def load(page: str):
+    """
+    Import a page module (cached in sys.modules after the first visit).
+
+    Args:
+        page: Sidebar label from PAGES
+
+    Returns:
+        The page module
+    """
+    return importlib.import_module(f"{__name__}.{PAGES[page]}")
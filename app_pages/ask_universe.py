@@ -0,0 +1,60 @@
+"""
+Ask the Universe Page Module
+RAG question answering over characters and stories
+"""
+import os
+import streamlit as st
+import qa_engine
+import thumbnails
+
+def render():
+    """Draw the page"""
+    st.title("Ask the Universe")
+    st.markdown("Ask questions about your characters and world!")
+    
+    # Chat history
+    if "messages" not in st.session_state:
+        st.session_state.messages = []
+
+    # Display chat messages
+    for message in st.session_state.messages:
+        with st.chat_message(message["role"]):
+            st.markdown(message["content"])
+            if "images" in message and message["images"]:
+                cols = st.columns(3)
+                for i, img_path in enumerate(message["images"]):
+                    with cols[i % 3]:
+                        if os.path.exists(img_path):
+                            st.image(thumbnails.get_thumbnail(img_path), width=200)
+
+    # Chat input
+    if prompt := st.chat_input("Who is Kabir?"):
+        # Add user message to chat history
+        st.session_state.messages.append({"role": "user", "content": prompt})
+        with st.chat_message("user"):
+            st.markdown(prompt)
+
+        # Generate answer
+        with st.chat_message("assistant"):
+            with st.spinner("Consulting the archives..."):
+                response = qa_engine.answer_question(prompt)
+                
+                answer_text = response.get("answer", "I don't know.")
+                images = response.get("images", [])
+                
+                st.markdown(answer_text)
+                
+                if images:
+                    st.markdown("**Related Visuals:**")
+                    cols = st.columns(3)
+                    for i, img_path in enumerate(images):
+                        with cols[i % 3]:
+                            if os.path.exists(img_path):
+                                st.image(thumbnails.get_thumbnail(img_path), width=200, caption=os.path.basename(img_path))
+                
+                # Add assistant response to chat history
+                st.session_state.messages.append({
+                    "role": "assistant", 
+                    "content": answer_text,
+                    "images": images
+                })
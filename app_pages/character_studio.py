@@ -0,0 +1,153 @@
+"""
+Character Studio Page Module
+Browse existing characters and add new ones
+"""
+import os
+import streamlit as st
+import character_manager
+import thumbnails
+import catalog_cache
+
+def _show_notices():
+    """Show messages queued before the last st.rerun(), which would otherwise wipe them"""
+    notices, st.session_state.character_notices = st.session_state.character_notices, []
+    for kind, value, caption in notices:
+        if kind == "success":
+            st.success(value)
+            st.balloons()
+        elif kind == "image" and os.path.exists(value):
+            st.image(thumbnails.get_thumbnail(value), caption=caption, width=300)
+        elif kind == "info":
+            st.info(value)
+
+def render():
+    """Draw the page"""
+    st.title("Character Studio")
+    st.markdown("Add new characters to your comic universe")
+    _show_notices()
+    
+    # Display existing characters
+    with st.expander("Existing Characters", expanded=False):
+        characters = catalog_cache.characters()
+        if characters:
+            cols = st.columns(4)
+            for i, char in enumerate(characters):
+                with cols[i % 4]:
+                    st.markdown(f"**{char.get('name', 'Unknown')}**")
+                    st.caption(char.get('role', ''))
+                    
+                    # Show first image if available
+                    img_paths = char.get('image_paths', [])
+                    if img_paths and os.path.exists(img_paths[0]):
+                        st.image(thumbnails.get_thumbnail(img_paths[0]), use_container_width=True)
+                    elif char.get('portrait_status') == character_manager.PORTRAIT_PENDING:
+                        st.caption("Portrait is being generated...")
+                    elif char.get('portrait_status') == character_manager.PORTRAIT_FAILED:
+                        st.caption(char.get('portrait_error', 'Portrait generation failed'))
+                        if st.button("Retry portrait", key=f"retry_portrait_{char.get('id')}"):
+                            character_manager.retry_portrait(char['id'])
+                            st.rerun()
+                    
+                    tags = char.get('tags', [])
+                    if tags:
+                        st.caption(f"Tags: {', '.join(tags)}")
+        else:
+            st.info("No characters yet. Add your first character below!")
+    
+    st.markdown("---")
+    
+    # Add new character
+    st.subheader("Add New Character")
+    
+    add_method = st.radio(
+        "How would you like to add the character?",
+        ["Upload Images", "Generate from Description"],
+        horizontal=True
+    )
+    
+    with st.form("add_character_form"):
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            char_name = st.text_input("Character Name*", placeholder="e.g., Priya Sharma")
+            char_role = st.text_input("Role/Archetype*", placeholder="e.g., The Class Topper")
+            char_age = st.text_input("Age (optional)", placeholder="e.g., 16")
+        
+        with col2:
+            char_visual = st.text_area(
+                "Visual Description*",
+                placeholder="e.g., Long black hair in ponytail, round glasses, school uniform with badge, energetic expression",
+                height=100
+            )
+            char_personality = st.text_area(
+                "Personality (optional)",
+                placeholder="e.g., Competitive, helpful, loves science",
+                height=100
+            )
+        
+        char_tags = st.text_input(
+            "Tags (comma-separated)",
+            placeholder="e.g., student, school, female, teenager"
+        )
+        
+        # Image upload (only shown if method is "Upload Images")
+        uploaded_files = None
+        if add_method == "Upload Images":
+            uploaded_files = st.file_uploader(
+                "Upload Reference Images",
+                type=["png", "jpg", "jpeg"],
+                accept_multiple_files=True,
+                help="Upload 1-3 reference images of the character"
+            )
+        
+        submitted = st.form_submit_button("Create Character", use_container_width=True)
+        
+        if submitted:
+            if not char_name or not char_role or not char_visual:
+                st.error("Please fill in all required fields (marked with *)")
+            elif add_method == "Upload Images" and not uploaded_files:
+                st.error("Please upload at least one image")
+            else:
+                try:
+                    tags_list = [t.strip() for t in char_tags.split(",")] if char_tags else ["student", "school"]
+                    
+                    with st.spinner(f"Creating {char_name}..."):
+                        if add_method == "Upload Images":
+                            char_data = character_manager.add_character_from_images(
+                                name=char_name,
+                                role=char_role,
+                                description=char_visual,
+                                image_files=uploaded_files,
+                                age=char_age,
+                                personality=char_personality,
+                                tags=tags_list
+                            )
+                        else:
+                            char_data = character_manager.add_character_from_description(
+                                name=char_name,
+                                role=char_role,
+                                description=char_visual,
+                                age=char_age,
+                                personality=char_personality,
+                                tags=tags_list
+                            )
+                    
+                    # Queued for after the rerun below (anything drawn now is wiped)
+                    notices = [("success", f"Successfully created {char_name}!", None)]
+                    if uploaded_files and len(char_data['image_paths']) < len(uploaded_files):
+                        skipped = len(uploaded_files) - len(char_data['image_paths'])
+                        notices.append(("info", f"Skipped {skipped} duplicate image(s).", None))
+                    
+                    # Show created character
+                    if char_data.get('portrait_status') == character_manager.PORTRAIT_PENDING:
+                        notices.append(("info", "The portrait is being generated in the background and will appear under **Existing Characters**.", None))
+                    elif char_data.get('image_paths'):
+                        notices.append(("image", char_data['image_paths'][0], f"{char_name} - {char_role}"))
+                    
+                    notices.append(("info", "Character added to the RAG database. You can now use them in stories!", None))
+                    st.session_state.character_notices = notices
+                    # Refresh the page to reload the character list
+                    st.rerun()
+                    
+                except Exception as e:
+                    st.error(f"Failed to create character: {e}")
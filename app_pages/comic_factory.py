@@ -0,0 +1,226 @@
+"""
+Comic Factory Page Module
+Render the approved prompts, resume unfinished comics and download exports
+"""
+import os
+import time
+import streamlit as st
+import config
+import comic_renderer
+import comic_jobs
+import job_queue
+import render_worker
+import thumbnails
+import comic_export
+import image_encoder
+import speculative_render
+import catalog_cache
+
+def render():
+    """Draw the page"""
+    st.title("Comic Factory")
+    st.markdown("Generate your 6-panel comic strip")
+    
+    # Unfinished comics (failed panels or an interrupted session)
+    unfinished_jobs = catalog_cache.incomplete_jobs()
+    if unfinished_jobs:
+        with st.expander(f"Unfinished Comics ({len(unfinished_jobs)})", expanded=False):
+            for job, remaining in unfinished_jobs:
+                col1, col2 = st.columns([3, 1])
+                with col1:
+                    st.markdown(f"**{job['id']}** ({job.get('created_at', '')[:16]}) - {remaining} panel(s) left")
+                with col2:
+                    resume_btn = st.button("Resume", key=f"resume_{job['id']}", use_container_width=True)
+                
+                if resume_btn:
+                    st.session_state.current_story = job.get("story")
+                    st.session_state.current_prompts = job.get("prompts")
+                    st.session_state.current_comic_id = job["id"]
+                    st.session_state.generated_images = None
+                    
+                    if config.BACKGROUND_RENDERING:
+                        render_worker.ensure_worker_running()
+                        st.session_state.render_job_id = job_queue.submit(
+                            job_queue.KIND_RENDER, {"comic_id": job["id"]}
+                        )
+                        st.rerun()
+                    
+                    progress_bar = st.progress(0)
+                    
+                    def on_resume_panel(completed, total, panel_num, path):
+                        progress_bar.progress(completed / total)
+                    
+                    try:
+                        job = comic_jobs.resume_job(job["id"], progress_callback=on_resume_panel)
+                        st.session_state.generated_images = comic_jobs.image_paths(job)
+                        st.rerun()
+                    except Exception as e:
+                        st.error(f"Resume failed: {e}")
+    
+    if not st.session_state.current_prompts:
+        st.warning("No approved prompts found. Please complete the **Story Lab** workflow first.")
+        st.info("Go to **Story Lab** → Enter idea → Generate story → Approve → Generate prompts")
+    else:
+        # Show story summary
+        with st.expander("Story Summary", expanded=False):
+            st.write(st.session_state.current_story)
+        
+        st.markdown("---")
+        
+        # Background render in progress: poll the job queue
+        if st.session_state.render_job_id and not st.session_state.generated_images:
+            queue_job = job_queue.get_status(st.session_state.render_job_id)
+            
+            if queue_job and queue_job["status"] in job_queue.ACTIVE_STATUSES:
+                st.subheader("Rendering Comic")
+                st.progress(queue_job["progress"])
+                if queue_job["status"] == "queued":
+                    st.caption("Waiting for a render worker...")
+                else:
+                    st.caption(queue_job.get("message") or "Rendering panels...")
+                
+                if queue_job["cancel_requested"]:
+                    st.info("Cancelling after the panels already in flight...")
+                elif st.button("Cancel Rendering", key="cancel_render"):
+                    job_queue.cancel(st.session_state.render_job_id)
+                
+                time.sleep(config.WORKER_POLL_INTERVAL)
+                st.rerun()
+            else:
+                st.session_state.render_job_id = None
+                comic_job = comic_jobs.load_job(st.session_state.current_comic_id) if st.session_state.current_comic_id else None
+                
+                if queue_job is None or queue_job["status"] == "failed":
+                    error = queue_job.get("error") if queue_job else "job not found"
+                    st.error(f"Comic generation failed: {error}")
+                elif queue_job["status"] == "cancelled":
+                    st.info("Rendering cancelled. Finished panels are kept; resume it from **Unfinished Comics**.")
+                elif comic_job:
+                    image_paths = comic_jobs.image_paths(comic_job)
+                    st.session_state.generated_images = image_paths
+                    if comic_job["status"] == "complete":
+                        st.success("Comic strip generated successfully!")
+                        st.balloons()
+                    else:
+                        failed = comic_jobs.failed_count(comic_job)
+                        st.warning(f"{failed} panel(s) failed. Use **Unfinished Comics** above to retry only those panels.")
+        
+        # Generate button
+        if not st.session_state.generated_images and not st.session_state.render_job_id:
+            st.subheader("Ready to Generate Comic")
+            st.info(f"Will generate {len(st.session_state.current_prompts)} panels using Pollinations AI")
+            if st.session_state.speculative_render:
+                done = speculative_render.progress(st.session_state.speculative_render)
+                st.caption(f"Panels pre-rendered in the background: {done:.0%}")
+            
+            if st.button("Generate Comic Strip", use_container_width=True, type="primary"):
+                if speculative_render.matches(st.session_state.speculative_render, st.session_state.current_prompts):
+                    # Adopt the speculative render; finished panels are not requested again
+                    comic_id, job_id = speculative_render.adopt(st.session_state.speculative_render)
+                    st.session_state.speculative_render = None
+                    st.session_state.current_comic_id = comic_id
+                    st.session_state.render_job_id = job_id
+                    st.rerun()
+                
+                # Persist the job before rendering so it can be resumed
+                job = comic_jobs.create_job(
+                    st.session_state.current_prompts,
+                    story=st.session_state.current_story
+                )
+                st.session_state.current_comic_id = job["id"]
+                
+                if config.BACKGROUND_RENDERING:
+                    # Hand off to the render worker; this page polls the job
+                    render_worker.ensure_worker_running()
+                    st.session_state.render_job_id = job_queue.submit(
+                        job_queue.KIND_RENDER, {"comic_id": job["id"]}
+                    )
+                    st.rerun()
+                
+                progress_bar = st.progress(0)
+                status_text = st.empty()
+                
+                try:
+                    # Generate images (panels render concurrently)
+                    total_panels = len(st.session_state.current_prompts)
+                    status_text.text(f"Generating {total_panels} panels...")
+                    
+                    def on_panel_done(completed, total, panel_num, path):
+                        progress_bar.progress(completed / total)
+                        outcome = "placeholder" if comic_renderer.is_placeholder(path) else ("done" if path else "failed")
+                        status_text.text(f"Panel {panel_num} {outcome} ({completed}/{total})")
+                    
+                    job = comic_jobs.run_job(job["id"], progress_callback=on_panel_done)
+                    image_paths = comic_jobs.image_paths(job)
+                    
+                    progress_bar.progress(1.0)
+                    st.session_state.generated_images = image_paths
+                    
+                    if job["status"] == "complete":
+                        status_text.text("All panels generated!")
+                        st.success("Comic strip generated successfully!")
+                        st.balloons()
+                    else:
+                        failed = comic_jobs.failed_count(job)
+                        status_text.text(f"{failed} panel(s) failed.")
+                        st.warning(f"{failed} panel(s) failed. Use **Unfinished Comics** above to retry only those panels.")
+                    
+                except Exception as e:
+                    st.error(f"Comic generation failed: {e}")
+        
+        # Display generated comic
+        if st.session_state.generated_images:
+            st.markdown("---")
+            st.subheader("Your Comic Strip")
+            
+            # Display in grid (thumbnails unless full resolution is requested)
+            full_res = st.toggle("Show full-resolution panels", key="cf_full_res")
+            cols = st.columns(3)
+            for i, img_path in enumerate(st.session_state.generated_images):
+                with cols[i % 3]:
+                    if os.path.exists(img_path):
+                        shown = img_path if full_res else thumbnails.get_thumbnail(img_path)
+                        st.image(shown, caption=f"Panel {i+1}", use_container_width=True)
+            
+            # Download buttons
+            st.markdown("---")
+            st.subheader("Download")
+            
+            # Exports are built only on request and cached per comic
+            comic_id = st.session_state.current_comic_id
+            exports = [
+                ("page", "Comic Page", None),
+                ("cbz", "CBZ Archive", "application/vnd.comicbook+zip"),
+                ("zip", "ZIP Archive", "application/zip"),
+            ]
+            
+            if not comic_id:
+                st.info("Downloads are available for comics generated in this session.")
+            else:
+                # Export state is cached between reruns, and only the export the user
+                # just asked for is read into a download button
+                export_paths = catalog_cache.exports(comic_id)
+                download_cols = st.columns(len(exports))
+                for col, (kind, label, mime) in zip(download_cols, exports):
+                    with col:
+                        export_path = export_paths.get(kind)
+                        requested = st.session_state.requested_export == (comic_id, kind)
+                        if export_path and requested and os.path.exists(export_path):
+                            with open(export_path, "rb") as f:
+                                st.download_button(
+                                    f"Download {label}",
+                                    f,
+                                    file_name=os.path.basename(export_path),
+                                    mime=mime or image_encoder.mime_for_path(export_path),
+                                    use_container_width=True,
+                                    key=f"dl_{kind}",
+                                    on_click=lambda: st.session_state.update(requested_export=None)
+                                )
+                        elif st.button(f"{'Get' if export_path else 'Prepare'} {label}",
+                                       use_container_width=True, key=f"prep_{kind}"):
+                            # Builds only if the cached state is missing or stale
+                            with st.spinner(f"Preparing {label.lower()}..."):
+                                comic_export.get_export(comic_id, kind, build=True)
+                            catalog_cache.invalidate(f"{catalog_cache.EXPORTS}:{comic_id}")
+                            st.session_state.requested_export = (comic_id, kind)
+                            st.rerun()
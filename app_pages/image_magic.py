@@ -0,0 +1,226 @@
+"""
+Image Magic Page Module
+Text to image, reimagine an upload with characters, and image to story
+"""
+import os
+import streamlit as st
+from PIL import Image
+import comic_renderer
+import image_analyzer
+import image_embeddings
+import image_encoder
+import prompt_builder
+import catalog_cache
+
+def render():
+    """Draw the page"""
+    st.title("Image Magic")
+    st.markdown("Create, Remix, and Reimagine with AI")
+
+    # Tabs for different modes
+    tab1, tab2, tab3 = st.tabs(["Text to Image", "Reimagine Image", "Image to Story"])
+
+    # TAB 1: TEXT TO IMAGE (Existing functionality)
+    with tab1:
+        st.subheader("Generate from Text")
+        
+        col1, col2 = st.columns([1, 1])
+        with col1:
+            # Character Selection
+            characters = catalog_cache.characters()
+            char_names = [c.get('name') for c in characters]
+            selected_chars = st.multiselect("Include Characters", char_names, key="t2i_chars")
+            
+            # Custom Prompt
+            custom_prompt = st.text_area(
+                "Describe the scene",
+                placeholder="e.g., A futuristic classroom with holographic displays...",
+                height=150,
+                key="t2i_prompt"
+            )
+            
+            # Style options
+            style = st.selectbox(
+                "Art Style",
+                ["Comic Book", "Cinematic", "Anime", "Watercolor", "Pixel Art"],
+                key="t2i_style"
+            )
+            
+            new_variation = st.checkbox(
+                "New variation",
+                key="t2i_variation",
+                help="Generate a fresh image instead of reusing the cached result for this prompt"
+            )
+            
+            generate_btn = st.button("Generate Magic", type="primary", use_container_width=True, key="t2i_btn")
+
+        with col2:
+            if generate_btn and custom_prompt:
+                with st.spinner("Weaving magic..."):
+                    try:
+                        # Collect character visuals
+                        char_details = []
+                        if selected_chars:
+                            for char_name in selected_chars:
+                                char_data = next((c for c in characters if c.get('name') == char_name), None)
+                                if char_data:
+                                    desc = prompt_builder.describe_character(char_data)
+                                    if desc:
+                                        char_details.append(f"{char_name}: {desc}")
+                        
+                        # Build full prompt (style and safety suffix appended once)
+                        full_prompt = prompt_builder.build_image_prompt(
+                            custom_prompt,
+                            f"Characters: {'; '.join(char_details)}" if char_details else "",
+                            f"Style: {style}."
+                        )
+                        
+                        # Generate
+                        img_bytes = comic_renderer.generate_image_bytes(
+                            full_prompt, panel_num=999, new_variation=new_variation
+                        )
+                        
+                        if img_bytes:
+                            st.image(img_bytes, caption="Generated Image", use_container_width=True)
+                            
+                            # Offer the original bytes for download (no decode or temp file)
+                            ext = image_encoder.extension_for_bytes(img_bytes)
+                            st.download_button(
+                                "Download Image",
+                                img_bytes,
+                                file_name=f"magic_image{ext}",
+                                mime=image_encoder.mime_for_path(ext),
+                                use_container_width=True,
+                                key="t2i_dl"
+                            )
+                        else:
+                            st.error("Failed to generate image.")
+                            
+                    except Exception as e:
+                        st.error(f"Error: {e}")
+
+    # TAB 2: REIMAGINE IMAGE (New functionality)
+    with tab2:
+        st.subheader("Reimagine with Characters")
+        st.markdown("Upload an image and recreate it using your story characters!")
+        
+        col1, col2 = st.columns([1, 1])
+        with col1:
+            uploaded_file = st.file_uploader("Upload Reference Image", type=["png", "jpg", "jpeg"], key="i2i_upload")
+            
+            # Character Selection
+            characters = catalog_cache.characters()
+            char_names = [c.get('name') for c in characters]
+            
+            # Suggest characters from the upload using the local image index
+            # (CLIP only: the fallback color descriptor cannot recognize characters)
+            if uploaded_file and image_embeddings.get_backend() == image_embeddings.BACKEND_CLIP:
+                names_by_id = {c.get('id'): c.get('name') for c in characters}
+                try:
+                    suggestions = image_embeddings.suggest_characters(Image.open(uploaded_file))
+                except Exception as e:
+                    print(f"[WARN] Character suggestion failed: {e}")
+                    suggestions = []
+                suggested = [(names_by_id[s['char_id']], s['score']) for s in suggestions if s['char_id'] in names_by_id]
+                if suggested:
+                    st.caption("Looks like: " + ", ".join(f"{name} ({score:.0%})" for name, score in suggested))
+                    if st.button("Use suggested characters", key="i2i_suggest"):
+                        st.session_state.i2i_chars = [name for name, _ in suggested]
+            selected_chars_i2i = st.multiselect("Use Characters", char_names, key="i2i_chars")
+            
+            custom_instruction = st.text_area(
+                "Additional Instructions (Optional)",
+                placeholder="e.g., Make it look more dramatic, change the setting to night...",
+                height=100,
+                key="i2i_prompt"
+            )
+            
+            reimagine_btn = st.button("Reimagine", type="primary", use_container_width=True, key="i2i_btn")
+
+        with col2:
+            if uploaded_file:
+                st.image(uploaded_file, caption="Reference Image", width=200)
+            
+            if reimagine_btn and uploaded_file:
+                if not selected_chars_i2i:
+                    st.warning("Please select at least one character to use in the reimagined image.")
+                else:
+                    with st.spinner("Analyzing and Recreating..."):
+                        try:
+                            # Save uploaded file temporarily
+                            import tempfile
+                            with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp_file:
+                                tmp_file.write(uploaded_file.getvalue())
+                                tmp_path = tmp_file.name
+                            
+                            # Call image analyzer
+                            result = image_analyzer.recreate_with_characters(
+                                image_file=tmp_path,
+                                character_names=selected_chars_i2i,
+                                custom_prompt=custom_instruction
+                            )
+                            
+                            if result.get("image_path"):
+                                st.success("Image Reimagined!")
+                                st.image(result["image_path"], caption="Reimagined Image", use_container_width=True)
+                                st.info(result.get("description", ""))
+                                
+                                with open(result["image_path"], "rb") as f:
+                                    st.download_button(
+                                        "Download Reimagined Image",
+                                        f.read(),
+                                        file_name="reimagined_image" + os.path.splitext(result["image_path"])[1],
+                                        mime=image_encoder.mime_for_path(result["image_path"]),
+                                        use_container_width=True,
+                                        key="i2i_dl"
+                                    )
+                            else:
+                                st.error(result.get("description", "Failed to generate image."))
+                                
+                            # Cleanup
+                            os.unlink(tmp_path)
+                            
+                        except Exception as e:
+                            st.error(f"Error: {e}")
+
+    # TAB 3: IMAGE TO STORY (New functionality)
+    with tab3:
+        st.subheader("Inspire Story from Image")
+        st.markdown("Upload an image and let AI write a story based on it!")
+        
+        col1, col2 = st.columns([1, 1])
+        with col1:
+            story_image = st.file_uploader("Upload Image for Story", type=["png", "jpg", "jpeg"], key="i2s_upload")
+            generate_story_btn = st.button("Write Story", type="primary", use_container_width=True, key="i2s_btn")
+
+        with col2:
+            if story_image:
+                st.image(story_image, caption="Story Inspiration", width=200)
+            
+            if generate_story_btn and story_image:
+                with st.spinner("Analyzing image and writing story..."):
+                    try:
+                        # Save uploaded file temporarily
+                        import tempfile
+                        with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp_file:
+                            tmp_file.write(story_image.getvalue())
+                            tmp_path = tmp_file.name
+                        
+                        # Generate story
+                        story_text = image_analyzer.generate_story_from_image(tmp_path)
+                        
+                        st.success("Story Generated!")
+                        st.text_area("Generated Story", value=story_text, height=300)
+                        
+                        # Option to send to Story Lab
+                        if st.button("Send to Story Lab", key="send_to_lab"):
+                            st.session_state.current_story = story_text
+                            st.session_state.current_prompts = None
+                            st.session_state.generated_images = None
+                            st.success("Story sent to Story Lab! Go to 'Story Lab' to create your comic.")
+                        
+                        # Cleanup
+                        os.unlink(tmp_path)
+                        
+                    except Exception as e:
+                        st.error(f"Error: {e}")
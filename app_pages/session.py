@@ -0,0 +1,30 @@
+"""
+Session State Module
+Shared Streamlit session state, initialized once per browser session
+"""
+import streamlit as st
+import config
+
+def _defaults() -> dict:
+    return {
+        "current_story": None,
+        "current_prompts": None,
+        "generated_images": None,
+        "current_comic_id": None,
+        "render_job_id": None,
+        "requested_export": None,   # (comic_id, kind) whose download button is shown
+        "speculative_render": None,
+        "character_notices": [],   # Character Studio messages shown after st.rerun()
+        "story_notices": [],       # Story Archive messages shown after st.rerun()
+        "speculative_enabled": config.SPECULATIVE_RENDERING,
+        "messages": [],   # Ask the Universe chat history
+    }
+
+def init_session_state():
+    """Set every shared key that is not set yet (skipped on later reruns)"""
+    if st.session_state.get("_session_initialized"):
+        return
+    for key, value in _defaults().items():
+        if key not in st.session_state:
+            st.session_state[key] = value
+    st.session_state["_session_initialized"] = True
@@ -0,0 +1,70 @@
+"""
+Story Archive Page Module
+Browse and delete saved stories
+"""
+import streamlit as st
+import story_manager
+import story_indexer
+import catalog_cache
+
+def _show_notices():
+    """Show messages queued before the last st.rerun(), which would otherwise wipe them"""
+    notices, st.session_state.story_notices = st.session_state.story_notices, []
+    for kind, text in notices:
+        if kind == "success":
+            st.success(text)
+        elif kind == "info":
+            st.info(text)
+
+def render():
+    """Draw the page"""
+    st.title("Story Archive")
+    st.markdown("View and manage your comic stories.")
+    _show_notices()
+    
+    stories = catalog_cache.stories()
+    pending_index = catalog_cache.pending_index_ids()
+    failed_index = catalog_cache.failed_index_ids()
+    
+    if not stories:
+        st.info("No stories archived yet. Go to **Story Lab** to create one!")
+    else:
+        if pending_index:
+            st.caption(f"⏳ {len(pending_index)} stor{'y' if len(pending_index) == 1 else 'ies'} waiting to be indexed for search")
+        if failed_index:
+            st.warning(f"{len(failed_index)} stor{'y' if len(failed_index) == 1 else 'ies'} could not be indexed for search")
+            if st.button("Retry indexing"):
+                queued = story_indexer.retry_failed()
+                st.session_state.story_notices = [("info", f"Queued {queued} stor{'y' if queued == 1 else 'ies'} for indexing again.")]
+                st.rerun()
+
+        with st.expander("Delete several stories"):
+            # Options are IDs, so stories sharing a title and date stay separate
+            story_labels = {s.get('id'): f"{s.get('title', 'Untitled')} ({s.get('created_at', '')[:10]})" for s in stories if s.get('id')}
+            selected = st.multiselect(
+                "Stories to delete",
+                list(story_labels),
+                format_func=lambda story_id: story_labels.get(story_id, story_id),
+                key="bulk_delete_stories"
+            )
+            if st.button("Delete Selected", disabled=not selected):
+                removed = story_manager.delete_stories(selected)
+                st.session_state.story_notices = [("success", f"Deleted {removed} stor{'y' if removed == 1 else 'ies'}!")]
+                st.rerun()
+
+        for story in stories:
+            if story.get('id') in failed_index:
+                pending_label = " · ⚠️ not indexed"
+            else:
+                pending_label = " · ⏳ indexing" if story.get('id') in pending_index else ""
+            with st.expander(f"{story.get('title', 'Untitled')} ({story.get('created_at', '')[:10]}){pending_label}"):
+                if story.get('id') in failed_index:
+                    st.caption(f"Indexing failed: {failed_index[story['id']]}")
+                st.write(story.get('content', ''))
+                
+                if st.button("Delete Story", key=f"del_{story.get('id')}"):
+                    if story_manager.delete_story(story.get('id')):
+                        st.session_state.story_notices = [("success", "Story deleted!")]
+                        st.rerun()
+                    else:
+                        st.error("Failed to delete story.")
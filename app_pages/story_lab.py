@@ -0,0 +1,112 @@
+"""
+Story Lab Page Module
+Generate, edit and approve a story, then write its panel prompts
+"""
+import streamlit as st
+import story_generator
+import prompt_generator
+import story_manager
+import speculative_render
+
+def render():
+    """Draw the page"""
+    st.title("Story Lab")
+    st.markdown("Generate and approve stories for your comics")
+    
+    # Step 1: Story Idea Input
+    st.subheader("Step 1: Enter Story Idea")
+    story_idea = st.text_area(
+        "What's your story about?",
+        placeholder="e.g., Kabir woke up late for school and panicked\ne.g., Rohan tries to help Kabir with homework but Kabir falls asleep\ne.g., A cricket match goes hilariously wrong",
+        height=100,
+        help="Enter a short story concept. The AI will expand it into a full story."
+    )
+    
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        generate_btn = st.button("Generate Story", use_container_width=True, type="primary")
+    
+    if generate_btn and story_idea:
+        with st.spinner("Writing your story..."):
+            try:
+                story_text = story_generator.generate_story(story_idea)
+                st.session_state.current_story = story_text
+                st.session_state.current_prompts = None  # Reset prompts
+                st.session_state.generated_images = None  # Reset images
+                st.session_state.current_comic_id = None
+            except Exception as e:
+                st.error(f"Story generation failed: {e}")
+    
+    # Step 2: Review and Edit Story
+    if st.session_state.current_story:
+        st.markdown("---")
+        st.subheader("Step 2: Review & Edit Story")
+        
+        edited_story = st.text_area(
+            "Generated Story (you can edit it)",
+            value=st.session_state.current_story,
+            height=250,
+            help="Feel free to modify the story before generating comic prompts"
+        )
+        
+        col1, col2 = st.columns([1, 3])
+        with col1:
+            approve_btn = st.button("Approve & Generate Prompts", use_container_width=True, type="primary")
+        with col2:
+            st.checkbox(
+                "Pre-render panels while I review",
+                key="speculative_enabled",
+                help="Start rendering panels in the background as soon as prompts are ready. "
+                     "Comic Factory picks up the finished panels; the work is cancelled if the prompts change."
+            )
+        
+        if approve_btn:
+            st.session_state.current_story = edited_story
+            
+            with st.spinner("Creating 6-panel comic prompts..."):
+                try:
+                    # Replace any speculative render of the previous prompts
+                    if st.session_state.speculative_render:
+                        speculative_render.discard(st.session_state.speculative_render)
+                        st.session_state.speculative_render = None
+                    
+                    if st.session_state.speculative_enabled:
+                        # Prompts stream into a background job that renders each panel as soon as it is written
+                        spec = speculative_render.start_from_story(edited_story)
+                        prompts = speculative_render.wait_for_prompts(spec)
+                        st.session_state.speculative_render = spec
+                    else:
+                        prompts = prompt_generator.generate_comic_prompts(edited_story)
+                    st.session_state.current_prompts = prompts
+                    
+                    # Save story using story_manager
+                    story_manager.save_story(edited_story)
+                    st.success("Comic prompts generated and story saved to archive!")
+                except Exception as e:
+                    st.error(f"Prompt generation failed: {e}")
+    
+    # Step 3: Review Prompts
+    if st.session_state.current_prompts:
+        st.markdown("---")
+        st.subheader("Step 3: Review Comic Prompts")
+        st.info("These are the 6 scenes that will be generated. Review them before creating the comic.")
+        
+        for prompt_data in st.session_state.current_prompts:
+            with st.expander(f"Panel {prompt_data.get('panel', '?')} - {prompt_data.get('scene', 'Scene')}", expanded=False):
+                col1, col2 = st.columns(2)
+                
+                with col1:
+                    st.markdown(f"**Scene:** {prompt_data.get('scene', 'N/A')}")
+                    st.markdown(f"**Characters:** {prompt_data.get('characters', 'N/A')}")
+                    st.markdown(f"**Dialogue:** {prompt_data.get('dialogue', 'N/A')}")
+                
+                with col2:
+                    st.markdown(f"**Camera:** {prompt_data.get('camera_angle', 'N/A')}")
+                    st.markdown(f"**Emotion:** {prompt_data.get('emotion', 'N/A')}")
+                
+                st.caption(f"**Image Prompt:** {prompt_data.get('image_prompt', 'N/A')[:200]}...")
+        
+        st.success("Prompts ready! Go to **Comic Factory** to generate images.")
+        if st.session_state.speculative_render:
+            done = speculative_render.progress(st.session_state.speculative_render)
+            st.caption(f"Pre-rendering panels in the background: {done:.0%} done")
@@ -0,0 +1,249 @@
+"""
+Batch Comics Module
+Headless comic generation from a JSONL file of story ideas: story -> prompts -> panels,
+with per-stage concurrency, resumable progress and a throughput report
+
+Usage:
+    python batch_comics.py ideas.jsonl --story-workers 2 --prompt-workers 2 --render-workers 1
+
+Each line is {"idea": "...", "id": "optional-stable-id"} (or a bare JSON string).
+Comics are written to COMICS_DIR/batch-<id>/ with the usual job.json and
+metadata.json, so re-running the same file skips finished comics and picks up
+each unfinished one at the stage where it stopped.
+"""
+import re
+import math
+import time
+import hashlib
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import config
+import comic_jobs
+import data_store
+import tracing
+
+STAGE_STORY = "story"
+STAGE_PROMPTS = "prompts"
+STAGE_RENDER = "render"
+STAGES = (STAGE_STORY, STAGE_PROMPTS, STAGE_RENDER)
+
+def load_ideas(path: str) -> list:
+    """
+    Read story ideas from a JSONL file.
+
+    Args:
+        path: JSONL file (optionally .gz)
+
+    Returns:
+        List of {"idea", "comic_id"} dictionaries (duplicates removed)
+    """
+    ideas, seen = [], set()
+    for line in data_store.iter_jsonl(path):
+        record = {"idea": line} if isinstance(line, str) else line
+        idea = (record.get("idea") or record.get("story_idea") or "").strip()
+        if not idea:
+            print(f"[WARN] Skipping line without an idea: {record}")
+            continue
+        comic_id = comic_id_for(idea, record.get("id"))
+        if comic_id in seen:
+            continue
+        seen.add(comic_id)
+        ideas.append({"idea": idea, "comic_id": comic_id})
+    return ideas
+
+def comic_id_for(idea: str, record_id: str = None) -> str:
+    """Stable comic ID for an idea, so re-runs find their earlier progress"""
+    if record_id:
+        return "batch-" + re.sub(r"[^A-Za-z0-9_-]+", "-", str(record_id)).strip("-")[:48]
+    return "batch-" + hashlib.sha1(idea.encode("utf-8")).hexdigest()[:12]
+
+def next_stage(comic_id: str) -> str:
+    """
+    Work out where an idea's comic stopped.
+
+    Returns:
+        STAGE_STORY, STAGE_PROMPTS, STAGE_RENDER, or None if the comic is complete
+    """
+    job = comic_jobs.load_job(comic_id)
+    if job is None or not job.get("story"):
+        return STAGE_STORY
+    if not job.get("prompts_complete", True) or not job.get("prompts"):
+        return STAGE_PROMPTS
+    if job.get("status") != "complete":
+        return STAGE_RENDER
+    return None
+
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile (0 for an empty list)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+def _run_story(item: dict):
+    import story_generator
+
+    story = story_generator.generate_story(item["idea"])
+    # Persist the story before prompting, so an interrupted run resumes from here
+    job = comic_jobs.create_job([], story=story, comic_id=item["comic_id"])
+    job.update({"idea": item["idea"], "prompts_complete": False})
+    comic_jobs.save_job(job)
+
+def _run_prompts(item: dict):
+    import prompt_generator
+
+    story = comic_jobs.load_job(item["comic_id"])["story"]
+    prompts = prompt_generator.generate_comic_prompts(story)
+    job = comic_jobs.create_job(prompts, story=story, comic_id=item["comic_id"])
+    job["idea"] = item["idea"]
+    comic_jobs.save_job(job)
+
+def _run_render(item: dict):
+    job = comic_jobs.run_job(item["comic_id"])
+    if job["status"] != "complete":
+        raise RuntimeError(f"{comic_jobs.failed_count(job)} panel(s) failed")
+
+STAGE_FUNCTIONS = {
+    STAGE_STORY: _run_story,
+    STAGE_PROMPTS: _run_prompts,
+    STAGE_RENDER: _run_render
+}
+
+def run_batch(ideas: list, workers: dict = None) -> dict:
+    """
+    Run every idea through the remaining stages, pipelined across per-stage thread pools.
+
+    An idea moves to the next stage's pool as soon as its current stage
+    finishes, so stories, prompts and renders of different ideas overlap.
+
+    Args:
+        ideas: List from load_ideas()
+        workers: Threads per stage, e.g. {"story": 2, "prompts": 2, "render": 1}
+
+    Returns:
+        Report dictionary (see format_report)
+    """
+    workers = dict({
+        STAGE_STORY: config.BATCH_STORY_WORKERS,
+        STAGE_PROMPTS: config.BATCH_PROMPT_WORKERS,
+        STAGE_RENDER: config.BATCH_RENDER_WORKERS
+    }, **(workers or {}))
+
+    timings = {stage: [] for stage in STAGES}
+    outcomes = {"complete": [], "failed": [], "skipped": []}
+    lock = threading.Condition()
+    outstanding = [0]
+
+    executors = {
+        stage: ThreadPoolExecutor(max_workers=max(1, workers[stage]), thread_name_prefix=f"batch-{stage}")
+        for stage in STAGES
+    }
+
+    def finish(item, outcome):
+        with lock:
+            outcomes[outcome].append(item["comic_id"])
+            outstanding[0] -= 1
+            lock.notify_all()
+
+    def run_stage(stage, item):
+        start = time.perf_counter()
+        outcome = "failed"  # cleared once the item is handed to the next stage
+        try:
+            with tracing.trace(comic_id=item["comic_id"]), tracing.span(f"batch.{stage}"):
+                STAGE_FUNCTIONS[stage](item)
+            with lock:
+                timings[stage].append(time.perf_counter() - start)
+
+            following = STAGES.index(stage) + 1
+            if following < len(STAGES):
+                executors[STAGES[following]].submit(run_stage, STAGES[following], item)
+                outcome = None
+            else:
+                print(f"[✓] {item['comic_id']} complete")
+                outcome = "complete"
+        except Exception as e:
+            print(f"[✗] {item['comic_id']} failed at {stage}: {e}")
+            item["error"] = f"{stage}: {e}"
+        finally:
+            if outcome:
+                finish(item, outcome)
+
+    start = time.perf_counter()
+    for item in ideas:
+        stage = next_stage(item["comic_id"])
+        if stage is None:
+            outcomes["skipped"].append(item["comic_id"])
+            continue
+        with lock:
+            outstanding[0] += 1
+        executors[stage].submit(run_stage, stage, item)
+
+    with lock:
+        while outstanding[0]:
+            lock.wait()
+    elapsed = time.perf_counter() - start
+    for executor in executors.values():
+        executor.shutdown(wait=True)
+
+    processed = len(outcomes["complete"])
+    return {
+        "ideas": len(ideas),
+        "complete": len(outcomes["complete"]),
+        "failed": len(outcomes["failed"]),
+        "skipped": len(outcomes["skipped"]),
+        "failed_ids": outcomes["failed"],
+        "elapsed_seconds": round(elapsed, 3),
+        "ideas_per_minute": round(processed / (elapsed / 60), 2) if elapsed > 0 else 0.0,
+        "workers": workers,
+        "stages": {
+            stage: {
+                "count": len(values),
+                "p50_seconds": round(percentile(values, 50), 3),
+                "p95_seconds": round(percentile(values, 95), 3),
+                "total_seconds": round(sum(values), 3)
+            }
+            for stage, values in timings.items()
+        }
+    }
+
+def format_report(report: dict) -> str:
+    """Human-readable throughput and latency summary"""
+    lines = [
+        f"Ideas: {report['ideas']} | complete {report['complete']} | failed {report['failed']} "
+        f"| already done {report['skipped']}",
+        f"Elapsed: {report['elapsed_seconds']:.1f}s | Throughput: {report['ideas_per_minute']:.2f} ideas/min",
+        f"{'Stage':<10}{'Workers':>8}{'Runs':>6}{'p50':>9}{'p95':>9}",
+    ]
+    for stage in STAGES:
+        s = report["stages"][stage]
+        lines.append(f"{stage:<10}{report['workers'][stage]:>8}{s['count']:>6}"
+                     f"{s['p50_seconds']:>8.2f}s{s['p95_seconds']:>8.2f}s")
+    return "\n".join(lines)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate comics from a JSONL file of story ideas")
+    parser.add_argument("ideas", help="JSONL file with one {\"idea\": ...} per line")
+    parser.add_argument("--story-workers", type=int, default=config.BATCH_STORY_WORKERS,
+                        help="Stories generated at the same time")
+    parser.add_argument("--prompt-workers", type=int, default=config.BATCH_PROMPT_WORKERS,
+                        help="Prompt sets generated at the same time")
+    parser.add_argument("--render-workers", type=int, default=config.BATCH_RENDER_WORKERS,
+                        help="Comics rendered at the same time (each uses RENDER_CONCURRENCY panel threads)")
+    parser.add_argument("--limit", type=int, default=None, help="Only process the first N ideas")
+    parser.add_argument("--report", default=None, help="Also write the report as JSON to this path")
+    args = parser.parse_args()
+
+    ideas = load_ideas(args.ideas)[:args.limit]
+    print(f"[*] {len(ideas)} idea(s) from {args.ideas}")
+
+    report = run_batch(ideas, {
+        STAGE_STORY: args.story_workers,
+        STAGE_PROMPTS: args.prompt_workers,
+        STAGE_RENDER: args.render_workers
+    })
+    print(format_report(report))
+
+    if args.report:
+        data_store.write_json_atomic(args.report, report)
+        print(f"[✓] Report written to {args.report}")
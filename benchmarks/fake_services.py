@@ -0,0 +1,246 @@
+"""
+Fake Services Module
+Local stand-ins for Gemini, Pollinations and (optionally) Chroma/HuggingFace so the
+pipeline can be benchmarked offline on a CPU-only machine
+
+install() must run before any project module that imports these services.
+"""
+import os
+import sys
+import json
+import time
+import types
+import zlib
+import threading
+from io import BytesIO
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+from PIL import Image
+
+EMBEDDING_DIM = 384
+
+FAKE_STORY = (
+    "Kabir woke up late and sprinted to Gandhinagar School with one shoe untied. "
+    "Rohan waved from the gate, holding the homework Kabir had forgotten on the bus. "
+    "In class, Ms. Mehta raised an eyebrow, but Priya covered for him with a joke about the cricket match. "
+    "By lunch the whole class was laughing, and Kabir promised to set three alarms tomorrow."
+)
+
+SETTINGS = {
+    "llm_latency": 0.0,      # Seconds per Gemini call
+    "image_latency": 0.0,    # Seconds per Pollinations request
+    "stream_chunk_chars": 40
+}
+
+# ============================================================================
+# Gemini (google.generativeai)
+# ============================================================================
+def _fake_panels() -> list:
+    return [
+        {
+            "panel": i + 1,
+            "scene": f"Scene {i + 1} at Gandhinagar School",
+            "characters": "Kabir (messy hair, school uniform), Rohan (glasses, backpack)",
+            "dialogue": "Oh no, I'm late!" if i % 2 == 0 else "Relax yaar, sab set hai.",
+            "camera_angle": "wide shot",
+            "emotion": "playful",
+            "image_prompt": f"Kabir running through the school corridor, panel {i + 1}, morning light, students watching"
+        }
+        for i in range(6)
+    ]
+
+class _Response:
+    def __init__(self, text: str):
+        self.text = text
+
+class _GenerativeModel:
+    def __init__(self, model_name=None, **kwargs):
+        self.model_name = model_name
+
+    def generate_content(self, contents, generation_config=None, stream=False, **kwargs):
+        time.sleep(SETTINGS["llm_latency"])
+        prompt = json.dumps(contents, default=str)
+        wants_json = "OUTPUT FORMAT (strict JSON)" in prompt or (generation_config or {}).get("response_mime_type") == "application/json"
+        text = json.dumps(_fake_panels(), indent=2) if wants_json else FAKE_STORY
+        if stream:
+            size = SETTINGS["stream_chunk_chars"]
+            return iter([_Response(text[i:i + size]) for i in range(0, len(text), size)])
+        return _Response(text)
+
+def _install_gemini():
+    genai = types.ModuleType("google.generativeai")
+    genai.configure = lambda **kwargs: None
+    genai.GenerativeModel = _GenerativeModel
+    try:
+        import google
+    except ImportError:
+        google = types.ModuleType("google")
+        google.__path__ = []
+        sys.modules["google"] = google
+    google.generativeai = genai
+    sys.modules["google.generativeai"] = genai
+
+# ============================================================================
+# Chroma + HuggingFace embeddings (in-memory, hashing embeddings)
+# ============================================================================
+class FakeEmbeddings:
+    """Deterministic bag-of-words hashing embeddings (no model download)"""
+
+    def __init__(self, model_name=None, **kwargs):
+        self.model_name = model_name
+
+    def _embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+        for token in text.lower().split():
+            vector[zlib.crc32(token.encode("utf-8")) % EMBEDDING_DIM] += 1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def embed_documents(self, texts):
+        return [self._embed(t).tolist() for t in texts]
+
+    def embed_query(self, text):
+        return self._embed(text).tolist()
+
+class _Retriever:
+    def __init__(self, store, k):
+        self.store, self.k = store, k
+
+    def invoke(self, query):
+        return self.store.similarity_search(query, k=self.k)
+
+class FakeChroma:
+    """In-memory vector store shared by every instance with the same directory and collection"""
+
+    _collections = {}
+    _lock = threading.Lock()
+
+    def __init__(self, persist_directory=None, embedding_function=None, collection_name=None, **kwargs):
+        self.embedding_function = embedding_function or FakeEmbeddings()
+        key = (persist_directory, collection_name)
+        with FakeChroma._lock:
+            self._data = FakeChroma._collections.setdefault(key, {"docs": {}, "vectors": {}})
+
+    def add_documents(self, docs, ids=None):
+        ids = ids or [str(id(d)) for d in docs]
+        vectors = self.embedding_function.embed_documents([d.page_content for d in docs])
+        with FakeChroma._lock:
+            for doc_id, doc, vector in zip(ids, docs, vectors):
+                self._data["docs"][doc_id] = doc
+                self._data["vectors"][doc_id] = np.asarray(vector, dtype=np.float32)
+        return ids
+
+    def delete(self, ids=None, where=None, **kwargs):
+        with FakeChroma._lock:
+            targets = set(ids or [])
+            if where:
+                (field, condition), = where.items()
+                allowed = set(condition["$in"]) if isinstance(condition, dict) else {condition}
+                targets |= {i for i, d in self._data["docs"].items() if d.metadata.get(field) in allowed}
+            for doc_id in targets:
+                self._data["docs"].pop(doc_id, None)
+                self._data["vectors"].pop(doc_id, None)
+
+    def similarity_search(self, query, k=4, **kwargs):
+        with FakeChroma._lock:
+            ids = list(self._data["vectors"])
+            if not ids:
+                return []
+            matrix = np.vstack([self._data["vectors"][i] for i in ids])
+            docs = [self._data["docs"][i] for i in ids]
+        scores = matrix @ np.asarray(self.embedding_function.embed_query(query), dtype=np.float32)
+        return [docs[i] for i in np.argsort(-scores)[:k]]
+
+    def as_retriever(self, search_kwargs=None, **kwargs):
+        return _Retriever(self, (search_kwargs or {}).get("k", 4))
+
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls._collections.clear()
+
+def _install_rag():
+    chroma = types.ModuleType("langchain_chroma")
+    chroma.Chroma = FakeChroma
+    sys.modules["langchain_chroma"] = chroma
+    hf = types.ModuleType("langchain_huggingface")
+    hf.HuggingFaceEmbeddings = FakeEmbeddings
+    sys.modules["langchain_huggingface"] = hf
+
+def _install_streamlit_if_missing():
+    """qa_engine decorates loaders with st.cache_resource; outside Streamlit a passthrough is enough"""
+    try:
+        import streamlit  # noqa: F401
+    except ImportError:
+        st = types.ModuleType("streamlit")
+        st.cache_resource = lambda func=None, **kwargs: func if func else (lambda f: f)
+        sys.modules["streamlit"] = st
+
+# ============================================================================
+# Pollinations (local HTTP server)
+# ============================================================================
+def _fake_image_bytes(width: int = 1024, height: int = 576) -> bytes:
+    """A JPEG with photo-like detail so transfer and decode sizes are realistic"""
+    rng = np.random.default_rng(0)
+    gradient = np.linspace(0, 255, width, dtype=np.float32)[np.newaxis, :, np.newaxis]
+    noise = rng.normal(0, 25, (height, width, 3)).astype(np.float32)
+    pixels = np.clip(gradient + noise + [[[40, 90, 140]]], 0, 255).astype(np.uint8)
+    buffer = BytesIO()
+    Image.fromarray(pixels, "RGB").save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+class _ImageHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # Keep-alive, like the real service
+    image = b""
+
+    def do_GET(self):
+        time.sleep(SETTINGS["image_latency"])
+        self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("Content-Length", str(len(self.image)))
+        self.end_headers()
+        self.wfile.write(self.image)
+
+    def log_message(self, *args):
+        pass
+
+def start_image_server() -> tuple:
+    """
+    Serve a fixed JPEG for every request on a random local port.
+
+    Returns:
+        Tuple of (server, base URL ending in /prompt/)
+    """
+    _ImageHandler.image = _fake_image_bytes()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ImageHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-pollinations", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/prompt/"
+
+# ============================================================================
+# Setup
+# ============================================================================
+def isolate_config(config, root: str):
+    """Point every data path under config.BASE_DIR at a scratch directory"""
+    base = config.BASE_DIR
+    for name in dir(config):
+        value = getattr(config, name)
+        if name.isupper() and isinstance(value, str) and (value == base or value.startswith(base + os.sep)):
+            setattr(config, name, os.path.join(root, os.path.relpath(value, base)))
+    config.BASE_DIR = root
+
+def install(real_rag: bool = False, llm_latency: float = 0.0, image_latency: float = 0.0):
+    """
+    Install the fakes (call before importing project modules).
+
+    Args:
+        real_rag: Use the installed langchain_chroma/langchain_huggingface instead of the in-memory fakes
+        llm_latency: Simulated seconds per Gemini call
+        image_latency: Simulated seconds per Pollinations request
+    """
+    SETTINGS["llm_latency"] = llm_latency
+    SETTINGS["image_latency"] = image_latency
+    _install_gemini()
+    if not real_rag:
+        _install_rag()
+    _install_streamlit_if_missing()
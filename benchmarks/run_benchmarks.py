@@ -0,0 +1,367 @@
+"""
+End-to-End Benchmark Suite
+Per-stage timings for the comic pipeline with Gemini and Pollinations replaced by local fakes,
+so runs are repeatable offline on a CPU-only machine
+
+Usage:
+    python benchmarks/run_benchmarks.py --output bench.json
+    python benchmarks/run_benchmarks.py --save-baseline baseline.json
+    python benchmarks/run_benchmarks.py --baseline baseline.json --tolerance 0.25
+
+Stages:
+    embedding_load                       Embedding model + vector store construction
+    retrieval.<module>                   RAG lookup as done by each module
+    prompt_assembly.<kind>               Canonical image prompt / art-director request
+    llm.<call>                           Full LLM-backed calls (fake model, real parsing + RAG)
+    image_fetch.cold / .cached           Pollinations round trip (local server) / image cache hit
+    overlay                              Dialogue box drawing
+    encode_save.<format>                 Encode + atomic write per output format
+    listing.<catalog>.<N>.<cold|warm|cache>
+                                         Store full scan / journal tail / catalog_cache hit
+
+By default the vector store and embeddings are in-memory fakes (hashing embeddings);
+pass --real-rag to time the installed langchain_chroma and HuggingFace model instead.
+Exits with status 1 when --baseline is given and any stage's p50 regressed beyond --tolerance.
+"""
+import os
+import sys
+import json
+import math
+import time
+import uuid
+import shutil
+import random
+import argparse
+import platform
+import tempfile
+import contextlib
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import fake_services
+
+STORY_IDEAS = [
+    "Kabir woke up late for school",
+    "Priya organises a surprise for Ms. Mehta",
+    "The cricket match gets rained out",
+    "Rohan loses his science project on the bus",
+]
+
+QUESTIONS = [
+    "Who is Kabir?",
+    "What does Rohan look like?",
+    "Which students play cricket?",
+]
+
+DIALOGUES = [
+    "Oh no, I'm late!",
+    "Relax yaar, sab set hai. The exam is tomorrow, not today, so we still have time for one more cricket match.",
+    "Beta, behave yourself! Where is your homework?",
+]
+
+# Absolute slack before a slower p50 counts as a regression (timer noise on sub-ms stages)
+MIN_REGRESSION_MS = 0.05
+
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile (0 for an empty list)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+def measure(fn, repeat: int, warmup: int = 1) -> dict:
+    """
+    Time fn() repeatedly with the project's console logging silenced.
+
+    Args:
+        fn: Zero-argument callable
+        repeat: Timed iterations
+        warmup: Untimed iterations first
+
+    Returns:
+        Dictionary with n, mean_ms, p50_ms, p95_ms and min_ms
+    """
+    samples = []
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(warmup):
+            fn()
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            samples.append((time.perf_counter() - start) * 1000)
+    return {
+        "n": len(samples),
+        "mean_ms": round(sum(samples) / len(samples), 4),
+        "p50_ms": round(percentile(samples, 50), 4),
+        "p95_ms": round(percentile(samples, 95), 4),
+        "min_ms": round(min(samples), 4)
+    }
+
+def _cycle(items: list):
+    """Callable-friendly round robin over items"""
+    state = {"i": 0}
+    def next_item():
+        state["i"] += 1
+        return items[state["i"] % len(items)]
+    return next_item
+
+# ============================================================================
+# Fixtures
+# ============================================================================
+def _character(i: int) -> dict:
+    return {
+        "id": f"bench-char-{i:06d}",
+        "name": f"Student {i}",
+        "role": "student",
+        "visual_description": f"Student {i} wears the school uniform, {random.choice(['glasses', 'a cap', 'braids', 'a backpack'])}",
+        "personality_description": random.choice(["curious and funny", "quiet but brave", "loves cricket"]),
+        "tags": ["student", f"class-{i % 12}"],
+        "image_paths": []
+    }
+
+def _story(i: int) -> dict:
+    return {
+        "id": f"bench-story-{i:06d}",
+        "title": f"Story {i}",
+        "content": fake_services.FAKE_STORY,
+        "created_at": datetime(2024, 1, 1).isoformat(),
+        "type": "story"
+    }
+
+def write_catalog(root: str, count: int, nested: bool, make_record) -> str:
+    """Write count records straight to disk in the JsonStore layout (no journal)"""
+    os.makedirs(root, exist_ok=True)
+    for i in range(count):
+        record = make_record(i)
+        if nested:
+            path = os.path.join(root, record["id"], "metadata.json")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        else:
+            path = os.path.join(root, f"{record['id']}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(record, f)
+    return root
+
+def seed_index(characters: int = 50, stories: int = 50):
+    """Put a small universe into the vector store so retrieval returns real documents"""
+    import rag_index
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        rag_index.add_characters_to_index([(_character(i), "") for i in range(characters)])
+        rag_index.add_stories_to_index([_story(i) for i in range(stories)])
+
+# ============================================================================
+# Stages
+# ============================================================================
+def bench_rag(repeat: int) -> dict:
+    import config
+    import rag_index
+    import story_generator
+    import prompt_generator
+    import qa_engine
+    from langchain_chroma import Chroma
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    def load():
+        embeddings = HuggingFaceEmbeddings(model_name=config.EMBEDDING_MODEL)
+        Chroma(persist_directory=config.VECTOR_DB_DIR, embedding_function=embeddings,
+               collection_name="gandhinagar_school")
+
+    results = {"embedding_load": measure(load, max(1, repeat // 10))}
+    seed_index()
+
+    query = _cycle(STORY_IDEAS)
+    results["retrieval.story_generator"] = measure(lambda: story_generator.load_retriever().invoke(query()), repeat)
+    results["retrieval.prompt_generator"] = measure(lambda: prompt_generator.load_retriever().invoke(query()), repeat)
+    results["retrieval.qa_engine"] = measure(lambda: qa_engine.load_retriever().invoke(query()), repeat)
+    results["retrieval.rag_index"] = measure(lambda: rag_index.search_characters(query()), repeat)
+    return results
+
+def bench_prompts_and_llm(repeat: int) -> dict:
+    import prompt_builder
+    import prompt_generator
+    import story_generator
+    import qa_engine
+
+    image_prompt = _cycle([
+        "Kabir running through the school corridor, morning light, students watching, kid-friendly",
+        "Wide shot of the cricket ground, rain clouds, Rohan holding an umbrella, safe for work",
+    ])
+    idea, question = _cycle(STORY_IDEAS), _cycle(QUESTIONS)
+
+    return {
+        "prompt_assembly.image_prompt": measure(lambda: prompt_builder.canonical_prompt(image_prompt()), repeat),
+        "prompt_assembly.prompt_request": measure(
+            lambda: prompt_generator._build_prompt_request(fake_services.FAKE_STORY), repeat),
+        "llm.generate_story": measure(lambda: story_generator.generate_story(idea()), repeat),
+        "llm.generate_comic_prompts": measure(
+            lambda: prompt_generator.generate_comic_prompts(fake_services.FAKE_STORY), repeat),
+        "llm.qa_answer": measure(lambda: qa_engine.answer_question(question()), repeat),
+    }
+
+def bench_images(repeat: int, workdir: str) -> dict:
+    from io import BytesIO
+    from PIL import Image
+    import comic_renderer
+    import image_encoder
+    import text_overlay
+
+    prompt = "Kabir running through the school corridor, morning light"
+    results = {
+        "image_fetch.cold": measure(lambda: comic_renderer.generate_image_bytes(prompt, new_variation=True), repeat),
+        "image_fetch.cached": measure(lambda: comic_renderer.generate_image_bytes(prompt), repeat),
+    }
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        frame = Image.open(BytesIO(comic_renderer.generate_image_bytes(prompt))).convert("RGB")
+    dialogue = _cycle(DIALOGUES)
+    # The renderer draws in place on a freshly decoded frame, so one frame is reused here
+    results["overlay"] = measure(lambda: text_overlay.draw_dialogue_box(frame, dialogue()), repeat)
+
+    out_dir = os.path.join(workdir, "encode")
+    os.makedirs(out_dir, exist_ok=True)
+    for fmt in image_encoder.FORMATS:
+        base = os.path.join(out_dir, f"panel_{fmt}")
+        results[f"encode_save.{fmt}"] = measure(lambda: image_encoder.save_image(frame, base, fmt=fmt),
+                                                max(1, repeat // 2))
+    return results
+
+def bench_listing(sizes: list, repeat: int, workdir: str) -> dict:
+    import config
+    import data_store
+    import catalog_cache
+
+    results = {}
+    catalogs = {
+        "stories": (False, _story, "STORIES_DIR", catalog_cache.stories),
+        "characters": (True, _character, "CHARACTERS_DIR", catalog_cache.characters),
+    }
+    for size in sizes:
+        # Keep the biggest catalogs to a few full scans
+        runs = max(1, min(repeat, 20000 // size))
+        for name, (nested, make_record, setting, cached_read) in catalogs.items():
+            root = write_catalog(os.path.join(workdir, "listing", f"{name}_{size}"), size, nested, make_record)
+            setattr(config, setting, root)
+            catalog_cache.invalidate()
+
+            prefix = f"listing.{name}.{size}"
+            results[f"{prefix}.cold"] = measure(lambda: data_store.JsonStore(root, nested=nested).all(), runs, warmup=0)
+            results[f"{prefix}.warm"] = measure(lambda: data_store.get_store(root, nested=nested).all(), runs)
+            results[f"{prefix}.cache"] = measure(cached_read, repeat)
+            print(f"[✓] {prefix}: cold p50 {results[prefix + '.cold']['p50_ms']:.1f} ms")
+    return results
+
+# ============================================================================
+# Baseline comparison
+# ============================================================================
+def compare(current: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Compare p50 timings against a baseline run.
+
+    Args:
+        current: Stage results of this run
+        baseline: Stage results of the baseline run
+        tolerance: Allowed relative slowdown (0.25 = 25%)
+
+    Returns:
+        List of (stage, baseline_ms, current_ms, ratio) for regressed stages
+    """
+    regressions = []
+    for stage, result in sorted(current.items()):
+        before = baseline.get(stage)
+        if not before:
+            continue
+        old, new = before["p50_ms"], result["p50_ms"]
+        if new > old * (1 + tolerance) and new - old > MIN_REGRESSION_MS:
+            regressions.append((stage, old, new, new / old if old else float("inf")))
+    return regressions
+
+def run(args) -> dict:
+    """Run every stage and return the report dictionary"""
+    fake_services.install(real_rag=args.real_rag, llm_latency=args.llm_latency,
+                          image_latency=args.image_latency)
+    import config
+
+    workdir = tempfile.mkdtemp(prefix="comic-bench-", dir=args.workdir)
+    server = None
+    try:
+        fake_services.isolate_config(config, workdir)
+        server, config.POLLINATIONS_API_URL = fake_services.start_image_server()
+        random.seed(0)
+
+        stages = {}
+        print("[*] RAG stages...")
+        stages.update(bench_rag(args.repeat))
+        print("[*] Prompt and LLM stages...")
+        stages.update(bench_prompts_and_llm(args.repeat))
+        print("[*] Image stages...")
+        stages.update(bench_images(args.repeat, workdir))
+        print(f"[*] Listing stages at {args.sizes}...")
+        stages.update(bench_listing(args.sizes, args.repeat, workdir))
+    finally:
+        if server:
+            server.shutdown()
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "meta": {
+            "run_id": uuid.uuid4().hex[:12],
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "rag": "real" if args.real_rag else "fake",
+            "llm_latency": args.llm_latency,
+            "image_latency": args.image_latency,
+            "repeat": args.repeat,
+            "sizes": args.sizes
+        },
+        "stages": stages
+    }
+
+def format_report(report: dict) -> str:
+    """Human-readable table of stage timings"""
+    lines = [f"{'Stage':<36}{'n':>6}{'p50 ms':>12}{'p95 ms':>12}"]
+    for stage, s in report["stages"].items():
+        lines.append(f"{stage:<36}{s['n']:>6}{s['p50_ms']:>12.3f}{s['p95_ms']:>12.3f}")
+    return "\n".join(lines)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the comic pipeline stage by stage")
+    parser.add_argument("--repeat", type=int, default=50, help="Timed iterations per stage")
+    parser.add_argument("--sizes", default="10,1000,100000",
+                        help="Comma-separated catalog sizes for the listing stages")
+    parser.add_argument("--real-rag", action="store_true",
+                        help="Use the installed Chroma and HuggingFace model instead of in-memory fakes")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Simulated seconds per Gemini call")
+    parser.add_argument("--image-latency", type=float, default=0.0, help="Simulated seconds per image request")
+    parser.add_argument("--workdir", default=None, help="Parent directory for scratch data (default: system temp)")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch directory")
+    parser.add_argument("--output", default=None, help="Write the results as JSON to this path")
+    parser.add_argument("--baseline", default=None, help="Compare against a previous JSON result")
+    parser.add_argument("--save-baseline", default=None, help="Write the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed p50 slowdown vs. baseline")
+    args = parser.parse_args()
+    args.sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+
+    report = run(args)
+    print(format_report(report))
+
+    for path in filter(None, [args.output, args.save_baseline]):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"[✓] Results written to {path}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("meta", {}).get("rag") != report["meta"]["rag"]:
+            print("[WARN] Baseline used a different RAG mode; comparison is not like for like")
+        regressions = compare(report["stages"], baseline.get("stages", {}), args.tolerance)
+        for stage, old, new, ratio in regressions:
+            print(f"[✗] {stage}: {old:.3f} ms -> {new:.3f} ms ({ratio:.2f}x)")
+        if regressions:
+            sys.exit(1)
+        print(f"[✓] No stage slower than baseline by more than {args.tolerance:.0%}")
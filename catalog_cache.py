@@ -0,0 +1,152 @@
+"""
+Catalog Cache Module
+In-process cache for the character catalog, story archive, indexing state,
+unfinished comics, comic exports and image service health that the Streamlit
+app reads on every rerun
+"""
+import os
+import time
+import threading
+import config
+import data_store
+import tracing
+
+CHARACTERS = "characters"
+STORIES = "stories"
+PENDING_INDEX = "pending_index"
+FAILED_INDEX = "failed_index"
+INCOMPLETE_JOBS = "incomplete_jobs"
+EXPORTS = "exports"     # one entry per comic: "exports:<comic_id>"
+BREAKER = "breaker"
+
+_lock = threading.Lock()
+_entries = {}       # name -> (value, loaded_at)
+_generations = {}   # name -> invalidation count (guards against storing a value loaded before an invalidation)
+_stats = {}         # cache kind -> {"hits", "misses", "invalidations"}
+
+def _stat(name: str) -> dict:
+    # Per-comic entries ("exports:<id>") are counted under their kind
+    kind = name.split(":", 1)[0]
+    return _stats.setdefault(kind, {"hits": 0, "misses": 0, "invalidations": 0})
+
+def _get(name: str, loader):
+    """Return the cached value for name, loading it on a miss or after config.CATALOG_CACHE_TTL"""
+    with tracing.span(f"catalog.{name.split(':', 1)[0]}") as span:
+        with _lock:
+            entry = _entries.get(name)
+            if entry is not None and time.monotonic() - entry[1] < config.CATALOG_CACHE_TTL:
+                _stat(name)["hits"] += 1
+                span.set(cache_hit=True)
+                return entry[0]
+            _stat(name)["misses"] += 1
+            generation = _generations.setdefault(name, 0)
+
+        span.set(cache_hit=False)
+        value = loader()
+
+        with _lock:
+            if _generations.get(name, 0) == generation:
+                _entries[name] = (value, time.monotonic())
+        return value
+
+def invalidate(*names):
+    """
+    Drop cached values so the next read goes to disk.
+
+    Args:
+        names: Cache names (CHARACTERS, STORIES, PENDING_INDEX, FAILED_INDEX,
+            INCOMPLETE_JOBS, BREAKER, "exports:<comic_id>"); none means all
+    """
+    with _lock:
+        for name in names or list(_entries):
+            _entries.pop(name, None)
+            _generations[name] = _generations.get(name, 0) + 1
+            _stat(name)["invalidations"] += 1
+
+def _on_change(key: str):
+    """data_store listener: map a changed store to the caches that depend on it"""
+    if key == os.path.abspath(config.CHARACTERS_DIR):
+        invalidate(CHARACTERS)
+    elif key == os.path.abspath(config.STORIES_DIR):
+        invalidate(STORIES)
+    elif key == os.path.abspath(config.STORY_INDEX_JOURNAL):
+        invalidate(PENDING_INDEX, FAILED_INDEX)
+    elif key == os.path.abspath(config.COMICS_DIR):
+        with _lock:
+            # Includes exports still being loaded, so a stale load is not stored
+            export_names = [n for n in set(_entries) | set(_generations) if n.startswith(f"{EXPORTS}:")]
+        invalidate(INCOMPLETE_JOBS, *export_names)
+    elif key == os.path.abspath(config.BREAKER_STATE_PATH):
+        invalidate(BREAKER)
+
+data_store.add_change_listener(_on_change)
+
+def characters() -> list:
+    """Cached character_manager.list_all_characters() (treat as read-only)"""
+    import character_manager
+    return _get(CHARACTERS, character_manager.list_all_characters)
+
+def stories() -> list:
+    """Cached story_manager.get_all_stories() (treat as read-only)"""
+    import story_manager
+    return _get(STORIES, story_manager.get_all_stories)
+
+def pending_index_ids() -> set:
+    """Cached story_indexer.pending_ids()"""
+    import story_indexer
+    return _get(PENDING_INDEX, story_indexer.pending_ids)
+
+def failed_index_ids() -> dict:
+    """Cached story_indexer.failed_ids() (treat as read-only)"""
+    import story_indexer
+    return _get(FAILED_INDEX, story_indexer.failed_ids)
+
+def incomplete_jobs() -> list:
+    """
+    Cached comic_jobs.list_incomplete_jobs() with each job's remaining panel count.
+
+    Returns:
+        List of (job, panels left) tuples (treat as read-only)
+    """
+    import comic_jobs
+
+    def load():
+        return [(job, len(comic_jobs.pending_panels(job))) for job in comic_jobs.list_incomplete_jobs()]
+    return _get(INCOMPLETE_JOBS, load)
+
+def exports(comic_id: str) -> dict:
+    """
+    Cached comic_export.get_export() for every export kind of a comic (nothing is built).
+
+    Args:
+        comic_id: Comic ID
+
+    Returns:
+        Dictionary of kind -> export path, or None if it is not built
+    """
+    import comic_export
+
+    def load():
+        return {kind: comic_export.get_export(comic_id, kind) for kind in comic_export.EXPORT_KINDS}
+    return _get(f"{EXPORTS}:{comic_id}", load)
+
+def breaker_state() -> dict:
+    """Cached comic_renderer.get_breaker_state() (use 'retry_at', not 'retry_in', for countdowns)"""
+    import comic_renderer
+    return _get(BREAKER, comic_renderer.get_breaker_state)
+
+def get_stats() -> dict:
+    """
+    Get hit/miss/invalidation counts per cache.
+
+    Returns:
+        Dictionary of name -> {"hits", "misses", "invalidations"}
+    """
+    with _lock:
+        return {name: dict(counts) for name, counts in _stats.items()}
+
+if __name__ == "__main__":
+    # Test
+    for _ in range(3):
+        print(f"{len(characters())} characters, {len(stories())} stories")
+    print(get_stats())
@@ -3,26 +3,85 @@ Character Manager Module
 Handles character creation, storage, and management
 """
 import os
-import json
+import time
 import uuid
-from PIL import Image
+import base64
+import shutil
+from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ImageOps
 try:
     import google.generativeai as genai
 except ImportError:
     genai = None  # Generative AI not available; functions requiring it should handle this case
 import config
+import data_store
 import rag_index
 import comic_renderer
+import image_embeddings
+import image_encoder
+import phash_index
+import prompt_builder
+import tracing
 
 if genai is not None:
     genai.configure(api_key=config.GOOGLE_API_KEY)
 
+# Portrait states for characters generated from a description
+PORTRAIT_PENDING = "pending"
+PORTRAIT_READY = "ready"
+PORTRAIT_FAILED = "failed"
+
+def _store() -> data_store.JsonStore:
+    return data_store.get_store(config.CHARACTERS_DIR, nested=True)
+
+def _metadata_path(char_id: str) -> str:
+    return _store().path_for(char_id)
+
+def _save_metadata(char_data: dict) -> str:
+    """Write metadata.json atomically under the store lock and journal the change"""
+    return _store().put(char_data)
+
+def _read_upload(image_file) -> bytes:
+    """Read the raw bytes of a Streamlit UploadedFile, file object or file path"""
+    if hasattr(image_file, 'getvalue'):
+        return image_file.getvalue()
+    if hasattr(image_file, 'read'):
+        return image_file.read()
+    with open(image_file, 'rb') as f:
+        return f.read()
+
+def _prepare_reference(data: bytes) -> tuple:
+    """
+    Decode, orient and downscale one reference image.
+    
+    Args:
+        data: Encoded image bytes
+    
+    Returns:
+        Tuple of (PIL Image, perceptual hash)
+    """
+    size = config.REFERENCE_IMAGE_SIZE
+    img = Image.open(BytesIO(data))
+    # JPEG can decode directly at a fraction of full resolution
+    img.draft("RGB", (size, size))
+    img = ImageOps.exif_transpose(img)
+    img.thumbnail((size, size))
+    if img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+    return img, phash_index.compute_phash(img)
+
+@tracing.traced("characters.add_from_images")
 def add_character_from_images(name: str, role: str, description: str, 
                                image_files: list, age: str = "", 
                                personality: str = "", tags: list = None) -> dict:
     """
     Add a character with uploaded images.
     
+    Images are decoded, downscaled to config.REFERENCE_IMAGE_SIZE and hashed
+    in a thread pool. Near duplicates of each other or of any reference
+    image already in the library are skipped.
+    
     Args:
         name: Character name
         role: Character role/archetype
@@ -34,29 +93,46 @@ def add_character_from_images(name: str, role: str, description: str,
     
     Returns:
         Character metadata dictionary
-    """
-    # Generate character ID
-    char_id = name.lower().replace(" ", "_") + "_" + str(uuid.uuid4())[:8]
     
-    # Create character directory
-    char_dir = os.path.join(config.CHARACTERS_DIR, char_id)
-    os.makedirs(char_dir, exist_ok=True)
+    Raises:
+        ValueError if every image duplicates an existing reference
+    """
+    uploads = [_read_upload(f) for f in image_files]
+    workers = max(1, min(config.IMAGE_IMPORT_WORKERS, len(uploads)))
     
-    # Save images
-    image_paths = []
-    for i, img_file in enumerate(image_files):
-        img_path = os.path.join(char_dir, f"reference_{i+1}.png")
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="import") as executor:
+        prepared = list(executor.map(_prepare_reference, uploads))
+        
+        # Drop near duplicates within this upload and across the library
+        accepted = []
+        for img, phash in prepared:
+            if any(phash_index.hamming(phash, kept) <= config.PHASH_MAX_DISTANCE for _, kept in accepted):
+                print("[*] Skipping repeated image in this upload")
+                continue
+            duplicate = phash_index.find_duplicate(phash)
+            if duplicate:
+                print(f"[*] Skipping image already in the library ({duplicate['path']})")
+                continue
+            accepted.append((img, phash))
+        
+        if not accepted:
+            raise ValueError("All uploaded images are duplicates of existing reference images")
+        
+        # Generate character ID
+        char_id = name.lower().replace(" ", "_") + "_" + str(uuid.uuid4())[:8]
         
-        # Handle both Streamlit UploadedFile and regular file objects
-        if hasattr(img_file, 'read'):
-            img = Image.open(img_file)
-            img.save(img_path)
-        else:
-            # Direct file path
-            img = Image.open(img_file)
-            img.save(img_path)
+        # Create character directory
+        char_dir = os.path.join(config.CHARACTERS_DIR, char_id)
+        os.makedirs(char_dir, exist_ok=True)
         
-        image_paths.append(img_path)
+        # Encode and save images in parallel
+        image_paths = list(executor.map(
+            lambda item: image_encoder.save_image(item[1][0], os.path.join(char_dir, f"reference_{item[0] + 1}")),
+            enumerate(accepted)
+        ))
+    
+    phash_index.add_many([(phash, char_id, path) for (_, phash), path in zip(accepted, image_paths)])
+    image_embeddings.add_images([(path, char_id) for path in image_paths])
     
     # Create metadata
     char_data = {
@@ -70,22 +146,25 @@ def add_character_from_images(name: str, role: str, description: str,
         "image_paths": image_paths
     }
     
-    # Save JSON
-    json_path = os.path.join(char_dir, "metadata.json")
-    with open(json_path, 'w', encoding='utf-8') as f:
-        json.dump(char_data, f, indent=2)
+    json_path = _save_metadata(char_data)
     
     # Add to RAG index
     rag_index.add_character_to_index(char_data, json_path)
     
-    print(f"[✓] Character '{name}' added successfully with {len(image_paths)} images")
+    skipped = len(uploads) - len(image_paths)
+    print(f"[✓] Character '{name}' added successfully with {len(image_paths)} images ({skipped} duplicate(s) skipped)")
     return char_data
 
+@tracing.traced("characters.add_from_description")
 def add_character_from_description(name: str, role: str, description: str,
                                    age: str = "", personality: str = "", 
                                    tags: list = None) -> dict:
     """
-    Add a character by generating their image from description.
+    Add a character whose image is generated from the description.
+    
+    The character is saved and indexed immediately with its portrait marked
+    pending; the portrait itself is generated by a background job (see
+    generate_portrait), which updates image_paths when it finishes.
     
     Args:
         name: Character name
@@ -96,32 +175,13 @@ def add_character_from_description(name: str, role: str, description: str,
         tags: Optional list of tags
     
     Returns:
-        Character metadata dictionary
+        Character metadata dictionary (portrait_status "pending")
     """
     # Generate character ID
     char_id = name.lower().replace(" ", "_") + "_" + str(uuid.uuid4())[:8]
     
     # Create character directory
-    char_dir = os.path.join(config.CHARACTERS_DIR, char_id)
-    os.makedirs(char_dir, exist_ok=True)
-    
-    # Generate character image
-    print(f"[*] Generating reference image for {name}...")
-    
-    image_prompt = f"""Character portrait of {name}, {role}. 
-{description}. 
-{f'Age: {age}.' if age else ''}
-Full body or upper body shot, clear view of face and outfit.
-{config.SAFETY_SUFFIX}"""
-    
-    img = comic_renderer.generate_image_from_prompt(image_prompt, panel_num=0)
-    
-    if not img:
-        raise Exception("Failed to generate character image")
-    
-    # Save generated image
-    img_path = os.path.join(char_dir, "reference_generated.png")
-    img.save(img_path)
+    os.makedirs(os.path.join(config.CHARACTERS_DIR, char_id), exist_ok=True)
     
     # Create metadata
     char_data = {
@@ -132,34 +192,242 @@ Full body or upper body shot, clear view of face and outfit.
         "visual_description": description,
         "personality_description": personality,
         "tags": tags or ["student", "school"],
-        "image_paths": [img_path],
-        "generated": True
+        "image_paths": [],
+        "generated": True,
+        "portrait_status": PORTRAIT_PENDING
     }
     
-    # Save JSON
-    json_path = os.path.join(char_dir, "metadata.json")
-    with open(json_path, 'w', encoding='utf-8') as f:
-        json.dump(char_data, f, indent=2)
+    json_path = _save_metadata(char_data)
     
     # Add to RAG index
     rag_index.add_character_to_index(char_data, json_path)
     
-    print(f"[✓] Character '{name}' created and added successfully")
+    queue_portrait(char_id)
+    print(f"[✓] Character '{name}' created; portrait queued")
+    return char_data
+
+def queue_portrait(char_id: str) -> str:
+    """
+    Queue background generation of a character's portrait.
+    
+    Args:
+        char_id: Character ID
+    
+    Returns:
+        Job queue ID
+    """
+    import job_queue
+    import render_worker
+    
+    render_worker.ensure_worker_running()
+    return job_queue.submit(job_queue.KIND_PORTRAIT, {"char_id": char_id})
+
+def retry_portrait(char_id: str) -> str:
+    """Mark a failed portrait pending again and queue it"""
+    char_data = get_character_by_id(char_id)
+    if char_data is None:
+        raise ValueError(f"Character not found: {char_id}")
+    char_data["portrait_status"] = PORTRAIT_PENDING
+    char_data.pop("portrait_error", None)
+    _save_metadata(char_data)
+    return queue_portrait(char_id)
+
+def _portrait_prompt(char_data: dict) -> str:
+    age = char_data.get("age")
+    return prompt_builder.build_image_prompt(
+        f"Character portrait of {char_data.get('name')}, {char_data.get('role')}.",
+        char_data.get("visual_description", ""),
+        f"Age: {age}." if age else "",
+        "Full body or upper body shot, clear view of face and outfit."
+    )
+
+@tracing.traced("characters.portrait")
+def generate_portrait(char_id: str, max_attempts: int = None, retry_delay: float = None) -> dict:
+    """
+    Generate a character's reference portrait, retrying on failure.
+    
+    On success the image is saved next to the metadata, image_paths and
+    portrait_status are updated, and the character is re-indexed. After the
+    last failed attempt portrait_status becomes "failed".
+    
+    Args:
+        char_id: Character ID
+        max_attempts: Attempts before giving up (defaults to config.PORTRAIT_MAX_ATTEMPTS)
+        retry_delay: Seconds before the first retry, doubled for each further retry
+            (defaults to config.PORTRAIT_RETRY_DELAY)
+    
+    Returns:
+        Updated character metadata dictionary
+    """
+    max_attempts = max(1, max_attempts or config.PORTRAIT_MAX_ATTEMPTS)
+    retry_delay = config.PORTRAIT_RETRY_DELAY if retry_delay is None else retry_delay
+    
+    char_data = get_character_by_id(char_id)
+    if char_data is None:
+        raise ValueError(f"Character not found: {char_id}")
+    
+    print(f"[*] Generating reference image for {char_data.get('name')}...")
+    image_prompt = _portrait_prompt(char_data)
+    
+    img_bytes = None
+    for attempt in range(1, max_attempts + 1):
+        img_bytes = comic_renderer.generate_image_bytes(image_prompt, panel_num=0)
+        if img_bytes:
+            break
+        if attempt < max_attempts:
+            delay = retry_delay * 2 ** (attempt - 1)
+            print(f"[WARN] Portrait attempt {attempt}/{max_attempts} failed, retrying in {delay:.0f}s")
+            time.sleep(delay)
+    
+    # Re-read: the character may have been edited while the image was generating
+    char_data = get_character_by_id(char_id) or char_data
+    if not img_bytes:
+        char_data["portrait_status"] = PORTRAIT_FAILED
+        char_data["portrait_error"] = f"Image generation failed after {max_attempts} attempt(s)"
+        _save_metadata(char_data)
+        print(f"[✗] Portrait for {char_data.get('name')} failed")
+        return char_data
+    
+    # Save generated image (original bytes, no re-encode)
+    img_path = image_encoder.write_image_bytes(
+        img_bytes, os.path.join(config.CHARACTERS_DIR, char_id, "reference_generated")
+    )
+    with Image.open(BytesIO(img_bytes)) as portrait:
+        phash_index.add(phash_index.compute_phash(portrait), char_id, img_path)
+    image_embeddings.add_images([(img_path, char_id)])
+    char_data["image_paths"] = [img_path]
+    char_data["portrait_status"] = PORTRAIT_READY
+    char_data.pop("portrait_error", None)
+    json_path = _save_metadata(char_data)
+    rag_index.add_character_to_index(char_data, json_path)
+    
+    print(f"[✓] Portrait for {char_data.get('name')} ready")
     return char_data
 
 def get_character_by_id(char_id: str) -> dict:
     """Get character metadata by ID"""
-    char_dir = os.path.join(config.CHARACTERS_DIR, char_id)
-    json_path = os.path.join(char_dir, "metadata.json")
-    
-    if os.path.exists(json_path):
-        with open(json_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return None
+    return _store().get(char_id)
 
 def list_all_characters() -> list:
     """List all characters"""
-    return rag_index.get_all_characters()
+    with tracing.span("characters.list") as span:
+        characters = rag_index.get_all_characters()
+        span.set(items=len(characters))
+    return characters
+
+def export_characters(include_images: bool = True):
+    """
+    Yield every character as a self-contained archive record.
+    
+    Args:
+        include_images: Embed reference images (base64) under "images"
+    
+    Yields:
+        Character dictionaries
+    """
+    for char_data in rag_index.get_all_characters():
+        if include_images:
+            images = []
+            for path in char_data.get("image_paths", []):
+                if os.path.exists(path):
+                    with open(path, 'rb') as f:
+                        images.append({"name": os.path.basename(path),
+                                       "data": base64.b64encode(f.read()).decode("ascii")})
+            # Store records are shared read-only; never modify them in place
+            char_data = dict(char_data, images=images)
+        yield char_data
+
+def _import_images(char_id: str, images: list) -> list:
+    """Write a character's embedded images; returns (path, phash) pairs"""
+    char_dir = os.path.join(config.CHARACTERS_DIR, char_id)
+    os.makedirs(char_dir, exist_ok=True)
+    saved = []
+    for image in images:
+        path = os.path.join(char_dir, os.path.basename(image["name"]))
+        data = base64.b64decode(image["data"])
+        with open(path, 'wb') as f:
+            f.write(data)
+        with Image.open(BytesIO(data)) as img:
+            saved.append((path, phash_index.compute_phash(img)))
+    return saved
+
+@tracing.traced("characters.import")
+def import_characters(records) -> list:
+    """
+    Save many characters at once (e.g. from a JSONL archive).
+    
+    Metadata is written under one store lock, embedded images are written
+    in parallel, and the RAG, perceptual hash and image embedding indexes
+    are each updated with batched writes. Existing IDs are overwritten, so
+    re-importing an archive is safe.
+    
+    Args:
+        records: Iterable of character dictionaries ("name" required); an
+            optional "images" list of {"name", "data" (base64)} is written
+            into the character folder and replaces image_paths
+    
+    Returns:
+        List of saved character dictionaries
+    """
+    characters, embedded = [], []
+    for record in records:
+        record = dict(record)
+        if not record.get("name"):
+            print(f"[WARN] Skipping character without a name: {record.get('id')}")
+            continue
+        record["id"] = record.get("id") or record["name"].lower().replace(" ", "_") + "_" + str(uuid.uuid4())[:8]
+        if not data_store.is_valid_id(record["id"]):
+            print(f"[WARN] Skipping character with invalid ID: {record['id']!r}")
+            continue
+        record.setdefault("tags", ["student", "school"])
+        record.setdefault("image_paths", [])
+        characters.append(record)
+        embedded.append(record.pop("images", None))
+    if not characters:
+        return characters
+    
+    with ThreadPoolExecutor(max_workers=config.IMAGE_IMPORT_WORKERS) as executor:
+        results = list(executor.map(
+            lambda item: _import_images(item[0]["id"], item[1]) if item[1] else None,
+            zip(characters, embedded)
+        ))
+    
+    hashes = []
+    for char_data, saved in zip(characters, results):
+        if saved is not None:
+            char_data["image_paths"] = [path for path, _ in saved]
+            hashes.extend((phash, char_data["id"], path) for path, phash in saved)
+    
+    json_paths = _store().put_many(characters)
+    rag_index.add_characters_to_index(list(zip(characters, json_paths)))
+    phash_index.add_many(hashes)
+    image_embeddings.add_images([(path, c["id"]) for c in characters for path in c["image_paths"]])
+    
+    print(f"[✓] Imported {len(characters)} characters ({len(hashes)} images)")
+    return characters
+
+@tracing.traced("characters.delete_many")
+def delete_characters(char_ids: list) -> int:
+    """
+    Delete characters, their folders and their RAG entries in one batch.
+    
+    Args:
+        char_ids: Character IDs
+    
+    Returns:
+        Number of characters removed
+    """
+    # IDs name folders under CHARACTERS_DIR; never let one point elsewhere
+    char_ids = [c for c in char_ids if data_store.is_valid_id(c)]
+    removed = _store().delete_many(char_ids)
+    for char_id in char_ids:
+        shutil.rmtree(os.path.join(config.CHARACTERS_DIR, char_id), ignore_errors=True)
+    rag_index.delete_documents(char_ids)
+    image_embeddings.remove_characters(char_ids)
+    phash_index.remove_characters(char_ids)
+    
+    print(f"[✓] Deleted {removed} of {len(char_ids)} characters")
+    return removed
 
 if __name__ == "__main__":
     # Test
@@ -0,0 +1,174 @@
+"""
+Circuit Breaker Module
+Fails fast when an upstream service (Pollinations) keeps failing, and probes it before recovering
+"""
+import json
+import threading
+import time
+from contextlib import contextmanager
+import config
+import data_store
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitOpenError(Exception):
+    """Raised when a request is refused because the circuit is open"""
+
+class CircuitBreaker:
+    """
+    Thread-safe consecutive-failure circuit breaker.
+
+    closed    -> requests pass; `failure_threshold` failures in a row open the circuit
+    open      -> requests are refused until `reset_timeout` seconds have passed
+    half_open -> one probe request is let through; success closes the circuit,
+                 failure opens it again for another `reset_timeout`
+
+    With a state_path, the state is kept in a JSON file under a file lock, so
+    the app and render workers share one circuit (and one probe). Counters in
+    get_state() stay per process.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = None, reset_timeout: float = None,
+                 state_path: str = None):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold or config.BREAKER_FAILURE_THRESHOLD)
+        self.reset_timeout = reset_timeout or config.BREAKER_RESET_TIMEOUT
+        self.state_path = state_path
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_started = 0.0   # wall-clock start of the half-open probe, 0 if none
+        self._stats = {"trips": 0, "fast_failures": 0, "successes": 0, "failures": 0}
+
+    def _shared_fields(self) -> dict:
+        return {"state": self._state, "failures": self._failures,
+                "opened_at": self._opened_at, "probe_started": self._probe_started}
+
+    def _load_locked(self):
+        """Read the shared state file (missing or unreadable keeps the in-memory state)"""
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                shared = json.load(f)
+        except (OSError, ValueError):
+            return
+        self._state = shared.get("state", CLOSED)
+        self._failures = int(shared.get("failures", 0))
+        self._opened_at = float(shared.get("opened_at", 0.0))
+        self._probe_started = float(shared.get("probe_started", 0.0))
+
+    @contextmanager
+    def _transition(self):
+        """Hold the locks for a state change, syncing with the shared state file if any"""
+        with self._lock:
+            if not self.state_path:
+                yield
+                return
+            with data_store.file_lock(f"{self.state_path}.lock"):
+                self._load_locked()
+                before = self._shared_fields()
+                yield
+                if self._shared_fields() != before:
+                    data_store.write_json_atomic(self.state_path, self._shared_fields())
+                    data_store.notify_change(self.state_path)
+
+    def allow_request(self) -> bool:
+        """
+        Check whether a request may go upstream.
+
+        Returns:
+            True if the request should be attempted, False to fail fast
+        """
+        with self._transition():
+            now = time.time()
+            if self._state == OPEN and now - self._opened_at >= self.reset_timeout:
+                self._state = HALF_OPEN
+                self._probe_started = 0.0
+                print(f"[*] Circuit '{self.name}' half-open, probing upstream")
+
+            if self._state == CLOSED:
+                return True
+            # A probe that never reported back (e.g. its process died) expires after reset_timeout
+            if self._state == HALF_OPEN and now - self._probe_started >= self.reset_timeout:
+                self._probe_started = now
+                return True
+
+            self._stats["fast_failures"] += 1
+            return False
+
+    def record_success(self):
+        """Record a successful upstream call"""
+        with self._transition():
+            self._stats["successes"] += 1
+            self._failures = 0
+            self._probe_started = 0.0
+            if self._state != CLOSED:
+                self._state = CLOSED
+                print(f"[✓] Circuit '{self.name}' closed, upstream recovered")
+
+    def record_failure(self):
+        """Record a failed or timed-out upstream call"""
+        with self._transition():
+            self._stats["failures"] += 1
+            self._failures += 1
+            self._probe_started = 0.0
+            if self._state == HALF_OPEN or (self._state == CLOSED and self._failures >= self.failure_threshold):
+                self._state = OPEN
+                self._opened_at = time.time()
+                self._stats["trips"] += 1
+                print(f"[WARN] Circuit '{self.name}' open after {self._failures} consecutive failure(s); "
+                      f"failing fast for {self.reset_timeout:.0f}s")
+
+    def release_probe(self):
+        """
+        End a call that neither succeeded nor failed upstream (e.g. a 4xx).
+
+        The state is left unchanged; only a half-open probe slot is freed so
+        the next request can probe instead.
+        """
+        with self._transition():
+            self._probe_started = 0.0
+
+    def reset(self):
+        """Close the circuit and forget consecutive failures"""
+        with self._transition():
+            self._state = CLOSED
+            self._failures = 0
+            self._probe_started = 0.0
+
+    def get_state(self) -> dict:
+        """
+        Get the current state for display.
+
+        Returns:
+            Dictionary with 'state', 'consecutive_failures', 'retry_in' (seconds
+            until the next probe, 0 unless open), 'retry_at' (its wall-clock
+            time, 0 unless open) and cumulative counters
+        """
+        with self._lock:
+            if self.state_path:
+                # Read-only: the file is replaced atomically, so no file lock is needed
+                self._load_locked()
+            state = self._state
+            retry_in = retry_at = 0.0
+            if state == OPEN:
+                retry_at = self._opened_at + self.reset_timeout
+                retry_in = max(0.0, retry_at - time.time())
+                if retry_in == 0.0:
+                    state = HALF_OPEN
+            return dict(self._stats, state=state, consecutive_failures=self._failures,
+                        retry_in=retry_in, retry_at=retry_at)
+
+if __name__ == "__main__":
+    # Test
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=0.2)
+    for _ in range(2):
+        breaker.allow_request()
+        breaker.record_failure()
+    print(breaker.allow_request(), breaker.get_state())
+    time.sleep(0.25)
+    print(breaker.allow_request(), breaker.allow_request())
+    breaker.record_success()
+    print(breaker.get_state())
@@ -0,0 +1,220 @@
+"""
+Comic Export Module
+Composes panels into a single comic page and streams panels into ZIP/CBZ archives
+"""
+import os
+import math
+import json
+import hashlib
+import uuid
+import zipfile
+from PIL import Image, ImageOps
+import config
+import data_store
+import comic_jobs
+import image_encoder
+
+EXPORT_KINDS = ("page", "cbz", "zip")
+EXPORTS_SUBDIR = "exports"
+
+# Page layout (pixels)
+PAGE_GUTTER = 12
+PAGE_BACKGROUND = "white"
+
+def parse_aspect_ratio(ratio: str) -> tuple:
+    """Parse an aspect ratio like "16:9" into (16, 9)"""
+    try:
+        w, h = (float(v) for v in ratio.split(":"))
+        if w > 0 and h > 0:
+            return w, h
+    except (ValueError, AttributeError):
+        pass
+    return 16.0, 9.0
+
+def grid_for(num_panels: int) -> tuple:
+    """
+    Get the (columns, rows) grid for a number of panels.
+
+    Args:
+        num_panels: Number of panels (config.NUM_PANELS for a full comic)
+
+    Returns:
+        Tuple of (columns, rows); 6 panels gives a 3x2 grid
+    """
+    num_panels = max(1, num_panels)
+    cols = math.ceil(math.sqrt(num_panels))
+    rows = math.ceil(num_panels / cols)
+    return cols, rows
+
+def get_panel_paths(comic_id: str) -> list:
+    """
+    Get a comic's saved panel paths in panel order.
+
+    Args:
+        comic_id: Comic ID
+
+    Returns:
+        List of existing panel paths
+    """
+    job = comic_jobs.load_job(comic_id)
+    if job:
+        paths = comic_jobs.image_paths(job)
+    else:
+        metadata_path = os.path.join(config.COMICS_DIR, comic_id, comic_jobs.METADATA_FILENAME)
+        paths = []
+        if os.path.exists(metadata_path):
+            with open(metadata_path, 'r', encoding='utf-8') as f:
+                paths = json.load(f).get("image_paths", [])
+    return [p for p in paths if os.path.exists(p)]
+
+def _signature(kind: str, panel_paths: list) -> str:
+    """Fingerprint the inputs of an export so stale files are never served"""
+    parts = [kind, config.OUTPUT_IMAGE_FORMAT, str(config.OUTPUT_IMAGE_QUALITY),
+             str(config.NUM_PANELS), config.PANEL_ASPECT_RATIO, str(config.PAGE_PANEL_WIDTH)]
+    for path in panel_paths:
+        st = os.stat(path)
+        parts.append(f"{path}|{st.st_mtime_ns}|{st.st_size}")
+    return hashlib.sha1("\n".join(parts).encode("utf-8")).hexdigest()[:12]
+
+def _export_dir(comic_id: str) -> str:
+    return os.path.join(config.COMICS_DIR, comic_id, EXPORTS_SUBDIR)
+
+def _export_base(comic_id: str, kind: str, signature: str) -> str:
+    return os.path.join(_export_dir(comic_id), f"{comic_id}_{kind}_{signature}")
+
+def _find_export(comic_id: str, kind: str, signature: str) -> str:
+    base = _export_base(comic_id, kind, signature)
+    if kind == "page":
+        return image_encoder.find_image(base)
+    path = f"{base}.{kind}"
+    return path if os.path.exists(path) else None
+
+def _remove_stale(comic_id: str, kind: str, keep: str):
+    """Delete older exports of the same kind"""
+    export_dir = _export_dir(comic_id)
+    prefix = f"{comic_id}_{kind}_"
+    for name in os.listdir(export_dir):
+        path = os.path.join(export_dir, name)
+        if name.startswith(prefix) and path != keep:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+def compose_page(panel_paths: list, base_path: str) -> str:
+    """
+    Lay panels out on one page image and encode it once.
+
+    Args:
+        panel_paths: Panel image paths in reading order
+        base_path: Output path without extension
+
+    Returns:
+        Saved page path
+    """
+    cols, rows = grid_for(max(config.NUM_PANELS, len(panel_paths)))
+    ratio_w, ratio_h = parse_aspect_ratio(config.PANEL_ASPECT_RATIO)
+    cell_w = config.PAGE_PANEL_WIDTH
+    cell_h = int(round(cell_w * ratio_h / ratio_w))
+
+    page_w = cols * cell_w + (cols + 1) * PAGE_GUTTER
+    page_h = rows * cell_h + (rows + 1) * PAGE_GUTTER
+    page = Image.new("RGB", (page_w, page_h), PAGE_BACKGROUND)
+
+    for i, path in enumerate(panel_paths):
+        col, row = i % cols, i // cols
+        x = PAGE_GUTTER + col * (cell_w + PAGE_GUTTER)
+        y = PAGE_GUTTER + row * (cell_h + PAGE_GUTTER)
+        with Image.open(path) as panel:
+            # JPEG panels can decode at reduced size
+            panel.draft("RGB", (cell_w, cell_h))
+            cell = ImageOps.fit(panel.convert("RGB"), (cell_w, cell_h))
+        page.paste(cell, (x, y))
+
+    return image_encoder.save_image(page, base_path)
+
+def write_archive(panel_paths: list, path: str, metadata: dict = None) -> str:
+    """
+    Stream panels into a ZIP/CBZ archive.
+
+    Files are copied into the archive in chunks by zipfile, so no panel is
+    held fully in memory. Images are stored uncompressed since they are
+    already compressed.
+
+    Args:
+        panel_paths: Panel image paths in reading order
+        path: Archive path (.zip or .cbz)
+        metadata: Optional dictionary written as metadata.json
+
+    Returns:
+        Archive path
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    width = max(3, len(str(len(panel_paths))))
+    try:
+        with zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_STORED) as zf:
+            for i, panel_path in enumerate(panel_paths, start=1):
+                ext = os.path.splitext(panel_path)[1].lower()
+                zf.write(panel_path, arcname=f"{str(i).zfill(width)}{ext}")
+            if metadata:
+                zf.writestr("metadata.json", json.dumps(metadata, indent=2),
+                            compress_type=zipfile.ZIP_DEFLATED)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return path
+
+def get_export(comic_id: str, kind: str, build: bool = False) -> str:
+    """
+    Get a comic export, building it only when asked.
+
+    Exports are cached under COMICS_DIR/<id>/exports and reused until the
+    panels or export settings change.
+
+    Args:
+        comic_id: Comic ID
+        kind: "page", "cbz" or "zip"
+        build: Build the export if no fresh cached copy exists
+
+    Returns:
+        Export path, or None if it is not built (or the comic has no panels)
+    """
+    if kind not in EXPORT_KINDS:
+        raise ValueError(f"Unknown export kind: {kind}")
+
+    panel_paths = get_panel_paths(comic_id)
+    if not panel_paths:
+        return None
+
+    signature = _signature(kind, panel_paths)
+    cached = _find_export(comic_id, kind, signature)
+    if cached or not build:
+        return cached
+
+    print(f"[*] Building {kind} export for comic {comic_id}...")
+    base = _export_base(comic_id, kind, signature)
+    if kind == "page":
+        path = compose_page(panel_paths, base)
+    else:
+        job = comic_jobs.load_job(comic_id) or {}
+        metadata = {
+            "id": comic_id,
+            "created_at": job.get("created_at"),
+            "story": job.get("story", ""),
+            "prompts": job.get("prompts", [])
+        }
+        path = write_archive(panel_paths, f"{base}.{kind}", metadata=metadata if kind == "zip" else None)
+
+    _remove_stale(comic_id, kind, keep=path)
+    data_store.notify_change(config.COMICS_DIR)
+    print(f"[✓] Export ready: {path}")
+    return path
+
+if __name__ == "__main__":
+    # Test
+    import sys
+    if len(sys.argv) > 1:
+        for k in EXPORT_KINDS:
+            print(get_export(sys.argv[1], k, build=True))
@@ -0,0 +1,366 @@
+"""
+Comic Jobs Module
+Durable per-comic render jobs with per-panel state and resume support
+"""
+import os
+import json
+import uuid
+import threading
+from datetime import datetime, timedelta
+import config
+import data_store
+import comic_renderer
+import image_encoder
+import tracing
+
+JOB_FILENAME = "job.json"
+METADATA_FILENAME = "metadata.json"
+SPECULATIVE_MARKER = ".speculative"  # Present until a speculative render is adopted
+
+def _comic_dir(comic_id: str) -> str:
+    return os.path.join(config.COMICS_DIR, comic_id)
+
+def save_job(job: dict):
+    """Persist a job record to COMICS_DIR/<id>/job.json"""
+    job["updated_at"] = datetime.now().isoformat()
+    output_dir = _comic_dir(job["id"])
+    os.makedirs(output_dir, exist_ok=True)
+    data_store.write_json_atomic(os.path.join(output_dir, JOB_FILENAME), job)
+    data_store.notify_change(config.COMICS_DIR)
+
+def create_job(prompts: list, story: str = "", comic_id: str = None) -> dict:
+    """
+    Create and persist a render job before any panel is requested.
+
+    Args:
+        prompts: List of prompt dictionaries from prompt_generator
+        story: Story text the prompts were generated from
+        comic_id: Optional comic ID (defaults to a new short UUID)
+
+    Returns:
+        Job dictionary
+    """
+    comic_id = comic_id or str(uuid.uuid4())[:8]
+    now = datetime.now().isoformat()
+
+    panels = {}
+    for i, prompt_data in enumerate(prompts):
+        panel_num = prompt_data.get("panel", i + 1)
+        panels[str(panel_num)] = {
+            "status": "pending",
+            "path": None,
+            "attempts": 0
+        }
+
+    job = {
+        "id": comic_id,
+        "created_at": now,
+        "updated_at": now,
+        "status": "pending",
+        "story": story,
+        "prompts": prompts,
+        "prompts_complete": True,
+        "panels": panels
+    }
+    save_job(job)
+    print(f"[✓] Created comic job {comic_id} with {len(panels)} panels")
+    return job
+
+def load_job(comic_id: str) -> dict:
+    """Load a job record, or None if the comic has no job file"""
+    job_path = os.path.join(_comic_dir(comic_id), JOB_FILENAME)
+    if not os.path.exists(job_path):
+        return None
+    try:
+        with open(job_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"[WARN] Failed to load job {comic_id}: {e}")
+        return None
+
+def mark_speculative(comic_id: str):
+    """Hide a comic from list_incomplete_jobs() until it is adopted"""
+    open(os.path.join(_comic_dir(comic_id), SPECULATIVE_MARKER), 'w').close()
+    data_store.notify_change(config.COMICS_DIR)
+
+def clear_speculative(comic_id: str):
+    """Make a speculative comic a regular one"""
+    marker = os.path.join(_comic_dir(comic_id), SPECULATIVE_MARKER)
+    if os.path.exists(marker):
+        os.remove(marker)
+        data_store.notify_change(config.COMICS_DIR)
+
+def is_speculative(comic_id: str) -> bool:
+    """Check whether a comic was rendered speculatively and not adopted yet"""
+    return os.path.exists(os.path.join(_comic_dir(comic_id), SPECULATIVE_MARKER))
+
+def list_incomplete_jobs(active_window: float = 300) -> list:
+    """
+    Get all jobs that still have missing or failed panels (newest first).
+
+    Jobs that are pending or rendering and were updated within the last
+    active_window seconds are assumed to be in progress and are left out,
+    as are speculative renders nobody adopted.
+
+    Args:
+        active_window: Seconds since the last update before a job counts as stalled
+
+    Returns:
+        List of job dictionaries
+    """
+    jobs = []
+    if not os.path.exists(config.COMICS_DIR):
+        return jobs
+
+    cutoff = (datetime.now() - timedelta(seconds=active_window)).isoformat()
+    for comic_id in os.listdir(config.COMICS_DIR):
+        job = load_job(comic_id)
+        if not job or job.get("status") == "complete" or is_speculative(comic_id):
+            continue
+        if job.get("status") in ("pending", "rendering") and job.get("updated_at", "") >= cutoff:
+            continue
+        jobs.append(job)
+
+    jobs.sort(key=lambda j: j.get("created_at", ""), reverse=True)
+    return jobs
+
+def pending_panels(job: dict) -> list:
+    """
+    Get prompts for panels that still need rendering.
+
+    A panel counts as done if it is marked done or its image is already on
+    disk (e.g. the process died between saving the file and updating the job).
+
+    Args:
+        job: Job dictionary
+
+    Returns:
+        List of prompt dictionaries to render
+    """
+    todo = []
+    for i, prompt_data in enumerate(job.get("prompts", [])):
+        panel_num = prompt_data.get("panel", i + 1)
+        if not _is_rendered(job, panel_num):
+            todo.append(dict(prompt_data, panel=panel_num))
+    return todo
+
+def _is_rendered(job: dict, panel_num: int) -> bool:
+    """Check (and record) whether a panel's image is done, either per the job or on disk"""
+    state = job["panels"].setdefault(str(panel_num), {"status": "pending", "path": None, "attempts": 0})
+    if state.get("status") == "done" and state.get("path") and os.path.exists(state["path"]):
+        return True
+    existing = image_encoder.find_image(os.path.join(_comic_dir(job["id"]), f"panel_{panel_num}"))
+    if existing:
+        state.update({"status": "done", "path": existing})
+        return True
+    return False
+
+def _same_panel(a: dict, b: dict) -> bool:
+    """Check whether two prompts render the same panel image"""
+    return all(a.get(field, "") == b.get(field, "") for field in ("image_prompt", "dialogue"))
+
+def image_paths(job: dict, include_placeholders: bool = True) -> list:
+    """
+    Get saved panel paths ordered by panel number.
+
+    Args:
+        job: Job dictionary
+        include_placeholders: Fill failed panels with their placeholder image, if one was saved
+
+    Returns:
+        List of image paths
+    """
+    paths = []
+    for num, state in job.get("panels", {}).items():
+        if state.get("status") == "done" and state.get("path"):
+            paths.append((int(num), state["path"]))
+        elif include_placeholders and state.get("placeholder") and os.path.exists(state["placeholder"]):
+            paths.append((int(num), state["placeholder"]))
+    return [path for _, path in sorted(paths)]
+
+def failed_count(job: dict) -> int:
+    """Number of panels that are not rendered yet (placeholders count as failed)"""
+    return sum(1 for state in job.get("panels", {}).values() if state.get("status") != "done")
+
+def write_metadata(job: dict) -> str:
+    """
+    Write the comic's metadata.json from its job record.
+
+    Args:
+        job: Job dictionary
+
+    Returns:
+        Path to metadata.json
+    """
+    metadata = {
+        "id": job["id"],
+        "created_at": job.get("created_at"),
+        "story": job.get("story", ""),
+        "prompts": job.get("prompts", []),
+        "image_paths": image_paths(job)
+    }
+    path = os.path.join(_comic_dir(job["id"]), METADATA_FILENAME)
+    data_store.write_json_atomic(path, metadata)
+    return path
+
+def _record_panel(job: dict, panel_num: int, path: str):
+    """Update a panel's state after a render attempt"""
+    state = job["panels"][str(panel_num)]
+    state["attempts"] = state.get("attempts", 0) + 1
+    if path and not comic_renderer.is_placeholder(path):
+        state.update({"status": "done", "path": path, "placeholder": None})
+    else:
+        # A placeholder keeps the layout complete; the panel stays resumable
+        state.update({"status": "failed", "path": None, "placeholder": path})
+
+def _finish_job(job: dict) -> dict:
+    """Set the final job status and write metadata.json"""
+    all_done = job.get("prompts_complete", True) and all(
+        state.get("status") == "done" for state in job["panels"].values()
+    )
+    job["status"] = "complete" if all_done else "incomplete"
+    save_job(job)
+    write_metadata(job)
+
+    rendered = len(job['panels']) - failed_count(job)
+    print(f"[✓] Comic {job['id']} {job['status']}: {rendered}/{len(job['panels'])} panels")
+    return job
+
+def run_job(comic_id: str, progress_callback=None, should_cancel=None) -> dict:
+    """
+    Render every missing or failed panel of a job.
+
+    Panels that are already done are never requested again. The job file is
+    updated as each panel completes, so an interrupted run can be resumed.
+
+    Args:
+        comic_id: Comic ID of an existing job
+        progress_callback: Optional callable(completed, total, panel_num, path)
+        should_cancel: Optional callable; when it returns True, panels that
+            have not started are left pending for a later resume
+
+    Returns:
+        Updated job dictionary
+    """
+    job = load_job(comic_id)
+    if job is None:
+        raise ValueError(f"No comic job found for {comic_id}")
+
+    todo = pending_panels(job)
+    if todo:
+        print(f"[*] Rendering {len(todo)} panel(s) for comic {comic_id}")
+        job["status"] = "rendering"
+        save_job(job)
+
+        def on_panel_done(completed, total, panel_num, path):
+            _record_panel(job, panel_num, path)
+            save_job(job)
+            if progress_callback:
+                progress_callback(completed, total, panel_num, path)
+
+        with tracing.trace(comic_id=comic_id), tracing.span("comic.render", panels=len(todo)):
+            comic_renderer.render_comic_panels(
+                todo,
+                _comic_dir(comic_id),
+                progress_callback=on_panel_done,
+                should_cancel=should_cancel
+            )
+
+    return _finish_job(job)
+
+def run_streaming_job(prompt_iter, story: str = "", comic_id: str = None,
+                      progress_callback=None, should_cancel=None) -> dict:
+    """
+    Create a job and render its panels while the prompts are still being generated.
+
+    Each prompt from the iterator is recorded in the job file and handed to
+    the renderer immediately. The job is only marked complete once the
+    iterator finished and every panel rendered. When an existing job whose
+    prompt stream never finished is resumed, the prompts are streamed again,
+    but panels already rendered from an unchanged prompt are kept instead of
+    being requested (and paid for) again.
+
+    Args:
+        prompt_iter: Iterable of prompt dictionaries (e.g. prompt_generator.stream_comic_prompts)
+        story: Story text the prompts come from
+        comic_id: Optional comic ID (an existing job with this ID is reused)
+        progress_callback: Optional callable(completed, total, panel_num, path)
+        should_cancel: Optional callable; when it returns True, panels that
+            have not started are left pending for a later resume
+
+    Returns:
+        Updated job dictionary
+
+    Raises:
+        The iterator's exception (panels already rendered are kept)
+    """
+    job = load_job(comic_id) if comic_id else None
+    if job and job.get("prompts_complete", True):
+        return run_job(job["id"], progress_callback=progress_callback, should_cancel=should_cancel)
+
+    if job is None:
+        job = create_job([], story=story, comic_id=comic_id)
+    job.update({"prompts_complete": False, "status": "rendering"})
+    save_job(job)
+    print(f"[*] Streaming prompts into comic {job['id']}")
+
+    # Prompts are recorded on the iterator thread, panels on the calling thread
+    lock = threading.Lock()
+
+    def recorded_prompts():
+        streamed = set()
+        for i, prompt_data in enumerate(prompt_iter):
+            panel_num = prompt_data.get("panel", i + 1)
+            prompt_data = dict(prompt_data, panel=panel_num)
+            streamed.add(str(panel_num))
+            with lock:
+                positions = {str(p.get("panel")): n for n, p in enumerate(job["prompts"])}
+                pos = positions.get(str(panel_num))
+                previous = job["prompts"][pos] if pos is not None else None
+                keep = previous is not None and _same_panel(previous, prompt_data) and _is_rendered(job, panel_num)
+                if pos is None:
+                    job["prompts"].append(prompt_data)
+                else:
+                    job["prompts"][pos] = prompt_data
+                if not keep:
+                    job["panels"][str(panel_num)] = {"status": "pending", "path": None, "attempts": 0}
+                save_job(job)
+            if keep:
+                print(f"    [✓] Panel {panel_num} unchanged, keeping the rendered image")
+                continue
+            yield prompt_data
+        with lock:
+            # Panels left over from an earlier, longer prompt list are dropped
+            job["prompts"] = [p for p in job["prompts"] if str(p.get("panel")) in streamed]
+            job["panels"] = {num: state for num, state in job["panels"].items() if num in streamed}
+            job["prompts_complete"] = True
+            save_job(job)
+
+    def on_panel_done(completed, total, panel_num, path):
+        with lock:
+            _record_panel(job, panel_num, path)
+            save_job(job)
+        if progress_callback:
+            progress_callback(completed, total, panel_num, path)
+
+    try:
+        with tracing.trace(comic_id=job["id"]), tracing.span("comic.render", streaming=True):
+            comic_renderer.render_panel_stream(
+                recorded_prompts(),
+                _comic_dir(job["id"]),
+                progress_callback=on_panel_done,
+                should_cancel=should_cancel
+            )
+    finally:
+        with lock:
+            _finish_job(job)
+    return job
+
+def resume_job(comic_id: str, progress_callback=None) -> dict:
+    """Resume a job, rendering only the panels that are missing or failed"""
+    return run_job(comic_id, progress_callback=progress_callback)
+
+if __name__ == "__main__":
+    # Test
+    for j in list_incomplete_jobs():
+        print(f"- {j['id']}: {j['status']} ({len(pending_panels(j))} panels left)")
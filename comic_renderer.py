@@ -3,52 +3,284 @@ Comic Renderer Module
 Generates comic panel images using Pollinations API with safety controls
 """
 import os
+import queue
+import random
+import threading
+import time
+import urllib.parse
+import weakref
 import requests
-import textwrap
-from PIL import Image, ImageDraw, ImageFont
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ImageDraw
 from io import BytesIO
 import config
+import circuit_breaker
+import image_cache
+import image_encoder
+import prompt_builder
+import text_overlay
+import tracing
 
-def generate_image_from_prompt(prompt: str, panel_num: int = 1) -> Image.Image:
+# Shared HTTP session (created lazily, reused by every render in the process)
+_session = None
+_session_lock = threading.Lock()
+
+# Connection reuse statistics
+_http_stats = {
+    "requests": 0,
+    "connections_opened": 0,
+    "connections_reused": 0,
+    "bytes_downloaded": 0
+}
+_stats_lock = threading.Lock()
+_seen_sockets = weakref.WeakSet()
+_last_fetch = threading.local()
+
+# Trips after consecutive Pollinations failures so renders fail fast while it is down
+# (state shared through a file, so the app sidebar sees what render workers see)
+image_breaker = circuit_breaker.CircuitBreaker("pollinations", state_path=config.BREAKER_STATE_PATH)
+
+# Failed panels are saved as panel_<n>_placeholder.<ext>, never as panel_<n>
+PLACEHOLDER_SUFFIX = "_placeholder"
+PLACEHOLDER_WIDTH = 1024
+
+def get_http_session() -> requests.Session:
     """
-    Generate image from prompt using Pollinations API.
-    Safety suffix is automatically added by prompt_generator.py
+    Get the shared keep-alive HTTP session for Pollinations.
+    
+    The connection pool is sized to config.RENDER_CONCURRENCY so every
+    concurrent panel render can hold its own persistent connection.
+    
+    Returns:
+        requests.Session shared by all threads
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=4,
+                    pool_maxsize=max(1, config.RENDER_CONCURRENCY),
+                    max_retries=0
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers.update({"Connection": "keep-alive"})
+                _session = session
+    return _session
+
+def get_http_stats() -> dict:
+    """Get cumulative connection reuse statistics for the shared session"""
+    with _stats_lock:
+        return dict(_http_stats)
+
+def get_last_fetch_info() -> dict:
+    """
+    Get stats for the most recent fetch made by the calling thread.
+    
+    Returns:
+        Dictionary with 'reused' (bool), 'bytes' (int) and 'elapsed' (seconds),
+        or an empty dict if this thread has not fetched anything yet
+    """
+    return dict(getattr(_last_fetch, "info", {}))
+
+def _record_connection(response) -> bool:
+    """Record whether a response was served over an already-open socket"""
+    raw = response.raw
+    conn = getattr(raw, "connection", None) or getattr(raw, "_connection", None)
+    sock = getattr(conn, "sock", None)
+    
+    with _stats_lock:
+        _http_stats["requests"] += 1
+        reused = sock is not None and sock in _seen_sockets
+        if reused:
+            _http_stats["connections_reused"] += 1
+        else:
+            _http_stats["connections_opened"] += 1
+            if sock is not None:
+                _seen_sockets.add(sock)
+    return reused
+
+def fetch_image_bytes(url: str) -> bytes:
+    """
+    Download an image over the shared session.
+    
+    Uses separate connect/read timeouts and streams the body in chunks.
     
     Args:
-        prompt: Image generation prompt (already includes safety suffix)
+        url: Full image URL
+    
+    Returns:
+        Raw response bytes
+    
+    Raises:
+        requests.RequestException on network or HTTP errors
+    """
+    start = time.perf_counter()
+    session = get_http_session()
+    timeout = (config.HTTP_CONNECT_TIMEOUT, config.HTTP_READ_TIMEOUT)
+    
+    with session.get(url, timeout=timeout, stream=True) as response:
+        reused = _record_connection(response)
+        response.raise_for_status()
+        
+        buffer = BytesIO()
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            buffer.write(chunk)
+    
+    data = buffer.getvalue()
+    with _stats_lock:
+        _http_stats["bytes_downloaded"] += len(data)
+    _last_fetch.info = {
+        "reused": reused,
+        "bytes": len(data),
+        "elapsed": time.perf_counter() - start
+    }
+    return data
+
+def build_image_url(prompt: str, seed: int = None, width: int = None,
+                    height: int = None, model: str = None) -> str:
+    """
+    Build the Pollinations request URL for a prompt.
+    
+    Args:
+        prompt: Clean image prompt
+        seed: Optional generation seed
+        width: Optional image width in pixels
+        height: Optional image height in pixels
+        model: Optional Pollinations model name
+    
+    Returns:
+        Full request URL
+    """
+    safe_prompt = urllib.parse.quote(prompt)
+    url = f"{config.POLLINATIONS_API_URL}{safe_prompt}"
+    
+    params = {"seed": seed, "width": width, "height": height, "model": model}
+    params = {k: v for k, v in params.items() if v is not None}
+    if params:
+        url += "?" + urllib.parse.urlencode(params)
+    return url
+
+def _is_upstream_failure(error: Exception) -> bool:
+    """Timeouts, connection errors, 5xx/429 and non-image bodies count against the breaker"""
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code >= 500 or error.response.status_code == 429
+    return True
+
+def get_breaker_state() -> dict:
+    """Get the image service circuit breaker state (see CircuitBreaker.get_state)"""
+    return image_breaker.get_state()
+
+def generate_image_bytes(prompt: str, panel_num: int = 1, seed: int = None,
+                         width: int = None, height: int = None,
+                         model: str = None, new_variation: bool = False) -> bytes:
+    """
+    Generate an image from a prompt and return its encoded bytes undecoded.
+    
+    The prompt is reduced to its canonical form (see prompt_builder) before
+    it is sent, so equivalent prompts share one request and one cache entry.
+    Identical requests (same prompt, seed, size and model) are served from
+    the local image cache instead of being downloaded again. Callers that do
+    not change any pixels can write these bytes straight to disk.
+    
+    While the image service circuit breaker is open, uncached requests fail
+    immediately instead of waiting for the upstream timeout.
+    
+    Args:
+        prompt: Image generation prompt (safety suffix is ensured exactly once)
         panel_num: Panel number for logging
+        seed: Optional generation seed
+        width: Optional image width in pixels
+        height: Optional image height in pixels
+        model: Optional Pollinations model name
+        new_variation: Skip the cache and request a fresh image with a random seed
     
     Returns:
-        PIL Image object or None if failed
+        Raw encoded image bytes (usually JPEG) or None if failed
     """
     print(f"[*] Generating Panel {panel_num}...")
     
-    # Sanitize prompt: remove newlines and extra spaces
-    clean_prompt = " ".join(prompt.split())
+    with tracing.span("image.fetch", panel=panel_num) as span:
+        # Canonical prompt: normalized, deduplicated, safety suffix once, URL-length safe
+        clean_prompt = prompt_builder.canonical_prompt(prompt)
     
-    # Encode prompt for URL
-    import urllib.parse
-    safe_prompt = urllib.parse.quote(clean_prompt)
-    url = f"{config.POLLINATIONS_API_URL}{safe_prompt}"
+        # A seed picked at random here can never be requested again, so its
+        # image is not worth a cache entry
+        random_seed = new_variation and seed is None
+        if random_seed:
+            seed = random.randint(0, 2**31 - 1)
     
-    try:
-        response = requests.get(url, timeout=90)
-        response.raise_for_status()
-        img = Image.open(BytesIO(response.content))
-        print(f"    [✓] Panel {panel_num} generated successfully")
-        return img
-    except Exception as e:
-        print(f"    [✗] Panel {panel_num} failed: {e}")
-        print(f"    [DEBUG] URL was: {url[:100]}...") # Print start of URL for debug
+        size = (width, height) if width or height else None
+        cache_key = image_cache.make_key(clean_prompt, seed=seed, size=size, model=model)
+    
+        if not new_variation:
+            cached = image_cache.lookup(cache_key)
+            span.set(cache_hit=bool(cached))
+            if cached:
+                print(f"    [✓] Panel {panel_num} served from cache")
+                span.set(bytes=len(cached))
+                return cached
+    
+        if not image_breaker.allow_request():
+            retry_in = image_breaker.get_state()["retry_in"]
+            print(f"    [✗] Panel {panel_num} skipped: image service unavailable (retry in {retry_in:.0f}s)")
+            span.fail("breaker_open")
+            return None
+    
+        url = build_image_url(clean_prompt, seed=seed, width=width, height=height, model=model)
+    
+        try:
+            data = fetch_image_bytes(url)
+            # Parse the header only (no pixel decode) to reject non-image responses
+            Image.open(BytesIO(data))
+            image_breaker.record_success()
+            if not random_seed:
+                image_cache.store(cache_key, data)
+            info = get_last_fetch_info()
+            span.set(bytes=len(data), connection_reused=bool(info.get("reused")))
+            connection = "reused connection" if info.get("reused") else "new connection"
+            print(f"    [✓] Panel {panel_num} generated successfully ({connection}, {info.get('elapsed', 0):.1f}s)")
+            return data
+        except Exception as e:
+            if _is_upstream_failure(e):
+                image_breaker.record_failure()
+            else:
+                # Our request was bad, not the service: leave the circuit as it is
+                image_breaker.release_probe()
+            print(f"    [✗] Panel {panel_num} failed: {e}")
+            span.fail(type(e).__name__)
+            print(f"    [DEBUG] URL was: {url[:100]}...") # Print start of URL for debug
+            return None
+
+def generate_image_from_prompt(prompt: str, panel_num: int = 1, **kwargs) -> Image.Image:
+    """
+    Generate image from prompt using Pollinations API.
+    Safety suffix is ensured by prompt_builder
+    
+    Args:
+        prompt: Image generation prompt (already includes safety suffix)
+        panel_num: Panel number for logging
+        **kwargs: seed, width, height, model, new_variation (see generate_image_bytes)
+    
+    Returns:
+        PIL Image object or None if failed
+    """
+    data = generate_image_bytes(prompt, panel_num, **kwargs)
+    if not data:
         return None
+    return Image.open(BytesIO(data))
 
-def add_dialogue_overlay(image: Image.Image, dialogue: str) -> Image.Image:
+def add_dialogue_overlay(image: Image.Image, dialogue: str, copy: bool = False) -> Image.Image:
     """
     Add dialogue text box to comic panel.
     
     Args:
-        image: PIL Image
+        image: PIL Image (drawn on in place unless copy is True)
         dialogue: Text to display
+        copy: Leave the original image untouched and draw on a copy
     
     Returns:
         Image with dialogue overlay
@@ -56,99 +288,243 @@ def add_dialogue_overlay(image: Image.Image, dialogue: str) -> Image.Image:
     if not dialogue or not dialogue.strip():
         return image
     
-    # Create a copy to avoid modifying original
-    img = image.copy()
-    draw = ImageDraw.Draw(img)
-    width, height = img.size
+    with tracing.span("image.overlay"):
+        if copy:
+            image = image.copy()
+        return text_overlay.draw_dialogue_box(image, dialogue)
+
+def is_placeholder(path: str) -> bool:
+    """Check whether a panel path is a locally drawn placeholder"""
+    return bool(path) and os.path.splitext(os.path.basename(path))[0].endswith(PLACEHOLDER_SUFFIX)
+
+def render_placeholder(panel_num: int, dialogue: str = "") -> Image.Image:
+    """
+    Draw a stand-in panel locally when the image could not be generated.
     
-    # Load font
+    Args:
+        panel_num: Panel number shown on the placeholder
+        dialogue: Optional dialogue drawn as usual so the story still reads
+    
+    Returns:
+        PIL Image sized to config.PANEL_ASPECT_RATIO
+    """
     try:
-        font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 24)
-    except:
-        try:
-            font = ImageFont.truetype("arial.ttf", 24)
-        except:
-            font = ImageFont.load_default()
-    
-    # Wrap text
-    wrapped_text = textwrap.fill(dialogue, width=45)
-    
-    # Calculate text size
-    bbox = draw.textbbox((0, 0), wrapped_text, font=font)
-    text_w, text_h = bbox[2] - bbox[0], bbox[3] - bbox[1]
-    
-    # Box dimensions
-    padding = 25
-    box_w = min(width - 40, text_w + (padding * 2))
-    box_h = text_h + (padding * 2)
-    box_x = (width - box_w) // 2
-    box_y = height - box_h - 30
-    
-    # Draw white box with black border
-    draw.rectangle(
-        [(box_x, box_y), (box_x + box_w, box_y + box_h)],
-        fill="white",
-        outline="black",
-        width=4
-    )
+        ratio_w, ratio_h = (float(v) for v in config.PANEL_ASPECT_RATIO.split(":"))
+    except ValueError:
+        ratio_w, ratio_h = 16.0, 9.0
+    width = PLACEHOLDER_WIDTH
+    height = int(round(width * ratio_h / ratio_w))
     
-    # Draw text (centered)
-    text_x = box_x + (box_w - text_w) // 2
-    text_y = box_y + padding
+    img = Image.new("RGB", (width, height), (230, 230, 235))
+    draw = ImageDraw.Draw(img)
+    draw.rectangle([8, 8, width - 9, height - 9], outline=(160, 160, 170), width=4)
     
-    draw.multiline_text(
-        (text_x, text_y),
-        wrapped_text,
-        fill="black",
-        font=font,
-        align="center"
-    )
+    font = text_overlay.get_dialogue_font()
+    label = f"Panel {panel_num}: image unavailable"
+    label_width = text_overlay.measure_text(label, font)
+    draw.text(((width - label_width) / 2, height / 3), label, fill=(110, 110, 120), font=font)
     
-    return img
+    return add_dialogue_overlay(img, dialogue)
 
-def render_comic_panels(prompts: list, output_dir: str = "comic_output") -> list:
+def render_panel(prompt_data: dict, output_dir: str, default_panel: int = 1) -> str:
     """
-    Render all comic panels from prompts.
+    Render a single comic panel and save it to disk.
     
     Args:
-        prompts: List of prompt dictionaries from prompt_generator
+        prompt_data: Prompt dictionary from prompt_generator
+        output_dir: Directory to save the image
+        default_panel: Panel number to use if prompt_data has none
+    
+    Returns:
+        Saved image path, a placeholder path if generation failed and
+        config.PLACEHOLDER_PANELS is on, or None
+    """
+    panel_num = prompt_data.get("panel", default_panel)
+    image_prompt = prompt_data.get("image_prompt", "")
+    dialogue = prompt_data.get("dialogue", "")
+    
+    with tracing.span("render.panel", panel=panel_num):
+        # Generate image
+        data = generate_image_bytes(image_prompt, panel_num)
+        
+        base_path = os.path.join(output_dir, f"panel_{panel_num}")
+        
+        if not data:
+            if not config.PLACEHOLDER_PANELS:
+                print(f"    [✗] Panel {panel_num} skipped due to generation failure")
+                return None
+            save_path = image_encoder.save_image(render_placeholder(panel_num, dialogue), base_path + PLACEHOLDER_SUFFIX)
+            print(f"    [WARN] Panel {panel_num} failed, saved placeholder {save_path}")
+            return save_path
+        
+        if dialogue and dialogue.strip():
+            # Pixels change: decode, overlay and re-encode with the configured encoder
+            with tracing.span("image.decode", bytes=len(data)):
+                img = Image.open(BytesIO(data))
+                img.load()
+            img = add_dialogue_overlay(img, dialogue)
+            with tracing.span("image.encode_save") as span:
+                save_path = image_encoder.save_image(img, base_path)
+                span.set(bytes=os.path.getsize(save_path))
+        else:
+            # No pixel changes: keep the original bytes
+            with tracing.span("image.encode_save", bytes=len(data), reencoded=False):
+                save_path = image_encoder.write_image_bytes(data, base_path)
+    
+    # A real image replaces any placeholder left by an earlier failure
+    placeholder = image_encoder.find_image(base_path + PLACEHOLDER_SUFFIX)
+    if placeholder:
+        os.remove(placeholder)
+    
+    print(f"    [✓] Saved to {save_path}")
+    return save_path
+
+def render_panel_stream(prompt_iter, output_dir: str = "comic_output",
+                        progress_callback=None, max_workers: int = None,
+                        should_cancel=None, expected_total: int = None) -> list:
+    """
+    Render panels as their prompts arrive from an iterator.
+    
+    The iterator is consumed on a background thread and each prompt is
+    submitted to the render pool as soon as it is produced, so panel 1 can
+    be downloading while later prompts are still being written (see
+    prompt_generator.stream_comic_prompts).
+    
+    Args:
+        prompt_iter: Iterable of prompt dictionaries (a list or a generator)
         output_dir: Directory to save images
+        progress_callback: Optional callable(completed, total, panel_num, path),
+            invoked from the calling thread as each panel finishes (path is None or a
+            placeholder on failure, see is_placeholder)
+        max_workers: Pool size (defaults to config.RENDER_CONCURRENCY)
+        should_cancel: Optional callable checked after each panel; when it
+            returns True, panels that have not started yet are dropped and the
+            iterator is closed at its next prompt (waited for before returning)
+        expected_total: Panel count reported to progress_callback until the
+            iterator is exhausted (defaults to config.NUM_PANELS)
     
     Returns:
-        List of image file paths
+        List of image file paths, ordered by panel number
+    
+    Raises:
+        The iterator's exception, after the panels already submitted finish
     """
     os.makedirs(output_dir, exist_ok=True)
-    image_paths = []
+    workers = max(1, max_workers or config.RENDER_CONCURRENCY)
+    expected_total = expected_total or config.NUM_PANELS
     
-    for prompt_data in prompts:
-        panel_num = prompt_data.get("panel", 1)
-        image_prompt = prompt_data.get("image_prompt", "")
-        dialogue = prompt_data.get("dialogue", "")
+    done_queue = queue.Queue()
+    cancelled = threading.Event()
+    submit_lock = threading.Lock()   # cancelled is never set between its check and a submit
+    futures = []
+    results = {}
+    
+    # Panels and the prompt iterator run on other threads; carry the trace (comic ID) over
+    traced_render = tracing.bind(render_panel)
+    
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="panel") as executor:
+        def produce():
+            count, error = 0, None
+            try:
+                for i, prompt_data in enumerate(prompt_iter):
+                    with submit_lock:
+                        if cancelled.is_set():
+                            break
+                        panel_num = prompt_data.get("panel", i + 1)
+                        future = executor.submit(traced_render, prompt_data, output_dir, i + 1)
+                        futures.append(future)
+                        future.add_done_callback(lambda f, n=panel_num: done_queue.put((n, f)))
+                        count += 1
+                if cancelled.is_set() and hasattr(prompt_iter, "close"):
+                    prompt_iter.close()  # Stop generating prompts nobody will render
+            except Exception as e:
+                error = e
+            done_queue.put((None, (count, error)))
         
-        # Generate image
-        img = generate_image_from_prompt(image_prompt, panel_num)
+        producer = threading.Thread(target=tracing.bind(produce), name="panel-prompts", daemon=True)
+        producer.start()
         
-        if img:
-            # Add dialogue
-            if dialogue:
-                img = add_dialogue_overlay(img, dialogue)
-            
-            # Save
-            save_path = os.path.join(output_dir, f"panel_{panel_num}.png")
-            img.save(save_path)
-            image_paths.append(save_path)
-            print(f"    [✓] Saved to {save_path}")
-        else:
-            print(f"    [✗] Panel {panel_num} skipped due to generation failure")
+        submitted, error, completed = None, None, 0
+        try:
+            while submitted is None or completed < submitted:
+                panel_num, item = done_queue.get()
+                if panel_num is None:
+                    # Iterator exhausted (or failed): now the real total is known
+                    submitted, error = item
+                    continue
+                
+                completed += 1
+                try:
+                    path = item.result()
+                except Exception as e:
+                    print(f"    [✗] Panel {panel_num} failed: {e}")
+                    path = None
+                results[panel_num] = path
+                
+                if progress_callback:
+                    total = submitted if submitted is not None else max(expected_total, len(futures))
+                    progress_callback(completed, total, panel_num, path)
+                
+                if should_cancel and should_cancel():
+                    with submit_lock:
+                        cancelled.set()
+                        dropped = sum(1 for f in futures if f.cancel())
+                    print(f"    [!] Render cancelled, {dropped} queued panel(s) dropped")
+                    break
+        finally:
+            # Stop the producer before the pool shuts down, and before the caller
+            # finishes the job, so no prompt is recorded or submitted afterwards
+            with submit_lock:
+                cancelled.set()
+            producer.join()
+    
+    if error is not None:
+        raise error
+    return [results[num] for num in sorted(results) if results[num]]
+
+def render_comic_panels(prompts: list, output_dir: str = "comic_output",
+                        progress_callback=None, max_workers: int = None,
+                        should_cancel=None) -> list:
+    """
+    Render all comic panels from prompts concurrently.
+    
+    Panels are fetched through a bounded thread pool, so total time approaches
+    the slowest single panel instead of the sum of all of them. A failed panel
+    is skipped (or replaced by a placeholder) without affecting the others.
+    
+    Args:
+        prompts: List of prompt dictionaries from prompt_generator
+        output_dir: Directory to save images
+        progress_callback: Optional callable(completed, total, panel_num, path),
+            invoked from the calling thread as each panel finishes (path is None or a
+            placeholder on failure, see is_placeholder)
+        max_workers: Pool size (defaults to config.RENDER_CONCURRENCY)
+        should_cancel: Optional callable checked after each panel; when it
+            returns True, panels that have not started yet are dropped
     
-    return image_paths
+    Returns:
+        List of image file paths, ordered by panel number
+    """
+    total = len(prompts)
+    if total == 0:
+        os.makedirs(output_dir, exist_ok=True)
+        return []
+    
+    return render_panel_stream(
+        prompts,
+        output_dir,
+        progress_callback=progress_callback,
+        max_workers=min(max_workers or config.RENDER_CONCURRENCY, total),
+        should_cancel=should_cancel,
+        expected_total=total
+    )
 
 if __name__ == "__main__":
     # Test
     test_prompts = [
         {
             "panel": 1,
-            "image_prompt": "School classroom, student looking worried. " + config.SAFETY_SUFFIX,
+            "image_prompt": prompt_builder.build_image_prompt("School classroom, student looking worried."),
             "dialogue": "Oh no, I'm late!"
         }
     ]
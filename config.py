@@ -3,6 +3,8 @@ Configuration module for Gandhinagar Comic AI
 Loads all API keys and constants from environment variables
 """
 import os
+import re
+import sys
 try:
     from dotenv import load_dotenv
     load_dotenv()
@@ -26,6 +28,9 @@ SAFETY_SUFFIX = (
     "no copyrighted characters or logos, original characters only, all-ages friendly"
 )
 
+# Longest Pollinations request URL we send (prompts are shortened to fit)
+MAX_PROMPT_URL_LENGTH = int(os.getenv("MAX_PROMPT_URL_LENGTH", "2000"))
+
 # Directory Paths
 BASE_DIR = "gandhinagar_school_project"
 CHARACTERS_DIR = os.path.join(BASE_DIR, "data", "1_characters", "students")
@@ -33,11 +38,124 @@ IMAGES_DIR = os.path.join(BASE_DIR, "data", "4_images")
 VECTOR_DB_DIR = os.path.join(BASE_DIR, "vector_db")
 STORIES_DIR = os.path.join(BASE_DIR, "stories")
 COMICS_DIR = os.path.join(BASE_DIR, "comics")
+CACHE_DIR = os.path.join(BASE_DIR, "cache")
+JOB_QUEUE_DB = os.path.join(BASE_DIR, "job_queue.sqlite3")
+STORY_INDEX_JOURNAL = os.path.join(BASE_DIR, "story_index_pending.jsonl")
+IMAGE_CACHE_DIR = os.path.join(CACHE_DIR, "images")
+THUMBNAIL_DIR = os.path.join(CACHE_DIR, "thumbnails")
+PHASH_INDEX_PATH = os.path.join(CACHE_DIR, "phash_index.json")
+IMAGE_EMBEDDING_INDEX_PATH = os.path.join(CACHE_DIR, "image_embeddings.npz")
+BREAKER_STATE_PATH = os.path.join(CACHE_DIR, "breaker_pollinations.json")
+
+# Generated image cache size limit (least recently used images are evicted first)
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_MB", "512")) * 1024 * 1024
+
+# Gallery thumbnails (longest edge in pixels, ~2x the displayed width for sharp previews)
+THUMBNAIL_SIZE = int(os.getenv("THUMBNAIL_SIZE", "400"))
+THUMBNAIL_CACHE_MAX_BYTES = int(os.getenv("THUMBNAIL_CACHE_MAX_MB", "128")) * 1024 * 1024
 
 # Comic Generation Settings
 NUM_PANELS = 6
 PANEL_ASPECT_RATIO = "16:9"
 
+# Width of each panel cell on the composed comic page (height follows PANEL_ASPECT_RATIO)
+PAGE_PANEL_WIDTH = int(os.getenv("PAGE_PANEL_WIDTH", "640"))
+
+# Dialogue overlay font (first loadable path wins, then Pillow's default font)
+DIALOGUE_FONT_SIZE = 24
+DIALOGUE_FONT_PATHS = [
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+    "arial.ttf"
+]
+
+# Encoding for panels whose pixels change (dialogue overlay): "png", "webp" or "jpeg"
+# Images without changes are written with their original bytes
+OUTPUT_IMAGE_FORMAT = os.getenv("OUTPUT_IMAGE_FORMAT", "png").lower()
+OUTPUT_IMAGE_QUALITY = int(os.getenv("OUTPUT_IMAGE_QUALITY", "85"))
+
+# Number of panels rendered in parallel (each panel is one Pollinations request)
+RENDER_CONCURRENCY = int(os.getenv("RENDER_CONCURRENCY", "6"))
+
+# Background rendering (job queue + render_worker.py)
+BACKGROUND_RENDERING = os.getenv("BACKGROUND_RENDERING", "true").lower() in ("1", "true", "yes")
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "2"))
+WORKER_POLL_INTERVAL = float(os.getenv("WORKER_POLL_INTERVAL", "1.0"))
+
+# Reference image import: longest edge after downscaling, decode threads, and the
+# largest perceptual-hash distance (bits out of 64) treated as a duplicate
+REFERENCE_IMAGE_SIZE = int(os.getenv("REFERENCE_IMAGE_SIZE", "1024"))
+IMAGE_IMPORT_WORKERS = int(os.getenv("IMAGE_IMPORT_WORKERS", "4"))
+PHASH_MAX_DISTANCE = int(os.getenv("PHASH_MAX_DISTANCE", "3"))
+
+# Optional CLIP image encoder exported to ONNX (needs onnxruntime); a built-in
+# color/layout descriptor indexes images when unset, and character suggestions are hidden
+CLIP_ONNX_MODEL = os.getenv("CLIP_ONNX_MODEL", "")
+
+# Background character portraits: attempts per portrait and base delay between retries (seconds, doubles each retry)
+PORTRAIT_MAX_ATTEMPTS = int(os.getenv("PORTRAIT_MAX_ATTEMPTS", "3"))
+PORTRAIT_RETRY_DELAY = float(os.getenv("PORTRAIT_RETRY_DELAY", "10"))
+
+# Pollinations HTTP timeouts in seconds (connect fails fast, read allows slow renders)
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "90"))
+
+# Circuit breaker: consecutive upstream failures before failing fast, and seconds before probing again
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "3"))
+BREAKER_RESET_TIMEOUT = float(os.getenv("BREAKER_RESET_TIMEOUT", "30"))
+
+# Start rendering panels in the background as soon as prompts are approved (opt-in)
+SPECULATIVE_RENDERING = os.getenv("SPECULATIVE_RENDERING", "false").lower() in ("1", "true", "yes")
+# Seconds Story Lab waits for a busy worker to pick up the prompt job before writing the
+# prompts itself, and seconds it waits for the streamed prompts at most
+SPECULATIVE_CLAIM_TIMEOUT = float(os.getenv("SPECULATIVE_CLAIM_TIMEOUT", "5"))
+SPECULATIVE_PROMPT_TIMEOUT = float(os.getenv("SPECULATIVE_PROMPT_TIMEOUT", "180"))
+
+# Save a locally drawn placeholder for failed panels so the comic layout still completes
+PLACEHOLDER_PANELS = os.getenv("PLACEHOLDER_PANELS", "true").lower() in ("1", "true", "yes")
+
+# Shared character/story stores: change journal size before rotation, and seconds
+# between full directory rescans (picks up files edited outside the app)
+STORE_JOURNAL_MAX_BYTES = int(os.getenv("STORE_JOURNAL_MAX_KB", "1024")) * 1024
+STORE_RESCAN_SECONDS = float(os.getenv("STORE_RESCAN_SECONDS", "300"))
+
+# Write-behind story indexing: stories embedded per Chroma write, and seconds to
+# wait after a save so a burst of saves is indexed together
+STORY_INDEX_BATCH_SIZE = int(os.getenv("STORY_INDEX_BATCH_SIZE", "16"))
+STORY_INDEX_BATCH_DELAY = float(os.getenv("STORY_INDEX_BATCH_DELAY", "1.0"))
+# Failed batch attempts before stories are indexed one by one (and bad ones marked failed)
+STORY_INDEX_MAX_RETRIES = int(os.getenv("STORY_INDEX_MAX_RETRIES", "3"))
+
+# Documents per Chroma add/delete call for batch indexing and bulk imports
+RAG_WRITE_BATCH_SIZE = int(os.getenv("RAG_WRITE_BATCH_SIZE", "256"))
+
+# Story chunk size in characters (all-MiniLM-L6-v2 reads at most 256 tokens, ~1000 characters)
+STORY_CHUNK_CHARS = int(os.getenv("STORY_CHUNK_CHARS", "800"))
+
+# Seconds the app reuses the character/story lists between reruns. Writes made by
+# this process invalidate them immediately; the TTL bounds staleness from other processes
+CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", "30"))
+
+# Headless batch generation (batch_comics.py): ideas processed at the same time per stage
+BATCH_STORY_WORKERS = int(os.getenv("BATCH_STORY_WORKERS", "2"))
+BATCH_PROMPT_WORKERS = int(os.getenv("BATCH_PROMPT_WORKERS", "2"))
+BATCH_RENDER_WORKERS = int(os.getenv("BATCH_RENDER_WORKERS", "1"))
+
+# Tracing: per-stage spans (durations, payload sizes, cache hits) correlated by request and comic ID.
+# Spans are appended to a JSON lines log and aggregated into a Prometheus text file every
+# TRACE_EXPORT_INTERVAL seconds; an empty path disables that output. Each process writes
+# its own metrics file: "{role}" in the path becomes the entry point (app, render_worker,
+# batch_comics, ...) and "{pid}" the process ID
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() in ("1", "true", "yes")
+TRACE_LOG_PATH = os.getenv("TRACE_LOG_PATH", os.path.join(BASE_DIR, "traces.jsonl"))
+TRACE_LOG_MAX_BYTES = int(os.getenv("TRACE_LOG_MAX_MB", "20")) * 1024 * 1024
+PROCESS_ROLE = re.sub(r"[^A-Za-z0-9_]", "", os.path.splitext(os.path.basename(sys.argv[0] if sys.argv else ""))[0]) or "python"
+TRACE_METRICS_PATH = (
+    os.getenv("TRACE_METRICS_PATH", os.path.join(BASE_DIR, "metrics.{role}.prom"))
+    .replace("{role}", PROCESS_ROLE)
+    .replace("{pid}", str(os.getpid()))
+)
+TRACE_EXPORT_INTERVAL = float(os.getenv("TRACE_EXPORT_INTERVAL", "10"))
+
 # Validation
 def validate_config():
     """Validate that required configuration is present. Now only warns if missing keys."""
@@ -0,0 +1,424 @@
+"""
+Data Store Module
+Process-safe JSON record stores: atomic writes, advisory locking and a change journal
+that readers tail to refresh their caches without rescanning the directory
+"""
+import os
+import json
+import copy
+import gzip
+import time
+import uuid
+import threading
+from contextlib import contextmanager
+import config
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # Not available on Windows; msvcrt is used instead
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+JOURNAL_FILENAME = ".journal.jsonl"
+LOCK_FILENAME = ".lock"
+
+_listeners = []
+
+def is_valid_id(record_id) -> bool:
+    """Check that a record ID names a single file/folder inside its store (no separators, "." or "..")"""
+    return (isinstance(record_id, str) and bool(record_id)
+            and os.path.basename(record_id) == record_id and record_id not in (".", ".."))
+
+def add_change_listener(callback):
+    """
+    Call callback(key) after this process changes shared data.
+
+    key is the absolute path of the store directory (or other file) that changed.
+
+    Args:
+        callback: Function taking the changed key
+    """
+    if callback not in _listeners:
+        _listeners.append(callback)
+
+def notify_change(path: str):
+    """Tell listeners that data under path was changed by this process"""
+    key = os.path.abspath(path)
+    for callback in list(_listeners):
+        try:
+            callback(key)
+        except Exception as e:
+            print(f"[WARN] Change listener failed: {e}")
+
+def write_json_atomic(path: str, data) -> str:
+    """
+    Write JSON through a temp file and rename it into place.
+
+    Readers see either the old or the new file, never a partial one.
+
+    Args:
+        path: Destination path
+        data: JSON-serializable data
+
+    Returns:
+        path
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return path
+
+def _open_text(path: str, mode: str):
+    """Open a text file, gzip-compressed when the name ends in .gz"""
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+def iter_jsonl(path: str):
+    """
+    Read a JSONL file (optionally .gz) one record at a time.
+
+    Args:
+        path: File path
+
+    Yields:
+        Parsed records; blank lines are skipped
+
+    Raises:
+        ValueError with the line number if a line is not valid JSON
+    """
+    with _open_text(path, "r") as f:
+        for line_num, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"{path}:{line_num}: invalid JSON ({e})")
+
+def write_jsonl(path: str, records) -> int:
+    """
+    Write records as compact JSONL (gzip-compressed if path ends in .gz), atomically.
+
+    Args:
+        path: Destination path
+        records: Iterable of JSON-serializable records
+
+    Returns:
+        Number of records written
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # Keep the .gz suffix on the temp file so it is compressed too
+    tmp_path = f"{path[:-3]}.{uuid.uuid4().hex[:8]}.tmp.gz" if path.endswith(".gz") else f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    count = 0
+    try:
+        with _open_text(tmp_path, "w") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+                count += 1
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return count
+
+@contextmanager
+def file_lock(lock_path: str):
+    """
+    Hold an exclusive advisory lock on a lock file (blocks until acquired).
+
+    Uses flock on POSIX and msvcrt.locking on Windows; it coordinates
+    processes that use this function, not arbitrary writers.
+
+    Args:
+        lock_path: Path of the lock file (created if missing)
+    """
+    os.makedirs(os.path.dirname(lock_path) or ".", exist_ok=True)
+    with open(lock_path, 'a+') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        elif msvcrt is not None:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    time.sleep(0.05)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            elif msvcrt is not None:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+class JsonStore:
+    """
+    Directory of JSON records shared by several processes.
+
+    Writers take the store lock, write the record atomically and append a
+    line to the store's change journal. Readers keep an in-memory copy of
+    every record and refresh it by reading only the journal lines added
+    since their last refresh; a full directory scan happens only on first
+    use, after journal rotation, or every config.STORE_RESCAN_SECONDS to
+    pick up files changed outside the app.
+
+    all() hands out the cached record dictionaries themselves (no copy), so
+    callers must copy a record before modifying it.
+
+    Layouts:
+        flat:   <root>/<id>.json
+        nested: <root>/<id>/metadata.json (plus legacy <root>/*.json files)
+    """
+
+    def __init__(self, root: str, nested: bool = False):
+        self.root = root
+        self.nested = nested
+        self.journal_path = os.path.join(root, JOURNAL_FILENAME)
+        self.lock_path = os.path.join(root, LOCK_FILENAME)
+        self._mutex = threading.Lock()
+        self._records = None
+        self._snapshot = None   # list of self._records values, rebuilt only after a change
+        self._journal_id = None
+        self._offset = 0
+        self._scanned_at = 0.0
+
+    def path_for(self, record_id: str) -> str:
+        """
+        Get the file path of a record.
+
+        Raises:
+            ValueError if record_id could point outside the store (see is_valid_id)
+        """
+        if not is_valid_id(record_id):
+            raise ValueError(f"Invalid record ID: {record_id!r}")
+        if self.nested:
+            return os.path.join(self.root, record_id, "metadata.json")
+        return os.path.join(self.root, f"{record_id}.json")
+
+    def _append_journal(self, op: str, record_ids: list):
+        """Append one change entry per record (caller holds the store lock)"""
+        if os.path.exists(self.journal_path) and os.path.getsize(self.journal_path) > config.STORE_JOURNAL_MAX_BYTES:
+            # Rotate to a fresh file; readers notice the new inode and rescan
+            write_tmp = f"{self.journal_path}.{uuid.uuid4().hex[:8]}.tmp"
+            open(write_tmp, 'w').close()
+            os.replace(write_tmp, self.journal_path)
+
+        now, pid = time.time(), os.getpid()
+        with open(self.journal_path, 'a', encoding='utf-8') as f:
+            f.write("".join(
+                json.dumps({"op": op, "id": record_id, "ts": now, "pid": pid}) + "\n"
+                for record_id in record_ids
+            ))
+
+    def put(self, record: dict) -> str:
+        """
+        Create or replace a record.
+
+        Args:
+            record: Dictionary with an "id" key
+
+        Returns:
+            Path of the written file
+        """
+        return self.put_many([record])[0]
+
+    def put_many(self, records: list) -> list:
+        """
+        Create or replace several records under one lock acquisition.
+
+        Args:
+            records: Dictionaries with an "id" key
+
+        Returns:
+            Paths of the written files
+        """
+        paths = []
+        os.makedirs(self.root, exist_ok=True)
+        with file_lock(self.lock_path):
+            for record in records:
+                paths.append(write_json_atomic(self.path_for(record["id"]), record))
+            self._append_journal("put", [record["id"] for record in records])
+        with self._mutex:
+            if self._records is not None:
+                for record in records:
+                    self._records[record["id"]] = copy.deepcopy(record)
+                self._snapshot = None
+        notify_change(self.root)
+        return paths
+
+    def delete(self, record_id: str) -> bool:
+        """
+        Delete a record file.
+
+        Args:
+            record_id: Record ID
+
+        Returns:
+            True if a file was removed
+        """
+        return self.delete_many([record_id]) == 1
+
+    def delete_many(self, record_ids: list) -> int:
+        """
+        Delete several record files under one lock acquisition.
+
+        Args:
+            record_ids: Record IDs
+
+        Returns:
+            Number of files removed
+        """
+        removed = 0
+        os.makedirs(self.root, exist_ok=True)
+        with file_lock(self.lock_path):
+            for record_id in record_ids:
+                path = self.path_for(record_id)
+                if os.path.exists(path):
+                    os.remove(path)
+                    removed += 1
+            self._append_journal("delete", list(record_ids))
+        with self._mutex:
+            if self._records is not None:
+                for record_id in record_ids:
+                    self._records.pop(record_id, None)
+                self._snapshot = None
+        notify_change(self.root)
+        return removed
+
+    def get(self, record_id: str) -> dict:
+        """Read one record from disk, or None"""
+        return self._read(self.path_for(record_id))
+
+    def _read(self, path: str) -> dict:
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"[WARN] Failed to load {path}: {e}")
+            return None
+
+    def _journal_identity(self):
+        try:
+            st = os.stat(self.journal_path)
+            return (st.st_ino, st.st_dev), st.st_size
+        except OSError:
+            return None, 0
+
+    def _scan_locked(self):
+        """Load every record from disk and start tailing the journal from its current end"""
+        journal_id, size = self._journal_identity()
+        records = {}
+        if os.path.exists(self.root):
+            for name in os.listdir(self.root):
+                item_path = os.path.join(self.root, name)
+                if self.nested and os.path.isdir(item_path):
+                    record = self._read(os.path.join(item_path, "metadata.json"))
+                    if record is not None:
+                        records[record.get("id", name)] = record
+                elif name.endswith(".json"):
+                    record = self._read(item_path)
+                    if record is not None:
+                        records[record.get("id", name[:-5])] = record
+        self._records = records
+        self._snapshot = None
+        self._journal_id, self._offset = journal_id, size
+        self._scanned_at = time.monotonic()
+
+    def _tail_locked(self):
+        """Apply journal entries written since the last refresh"""
+        journal_id, size = self._journal_identity()
+        if journal_id != self._journal_id or size < self._offset:
+            self._scan_locked()
+            return
+        if size == self._offset:
+            return
+
+        with open(self.journal_path, 'r', encoding='utf-8') as f:
+            f.seek(self._offset)
+            chunk = f.read(size - self._offset)
+        # Only consume complete lines; a partial last line is read next time
+        consumed = chunk.rfind("\n") + 1
+        self._offset += len(chunk[:consumed].encode('utf-8'))
+
+        changed = set()
+        for line in chunk[:consumed].splitlines():
+            try:
+                changed.add(json.loads(line)["id"])
+            except (ValueError, KeyError):
+                continue
+        for record_id in changed:
+            record = self._read(self.path_for(record_id))
+            if record is None:
+                self._records.pop(record_id, None)
+            else:
+                self._records[record_id] = record
+        if changed:
+            self._snapshot = None
+
+    def all(self) -> list:
+        """
+        Get every record, refreshed from the journal.
+
+        When nothing changed since the last call this costs one journal
+        stat and a list copy; records are not copied.
+
+        Returns:
+            New list of the cached record dictionaries (read-only: copy a
+            record before modifying it)
+        """
+        with self._mutex:
+            stale = time.monotonic() - self._scanned_at > config.STORE_RESCAN_SECONDS
+            if self._records is None or stale:
+                self._scan_locked()
+            else:
+                self._tail_locked()
+            if self._snapshot is None:
+                self._snapshot = list(self._records.values())
+            return list(self._snapshot)
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_store(root: str, nested: bool = False) -> JsonStore:
+    """
+    Get the shared store for a directory (one instance per process).
+
+    Args:
+        root: Store directory
+        nested: Records live in <root>/<id>/metadata.json
+
+    Returns:
+        JsonStore
+    """
+    key = (os.path.abspath(root), nested)
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = JsonStore(root, nested=nested)
+        return _stores[key]
+
+if __name__ == "__main__":
+    # Test
+    store = get_store(config.STORIES_DIR)
+    print(f"{len(store.all())} stories in {store.root}")
@@ -7,7 +7,10 @@ from PIL import Image
 import google.generativeai as genai
 import config
 import comic_renderer
+import image_encoder
+import prompt_builder
 import rag_index
+import tracing
 
 genai.configure(api_key=config.GOOGLE_API_KEY)
 
@@ -30,10 +33,13 @@ def analyze_image(image_file, prompt: str) -> str:
             img = image_file
         
         # Use Gemini Vision model
-        model = genai.GenerativeModel(config.GEMINI_MODEL)
-        
-        response = model.generate_content([prompt, img])
-        return response.text.strip()
+        with tracing.span("vision.llm", prompt_bytes=len(prompt.encode("utf-8"))) as span:
+            model = genai.GenerativeModel(config.GEMINI_MODEL)
+            
+            response = model.generate_content([prompt, img])
+            answer = response.text.strip()
+            span.set(bytes=len(answer.encode("utf-8")))
+        return answer
     
     except Exception as e:
         return f"Error analyzing image: {e}"
@@ -83,6 +89,7 @@ Be specific and thorough:"""
     
     return analyze_image(image_file, prompt)
 
+@tracing.traced("vision.recreate")
 def recreate_with_characters(image_file, character_names: list = None, custom_prompt: str = None) -> dict:
     """
     Recreate the image with user's own characters from the database.
@@ -160,17 +167,7 @@ Provide a concise summary in 2-3 sentences that could be used to recreate a simi
         for char_data in character_data_list[:3]:  # Max 3 characters
             char_name = char_data.get("name", "character")
             
-            visual_desc = ""
-            if "visual_description" in char_data:
-                visual_desc = char_data["visual_description"]
-            elif "visual_features" in char_data:
-                features = char_data["visual_features"]
-                parts = []
-                if isinstance(features, dict):
-                    for key, value in features.items():
-                        if isinstance(value, str):
-                            parts.append(value)
-                visual_desc = ", ".join(parts)
+            visual_desc = prompt_builder.describe_character(char_data)
             
             role = char_data.get("role", "student")
             character_descriptions.append(f"{char_name} ({role}): {visual_desc}")
@@ -178,28 +175,24 @@ Provide a concise summary in 2-3 sentences that could be used to recreate a simi
         # Step 4: Create image generation prompt
         char_names_str = ", ".join([cd.get("name", "character") for cd in character_data_list[:3]])
         
-        image_prompt = f"""Recreate this image style with characters {char_names_str}.
-
-ORIGINAL STYLE: {style_description}
-
-CHARACTERS TO INCLUDE:
-{'; '.join(character_descriptions)}
-
-{custom_prompt if custom_prompt else ''}
-
-Indian school setting, school uniforms. {config.SAFETY_SUFFIX}"""
+        image_prompt = prompt_builder.build_image_prompt(
+            f"Recreate this image style with characters {char_names_str}.",
+            f"ORIGINAL STYLE: {style_description}",
+            f"CHARACTERS TO INCLUDE: {'; '.join(character_descriptions)}",
+            custom_prompt,
+            "Indian school setting, school uniforms."
+        )
         
         # Step 5: Generate the image
         print(f"[*] Generating recreated image with characters: {char_names_str}")
-        img = comic_renderer.generate_image_from_prompt(image_prompt, panel_num=0)
+        img_bytes = comic_renderer.generate_image_bytes(image_prompt, panel_num=0)
         
-        if img:
+        if img_bytes:
             import tempfile
             import uuid
             temp_dir = tempfile.gettempdir()
-            img_filename = f"recreated_{uuid.uuid4().hex[:8]}.png"
-            img_path = os.path.join(temp_dir, img_filename)
-            img.save(img_path)
+            img_base = os.path.join(temp_dir, f"recreated_{uuid.uuid4().hex[:8]}")
+            img_path = image_encoder.write_image_bytes(img_bytes, img_base)
             
             return {
                 "description": f"✨ Recreated the image with your characters: {char_names_str}! Based on the original style: {style_description}",
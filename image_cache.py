@@ -0,0 +1,176 @@
+"""
+Image Cache Module
+Content-addressed disk cache for generated images (panels, portraits, Image Magic)
+"""
+import os
+import json
+import hashlib
+import threading
+import uuid
+import config
+
+_lock = threading.Lock()
+_total_bytes = None  # Computed lazily from disk on first use
+
+_stats = {
+    "hits": 0,
+    "misses": 0,
+    "stores": 0,
+    "evictions": 0
+}
+
+def make_key(prompt: str, seed: int = None, size: tuple = None, model: str = None) -> str:
+    """
+    Build a cache key for an image request.
+
+    Args:
+        prompt: Image prompt (callers pass prompt_builder.canonical_prompt() output;
+            whitespace is normalized again here as a safeguard)
+        seed: Optional generation seed
+        size: Optional (width, height) tuple
+        model: Optional image model name
+
+    Returns:
+        Hex SHA-256 digest identifying the request
+    """
+    canonical = {
+        "prompt": " ".join(prompt.split()),
+        "seed": seed,
+        "size": list(size) if size else None,
+        "model": model
+    }
+    payload = json.dumps(canonical, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _path_for(key: str) -> str:
+    """Get the on-disk path for a key (sharded by the first two hex chars)"""
+    return os.path.join(config.IMAGE_CACHE_DIR, key[:2], f"{key}.img")
+
+def _iter_entries():
+    """Yield (path, size, mtime) for every cached file"""
+    if not os.path.exists(config.IMAGE_CACHE_DIR):
+        return
+    for root, dirs, files in os.walk(config.IMAGE_CACHE_DIR):
+        for file in files:
+            if file.endswith(".img"):
+                path = os.path.join(root, file)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                yield path, st.st_size, st.st_mtime
+
+def _ensure_total():
+    """Compute the current cache size once (caller holds _lock)"""
+    global _total_bytes
+    if _total_bytes is None:
+        _total_bytes = sum(size for _, size, _ in _iter_entries())
+
+def lookup(key: str) -> bytes:
+    """
+    Get cached image bytes.
+
+    Args:
+        key: Key from make_key()
+
+    Returns:
+        Raw encoded image bytes, or None on a miss
+    """
+    path = _path_for(key)
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        # Touch for LRU ordering
+        os.utime(path, None)
+    except OSError:
+        with _lock:
+            _stats["misses"] += 1
+        return None
+
+    with _lock:
+        _stats["hits"] += 1
+    return data
+
+def store(key: str, data: bytes):
+    """
+    Store image bytes in the cache, evicting least recently used entries if needed.
+
+    Args:
+        key: Key from make_key()
+        data: Raw encoded image bytes
+    """
+    global _total_bytes
+    if not data or config.IMAGE_CACHE_MAX_BYTES <= 0:
+        return
+
+    path = _path_for(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    # Write to a temp file first so readers never see a partial image
+    tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    try:
+        previous = os.path.getsize(path) if os.path.exists(path) else 0
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"[WARN] Failed to cache image {key[:12]}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return
+
+    with _lock:
+        _ensure_total()
+        _total_bytes += len(data) - previous
+        _stats["stores"] += 1
+        if _total_bytes > config.IMAGE_CACHE_MAX_BYTES:
+            _evict_locked()
+
+def _evict_locked():
+    """Delete oldest entries until the cache fits in 90% of the limit (caller holds _lock)"""
+    global _total_bytes
+    target = int(config.IMAGE_CACHE_MAX_BYTES * 0.9)
+    entries = sorted(_iter_entries(), key=lambda e: e[2])
+
+    # Re-sync with disk in case another process changed the cache
+    _total_bytes = sum(size for _, size, _ in entries)
+
+    for path, size, _ in entries:
+        if _total_bytes <= target:
+            break
+        try:
+            os.remove(path)
+            _total_bytes -= size
+            _stats["evictions"] += 1
+        except OSError:
+            pass
+
+def get_stats() -> dict:
+    """
+    Get cache hit metrics.
+
+    Returns:
+        Dictionary with hits, misses, stores, evictions, hit_rate and size_bytes
+    """
+    with _lock:
+        _ensure_total()
+        stats = dict(_stats)
+        stats["size_bytes"] = _total_bytes
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+    return stats
+
+def clear():
+    """Remove every cached image"""
+    global _total_bytes
+    with _lock:
+        for path, _, _ in list(_iter_entries()):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        _total_bytes = 0
+
+if __name__ == "__main__":
+    # Test
+    print(json.dumps(get_stats(), indent=2))
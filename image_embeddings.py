@@ -0,0 +1,326 @@
+"""
+Image Embeddings Module
+Local visual-similarity index over character reference images and IMAGES_DIR
+(CLIP via ONNX Runtime when configured, otherwise a color/layout descriptor)
+"""
+import os
+import uuid
+import threading
+import numpy as np
+from PIL import Image
+import config
+import data_store
+
+try:
+    import onnxruntime as ort
+except ImportError:
+    ort = None  # CLIP backend unavailable; the color/layout descriptor is used instead
+
+BACKEND_CLIP = "clip-onnx"
+BACKEND_COLOR = "color-layout"
+
+# CLIP image preprocessing constants
+CLIP_SIZE = 224
+CLIP_MEAN = np.array([0.48145466, 0.4578275, 0.40821073], dtype=np.float32)
+CLIP_STD = np.array([0.26862954, 0.26130258, 0.27577711], dtype=np.float32)
+
+# Model outputs holding the pooled image embedding, in order of preference
+# (projected embeds from CLIPVisionModelWithProjection, else the pooled output)
+CLIP_OUTPUT_NAMES = ("image_embeds", "pooler_output")
+
+_lock = threading.Lock()
+_session = None
+_output_name = None
+_index = None         # {"backend", "paths", "char_ids", "mtimes", "vectors"}
+_index_mtime = None   # mtime of the index file when it was loaded
+_synced = False
+
+def get_backend() -> str:
+    """Get the embedding backend in use ("clip-onnx" or "color-layout")"""
+    if ort is not None and config.CLIP_ONNX_MODEL and os.path.exists(config.CLIP_ONNX_MODEL):
+        return BACKEND_CLIP
+    return BACKEND_COLOR
+
+def _get_session():
+    global _session, _output_name
+    if _session is None:
+        session = ort.InferenceSession(config.CLIP_ONNX_MODEL, providers=["CPUExecutionProvider"])
+        names = [o.name for o in session.get_outputs()]
+        wanted = [n for n in CLIP_OUTPUT_NAMES if n in names]
+        if wanted:
+            _output_name = wanted[0]
+        elif len(names) == 1:
+            _output_name = names[0]
+        else:
+            raise ValueError(
+                f"CLIP model has no {' or '.join(CLIP_OUTPUT_NAMES)} output (found: {', '.join(names)})"
+            )
+        _session = session
+        print(f"[✓] Loaded CLIP image encoder from {config.CLIP_ONNX_MODEL} (output: {_output_name})")
+    return _session
+
+def _clip_embedding(img: Image.Image) -> np.ndarray:
+    """Embed with a CLIP vision encoder exported to ONNX (input NCHW float32 224x224)"""
+    img = img.convert("RGB")
+    scale = CLIP_SIZE / min(img.size)
+    img = img.resize((max(CLIP_SIZE, round(img.width * scale)), max(CLIP_SIZE, round(img.height * scale))), Image.BICUBIC)
+    left = (img.width - CLIP_SIZE) // 2
+    top = (img.height - CLIP_SIZE) // 2
+    img = img.crop((left, top, left + CLIP_SIZE, top + CLIP_SIZE))
+
+    pixels = (np.asarray(img, dtype=np.float32) / 255.0 - CLIP_MEAN) / CLIP_STD
+    batch = pixels.transpose(2, 0, 1)[np.newaxis, ...]
+
+    session = _get_session()
+    output = session.run([_output_name], {session.get_inputs()[0].name: batch})[0]
+    return output.reshape(-1).astype(np.float32)
+
+def _color_embedding(img: Image.Image) -> np.ndarray:
+    """Cheap descriptor: 8x8 color layout plus a coarse HSV histogram"""
+    rgb = img.convert("RGB")
+    layout = np.asarray(rgb.resize((8, 8), Image.BILINEAR), dtype=np.float32).reshape(-1) / 255.0
+    layout -= layout.mean()
+
+    hsv = np.asarray(rgb.resize((64, 64), Image.BILINEAR).convert("HSV"), dtype=np.int32).reshape(-1, 3)
+    bins = (hsv[:, 0] * 8 // 256) * 16 + (hsv[:, 1] * 4 // 256) * 4 + (hsv[:, 2] * 4 // 256)
+    hist = np.bincount(bins, minlength=128).astype(np.float32)
+    hist = np.sqrt(hist / hist.sum())
+    hist -= hist.mean()
+
+    return np.concatenate([layout, hist])
+
+def embed_image(img: Image.Image) -> np.ndarray:
+    """
+    Compute a unit-length embedding for an image.
+
+    Args:
+        img: PIL Image
+
+    Returns:
+        1-D float32 array
+    """
+    vector = _clip_embedding(img) if get_backend() == BACKEND_CLIP else _color_embedding(img)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+def _embed_path(path: str) -> np.ndarray:
+    with Image.open(path) as img:
+        img.draft("RGB", (CLIP_SIZE * 2, CLIP_SIZE * 2))
+        return embed_image(img)
+
+def _empty_index(backend: str) -> dict:
+    return {"backend": backend, "paths": [], "char_ids": [], "mtimes": [], "vectors": None}
+
+def _index_lock():
+    """Cross-process lock held around every load-modify-save of the index file"""
+    return data_store.file_lock(f"{config.IMAGE_EMBEDDING_INDEX_PATH}.lock")
+
+def _load_locked():
+    """Load the index file if it is new or changed by another process"""
+    global _index, _index_mtime
+    backend = get_backend()
+    path = config.IMAGE_EMBEDDING_INDEX_PATH
+    mtime = os.path.getmtime(path) if os.path.exists(path) else None
+
+    if _index is not None and mtime == _index_mtime and _index["backend"] == backend:
+        return
+
+    _index, _index_mtime = _empty_index(backend), mtime
+    if mtime is None:
+        return
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            if str(data["backend"]) != backend:
+                print(f"[*] Embedding backend changed to {backend}, rebuilding image index")
+                return
+            _index.update({
+                "paths": data["paths"].tolist(),
+                "char_ids": data["char_ids"].tolist(),
+                "mtimes": data["mtimes"].tolist(),
+                "vectors": data["vectors"] if len(data["paths"]) else None
+            })
+    except Exception as e:
+        print(f"[WARN] Failed to load image embedding index, rebuilding: {e}")
+
+def _save_locked():
+    """Write the index through a temp file so a crash never leaves a torn file"""
+    global _index_mtime
+    path = config.IMAGE_EMBEDDING_INDEX_PATH
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    vectors = _index["vectors"] if _index["vectors"] is not None else np.zeros((0, 0), dtype=np.float32)
+    tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    with open(tmp_path, 'wb') as f:
+        np.savez(
+            f,
+            backend=np.array(_index["backend"]),
+            paths=np.array(_index["paths"], dtype=str),
+            char_ids=np.array(_index["char_ids"], dtype=str),
+            mtimes=np.array(_index["mtimes"], dtype=np.float64),
+            vectors=vectors
+        )
+    os.replace(tmp_path, path)
+    _index_mtime = os.path.getmtime(path)
+
+def _upsert_locked(items: list) -> int:
+    """Embed (path, char_id) pairs whose file is new or changed; returns the number embedded"""
+    positions = {p: i for i, p in enumerate(_index["paths"])}
+    new_vectors = []
+    updated = 0
+    for path, char_id in dict(items).items():
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            continue
+        pos = positions.get(path)
+        if pos is not None and _index["mtimes"][pos] == mtime and _index["char_ids"][pos] == (char_id or ""):
+            continue
+        try:
+            vector = _embed_path(path)
+        except Exception as e:
+            print(f"[WARN] Could not embed {path}: {e}")
+            continue
+
+        if pos is None:
+            _index["paths"].append(path)
+            _index["char_ids"].append(char_id or "")
+            _index["mtimes"].append(mtime)
+            new_vectors.append(vector)
+            positions[path] = len(_index["paths"]) - 1
+        else:
+            _index["char_ids"][pos] = char_id or ""
+            _index["mtimes"][pos] = mtime
+            _index["vectors"][pos] = vector
+        updated += 1
+
+    if new_vectors:
+        stacked = np.vstack(new_vectors)
+        vectors = _index["vectors"]
+        _index["vectors"] = stacked if vectors is None else np.vstack([vectors, stacked])
+    return updated
+
+def _library_images() -> list:
+    """(path, char_id) for every character reference image and every file in IMAGES_DIR"""
+    import rag_index
+
+    items = []
+    for char in rag_index.get_all_characters():
+        for path in char.get("image_paths", []):
+            items.append((path, char.get("id", "")))
+
+    if os.path.exists(config.IMAGES_DIR):
+        for name in sorted(os.listdir(config.IMAGES_DIR)):
+            if name.lower().endswith((".png", ".jpg", ".jpeg", ".webp")):
+                items.append((os.path.join(config.IMAGES_DIR, name), ""))
+    return items
+
+def sync_index() -> int:
+    """
+    Bring the index up to date with the library.
+
+    Only new or modified files are embedded; entries for deleted files are dropped.
+
+    Returns:
+        Number of images embedded
+    """
+    global _synced
+    items = _library_images()
+    wanted = {path for path, _ in items}
+
+    # Reload under the file lock so other processes' changes are merged, not overwritten
+    with _lock, _index_lock():
+        _load_locked()
+        keep = [i for i, p in enumerate(_index["paths"]) if p in wanted and os.path.exists(p)]
+        removed = len(_index["paths"]) - len(keep)
+        if removed:
+            for field in ("paths", "char_ids", "mtimes"):
+                _index[field] = [_index[field][i] for i in keep]
+            _index["vectors"] = _index["vectors"][keep] if keep else None
+
+        updated = _upsert_locked(items)
+        if updated or removed:
+            _save_locked()
+        _synced = True
+
+    if updated or removed:
+        print(f"[✓] Image index synced: {updated} embedded, {removed} removed ({get_backend()})")
+    return updated
+
+def add_images(items: list):
+    """
+    Add or refresh images in the index (called when references are saved).
+
+    Does nothing unless the CLIP backend is active: color/layout vectors are
+    never used for suggestions, and sync_index() fills the index once CLIP is set up.
+
+    Args:
+        items: List of (path, char_id) tuples; use "" as char_id for non-character images
+    """
+    if get_backend() != BACKEND_CLIP:
+        return
+    # Reload under the file lock so other processes' changes are merged, not overwritten
+    with _lock, _index_lock():
+        _load_locked()
+        if _upsert_locked(items):
+            _save_locked()
+
+def remove_characters(char_ids: list):
+    """
+    Drop every image belonging to deleted characters from the index.
+
+    Args:
+        char_ids: Character IDs
+    """
+    char_ids = set(char_ids)
+    # Reload under the file lock so other processes' changes are merged, not overwritten
+    with _lock, _index_lock():
+        _load_locked()
+        keep = [i for i, c in enumerate(_index["char_ids"]) if c not in char_ids]
+        if len(keep) == len(_index["paths"]):
+            return
+        for field in ("paths", "char_ids", "mtimes"):
+            _index[field] = [_index[field][i] for i in keep]
+        _index["vectors"] = _index["vectors"][keep] if keep else None
+        _save_locked()
+
+def _ensure_ready():
+    if not _synced:
+        sync_index()
+
+def suggest_characters(img: Image.Image, k: int = 3) -> list:
+    """
+    Suggest which known characters an image most likely shows.
+
+    Only meaningful with the CLIP backend; the color/layout descriptor
+    matches palettes, not characters, so callers should check get_backend().
+
+    Args:
+        img: PIL Image (e.g. an Image Magic upload)
+        k: Number of characters to return
+
+    Returns:
+        List of {"char_id", "path", "score"} sorted by descending cosine similarity,
+        one entry per character (its best matching reference image)
+    """
+    _ensure_ready()
+    query = embed_image(img)
+
+    with _lock:
+        _load_locked()
+        if _index["vectors"] is None:
+            return []
+        scores = _index["vectors"] @ query
+        paths, char_ids = list(_index["paths"]), list(_index["char_ids"])
+
+    best = {}
+    for i in np.argsort(-scores):
+        char_id = char_ids[i]
+        if char_id and char_id not in best:
+            best[char_id] = {"char_id": char_id, "path": paths[i], "score": float(scores[i])}
+            if len(best) >= k:
+                break
+    return list(best.values())
+
+if __name__ == "__main__":
+    # Test
+    print(f"Backend: {get_backend()}")
+    print(f"Embedded {sync_index()} image(s)")
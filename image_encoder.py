@@ -0,0 +1,152 @@
+"""
+Image Encoder Module
+Writes images to disk: original bytes when pixels are unchanged, configurable encoding otherwise
+"""
+import os
+import uuid
+from io import BytesIO
+from PIL import Image
+import config
+
+# Pillow format name, file extension and MIME type per output format
+FORMATS = {
+    "png": ("PNG", ".png", "image/png"),
+    "webp": ("WEBP", ".webp", "image/webp"),
+    "jpeg": ("JPEG", ".jpg", "image/jpeg"),
+}
+
+_MIME_BY_EXT = {
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".webp": "image/webp",
+    ".gif": "image/gif",
+}
+
+IMAGE_EXTENSIONS = tuple(_MIME_BY_EXT)
+
+def extension_for_bytes(data: bytes) -> str:
+    """
+    Detect the file extension of encoded image bytes from their signature.
+
+    Args:
+        data: Raw encoded image bytes
+
+    Returns:
+        Extension including the dot (falls back to ".png")
+    """
+    if data.startswith(b"\x89PNG"):
+        return ".png"
+    if data.startswith(b"\xff\xd8"):
+        return ".jpg"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return ".webp"
+    if data.startswith((b"GIF87a", b"GIF89a")):
+        return ".gif"
+    return ".png"
+
+def mime_for_path(path: str) -> str:
+    """Get the MIME type for an image path from its extension"""
+    return _MIME_BY_EXT.get(os.path.splitext(path)[1].lower(), "application/octet-stream")
+
+def find_image(base_path: str) -> str:
+    """
+    Find an image saved under base_path with any known extension.
+
+    Args:
+        base_path: Path without extension (e.g. ".../panel_1")
+
+    Returns:
+        Existing file path, or None
+    """
+    for ext in IMAGE_EXTENSIONS:
+        if os.path.exists(base_path + ext):
+            return base_path + ext
+    return None
+
+def _write_atomic(path: str, data: bytes):
+    """Write bytes through a temp file so readers never see a partial image"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def write_image_bytes(data: bytes, base_path: str) -> str:
+    """
+    Write already-encoded image bytes without decoding or re-encoding them.
+
+    Args:
+        data: Raw encoded image bytes
+        base_path: Destination path without extension
+
+    Returns:
+        Saved path (extension matches the actual encoding)
+    """
+    path = base_path + extension_for_bytes(data)
+    _write_atomic(path, data)
+    return path
+
+def encode_image(img: Image.Image, fmt: str = None, quality: int = None) -> tuple:
+    """
+    Encode an image with the configured output settings.
+
+    Args:
+        img: PIL Image
+        fmt: "png", "webp" or "jpeg" (defaults to config.OUTPUT_IMAGE_FORMAT)
+        quality: Lossy quality 1-100 (defaults to config.OUTPUT_IMAGE_QUALITY)
+
+    Returns:
+        Tuple of (encoded bytes, extension)
+    """
+    fmt = (fmt or config.OUTPUT_IMAGE_FORMAT).lower()
+    if fmt == "jpg":
+        fmt = "jpeg"
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported output format: {fmt}")
+    quality = quality or config.OUTPUT_IMAGE_QUALITY
+    pil_format, ext, _ = FORMATS[fmt]
+
+    if fmt == "png":
+        options = {"optimize": True}
+    elif fmt == "webp":
+        options = {"quality": quality, "method": 4}
+    else:
+        options = {"quality": quality, "optimize": True, "progressive": True}
+        if img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+
+    buffer = BytesIO()
+    img.save(buffer, format=pil_format, **options)
+    return buffer.getvalue(), ext
+
+def save_image(img: Image.Image, base_path: str, fmt: str = None, quality: int = None) -> str:
+    """
+    Encode and save an image whose pixels were modified.
+
+    Args:
+        img: PIL Image
+        base_path: Destination path without extension
+        fmt: Optional output format override
+        quality: Optional quality override
+
+    Returns:
+        Saved path
+    """
+    data, ext = encode_image(img, fmt=fmt, quality=quality)
+    path = base_path + ext
+    _write_atomic(path, data)
+    return path
+
+if __name__ == "__main__":
+    # Test
+    test = Image.new("RGB", (1024, 576), "skyblue")
+    for name in FORMATS:
+        data, ext = encode_image(test, fmt=name)
+        print(f"{name:<5} {len(data):>8} bytes ({ext})")
@@ -0,0 +1,280 @@
+"""
+Job Queue Module
+SQLite-backed local job queue for background comic work (prompts and rendering)
+"""
+import os
+import json
+import sqlite3
+import uuid
+from datetime import datetime, timedelta
+import config
+
+# Job kinds handled by render_worker.py
+KIND_PROMPTS = "prompts"   # story -> prompts (prompt_generator)
+KIND_RENDER = "render"     # prompts -> panels (comic_renderer via comic_jobs)
+KIND_COMIC = "comic"       # story -> prompts -> panels
+KIND_PORTRAIT = "portrait" # character description -> reference portrait (character_manager)
+
+ACTIVE_STATUSES = ("queued", "running")
+
+_initialized_dbs = set()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    message TEXT,
+    result TEXT,
+    error TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    worker_id TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at);
+CREATE TABLE IF NOT EXISTS workers (
+    id TEXT PRIMARY KEY,
+    last_seen TEXT NOT NULL
+);
+"""
+
+def _connect() -> sqlite3.Connection:
+    """Open a connection to the queue database (one per call, safe across threads)"""
+    os.makedirs(os.path.dirname(config.JOB_QUEUE_DB) or ".", exist_ok=True)
+    conn = sqlite3.connect(config.JOB_QUEUE_DB, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    if config.JOB_QUEUE_DB not in _initialized_dbs:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+        _initialized_dbs.add(config.JOB_QUEUE_DB)
+    return conn
+
+def _now() -> str:
+    return datetime.now().isoformat()
+
+def _row_to_job(row) -> dict:
+    if row is None:
+        return None
+    job = dict(row)
+    job["payload"] = json.loads(job["payload"])
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    job["cancel_requested"] = bool(job["cancel_requested"])
+    return job
+
+def submit(kind: str, payload: dict) -> str:
+    """
+    Submit a job to the queue.
+
+    Args:
+        kind: One of KIND_PROMPTS, KIND_RENDER, KIND_COMIC, KIND_PORTRAIT
+        payload: JSON-serializable job input
+
+    Returns:
+        Job ID
+    """
+    job_id = uuid.uuid4().hex[:12]
+    now = _now()
+    conn = _connect()
+    try:
+        conn.execute(
+            "INSERT INTO jobs (id, kind, payload, status, created_at, updated_at) "
+            "VALUES (?, ?, ?, 'queued', ?, ?)",
+            (job_id, kind, json.dumps(payload), now, now)
+        )
+    finally:
+        conn.close()
+    print(f"[✓] Queued {kind} job {job_id}")
+    return job_id
+
+def get_status(job_id: str) -> dict:
+    """
+    Get a job's current state.
+
+    Args:
+        job_id: Job ID from submit()
+
+    Returns:
+        Job dictionary (status, progress, message, result, error, ...) or None
+    """
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    finally:
+        conn.close()
+    return _row_to_job(row)
+
+def list_jobs(status: str = None, limit: int = 50) -> list:
+    """List jobs, newest first, optionally filtered by status"""
+    conn = _connect()
+    try:
+        if status:
+            rows = conn.execute(
+                "SELECT * FROM jobs WHERE status = ? ORDER BY created_at DESC LIMIT ?",
+                (status, limit)
+            ).fetchall()
+        else:
+            rows = conn.execute(
+                "SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+    finally:
+        conn.close()
+    return [_row_to_job(r) for r in rows]
+
+def cancel(job_id: str) -> bool:
+    """
+    Cancel a job.
+
+    Queued jobs are cancelled immediately. Running jobs are flagged and the
+    worker stops them at the next panel boundary.
+
+    Args:
+        job_id: Job ID
+
+    Returns:
+        True if the job was queued or running, False otherwise
+    """
+    conn = _connect()
+    try:
+        cur = conn.execute(
+            "UPDATE jobs SET status = 'cancelled', updated_at = ? WHERE id = ? AND status = 'queued'",
+            (_now(), job_id)
+        )
+        if cur.rowcount:
+            return True
+        cur = conn.execute(
+            "UPDATE jobs SET cancel_requested = 1, updated_at = ? WHERE id = ? AND status = 'running'",
+            (_now(), job_id)
+        )
+        return bool(cur.rowcount)
+    finally:
+        conn.close()
+
+def claim_next(worker_id: str, kinds: tuple = None) -> dict:
+    """
+    Atomically claim the oldest queued job.
+
+    Args:
+        worker_id: ID of the claiming worker
+        kinds: Optional tuple of job kinds this worker accepts
+
+    Returns:
+        Claimed job dictionary, or None if the queue is empty
+    """
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        query = "SELECT * FROM jobs WHERE status = 'queued'"
+        params = []
+        if kinds:
+            query += f" AND kind IN ({', '.join('?' for _ in kinds)})"
+            params.extend(kinds)
+        query += " ORDER BY created_at LIMIT 1"
+
+        row = conn.execute(query, params).fetchone()
+        if row is None:
+            conn.execute("COMMIT")
+            return None
+
+        conn.execute(
+            "UPDATE jobs SET status = 'running', worker_id = ?, updated_at = ? WHERE id = ?",
+            (worker_id, _now(), row["id"])
+        )
+        conn.execute("COMMIT")
+        job = _row_to_job(row)
+        job["status"] = "running"
+        job["worker_id"] = worker_id
+        return job
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+def update_progress(job_id: str, progress: float, message: str = None):
+    """Record progress (0.0-1.0) and an optional status message for a running job"""
+    conn = _connect()
+    try:
+        conn.execute(
+            "UPDATE jobs SET progress = ?, message = COALESCE(?, message), updated_at = ? WHERE id = ?",
+            (progress, message, _now(), job_id)
+        )
+    finally:
+        conn.close()
+
+def complete(job_id: str, result: dict, status: str = "done"):
+    """Mark a job finished with its result (status 'done' or 'cancelled')"""
+    conn = _connect()
+    try:
+        conn.execute(
+            "UPDATE jobs SET status = ?, progress = 1.0, result = ?, updated_at = ? WHERE id = ?",
+            (status, json.dumps(result), _now(), job_id)
+        )
+    finally:
+        conn.close()
+
+def fail(job_id: str, error: str):
+    """Mark a job as failed"""
+    conn = _connect()
+    try:
+        conn.execute(
+            "UPDATE jobs SET status = 'failed', error = ?, updated_at = ? WHERE id = ?",
+            (error, _now(), job_id)
+        )
+    finally:
+        conn.close()
+
+def is_cancel_requested(job_id: str) -> bool:
+    """Check whether cancel() was called on a running job"""
+    job = get_status(job_id)
+    return bool(job and job["cancel_requested"])
+
+def heartbeat(worker_id: str):
+    """Record that a worker is alive"""
+    conn = _connect()
+    try:
+        conn.execute(
+            "INSERT INTO workers (id, last_seen) VALUES (?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET last_seen = excluded.last_seen",
+            (worker_id, _now())
+        )
+    finally:
+        conn.close()
+
+def has_live_worker(max_age_seconds: float = 15) -> bool:
+    """Check whether any worker has sent a heartbeat recently"""
+    cutoff = (datetime.now() - timedelta(seconds=max_age_seconds)).isoformat()
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT 1 FROM workers WHERE last_seen >= ? LIMIT 1", (cutoff,)).fetchone()
+    finally:
+        conn.close()
+    return row is not None
+
+def requeue_stale(max_age_seconds: float = 60):
+    """
+    Put jobs whose worker stopped sending heartbeats back in the queue.
+
+    Render jobs are resumable (see comic_jobs), so a re-queued job only
+    renders the panels the dead worker had not finished.
+    """
+    cutoff = (datetime.now() - timedelta(seconds=max_age_seconds)).isoformat()
+    conn = _connect()
+    try:
+        cur = conn.execute(
+            "UPDATE jobs SET status = 'queued', worker_id = NULL, updated_at = ? "
+            "WHERE status = 'running' AND worker_id NOT IN "
+            "(SELECT id FROM workers WHERE last_seen >= ?)",
+            (_now(), cutoff)
+        )
+        if cur.rowcount:
+            print(f"[*] Re-queued {cur.rowcount} job(s) from stopped workers")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    # Test
+    for j in list_jobs(limit=10):
+        print(f"- {j['id']} {j['kind']}: {j['status']} ({j['progress']:.0%})")
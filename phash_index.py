@@ -0,0 +1,235 @@
+"""
+Perceptual Hash Index Module
+Detects near-duplicate reference images without re-reading the image library
+"""
+import os
+import json
+import uuid
+import threading
+from PIL import Image
+import config
+import data_store
+
+HASH_BITS = 64
+
+_lock = threading.Lock()
+_entries = None   # phash hex -> list of {"char_id", "path"}
+_bands = None     # (band number, band value) -> set of phash hex
+_entries_mtime = None
+
+def compute_phash(img: Image.Image) -> str:
+    """
+    Compute a 64-bit difference hash (dHash) of an image.
+
+    Visually identical images (re-encoded, resized, lightly compressed)
+    get hashes within a few bits of each other.
+
+    Args:
+        img: PIL Image
+
+    Returns:
+        16-character hex string
+    """
+    small = img.convert("L").resize((9, 8), Image.LANCZOS)
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            value = (value << 1) | (1 if left > right else 0)
+    return f"{value:016x}"
+
+def hamming(a: str, b: str) -> int:
+    """Number of differing bits between two hex hashes"""
+    return bin(int(a, 16) ^ int(b, 16)).count("1")
+
+def _band_count(max_distance: int) -> int:
+    """
+    Number of bands to split a hash into.
+
+    With more bands than the allowed distance, any near duplicate shares
+    at least one band exactly (pigeonhole), so lookups only compare
+    hashes from matching buckets.
+    """
+    for count in (4, 8, 16):
+        if count > max_distance:
+            return count
+    return HASH_BITS
+
+def _split(phash: str, band_count: int) -> list:
+    width = HASH_BITS // band_count
+    value = int(phash, 16)
+    mask = (1 << width) - 1
+    return [(i, (value >> (i * width)) & mask) for i in range(band_count)]
+
+def _add_to_bands(phash: str):
+    for band in _split(phash, _band_count(config.PHASH_MAX_DISTANCE)):
+        _bands.setdefault(band, set()).add(phash)
+
+def _index_lock():
+    """Cross-process lock held around every load-merge-save of the index file"""
+    return data_store.file_lock(f"{config.PHASH_INDEX_PATH}.lock")
+
+def _save_locked():
+    """Write the index through a temp file so a crash never leaves a torn file"""
+    global _entries_mtime
+    os.makedirs(os.path.dirname(config.PHASH_INDEX_PATH), exist_ok=True)
+    tmp_path = f"{config.PHASH_INDEX_PATH}.{uuid.uuid4().hex[:8]}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({"version": 1, "entries": _entries}, f)
+    os.replace(tmp_path, config.PHASH_INDEX_PATH)
+    _entries_mtime = os.path.getmtime(config.PHASH_INDEX_PATH)
+
+def _load_locked() -> bool:
+    """
+    Load the index file if it is new or changed by another process.
+
+    Returns:
+        False if there is no usable index file yet (caller builds one)
+    """
+    global _entries, _bands, _entries_mtime
+    path = config.PHASH_INDEX_PATH
+    mtime = os.path.getmtime(path) if os.path.exists(path) else None
+    if mtime is None:
+        return False
+    if _entries is not None and mtime == _entries_mtime:
+        return True
+
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            entries = json.load(f).get("entries", {})
+    except Exception as e:
+        print(f"[WARN] Failed to load perceptual hash index, rebuilding: {e}")
+        return False
+
+    _entries, _bands, _entries_mtime = entries, {}, mtime
+    for phash in _entries:
+        _add_to_bands(phash)
+    return True
+
+def _ensure_loaded_locked():
+    """Load the index, building it from the character library if missing (hold _index_lock())"""
+    global _entries, _bands
+    if _load_locked():
+        return
+    _entries, _bands = {}, {}
+    _build_locked()
+    _save_locked()
+
+def _build_locked():
+    """Hash every reference image in the character library (first run only)"""
+    import rag_index
+
+    count = 0
+    for char in rag_index.get_all_characters():
+        for path in char.get("image_paths", []):
+            if not os.path.exists(path):
+                continue
+            try:
+                with Image.open(path) as img:
+                    phash = compute_phash(img)
+            except Exception as e:
+                print(f"[WARN] Could not hash {path}: {e}")
+                continue
+            _entries.setdefault(phash, []).append({"char_id": char.get("id"), "path": path})
+            _add_to_bands(phash)
+            count += 1
+    print(f"[✓] Built perceptual hash index ({count} images)")
+
+def find_duplicate(phash: str) -> dict:
+    """
+    Find an indexed image that is a near duplicate of a hash.
+
+    Only hashes sharing a band with phash are compared, so the cost does
+    not grow with the size of the library.
+
+    Args:
+        phash: Hash from compute_phash()
+
+    Returns:
+        Matching entry {"char_id", "path", "distance"} within
+        config.PHASH_MAX_DISTANCE bits, or None
+    """
+    with _lock:
+        if not _load_locked():
+            with _index_lock():
+                _ensure_loaded_locked()
+        candidates = set()
+        for band in _split(phash, _band_count(config.PHASH_MAX_DISTANCE)):
+            candidates |= _bands.get(band, set())
+
+        for candidate in candidates:
+            distance = hamming(phash, candidate)
+            if distance > config.PHASH_MAX_DISTANCE:
+                continue
+            for entry in _entries.get(candidate, []):
+                # Files deleted outside the app no longer count
+                if os.path.exists(entry["path"]):
+                    return dict(entry, distance=distance)
+    return None
+
+def add_many(items: list):
+    """
+    Record stored reference images and write the index once.
+
+    Args:
+        items: List of (phash, char_id, path) tuples
+    """
+    if not items:
+        return
+    # Merge into the latest file under the lock so concurrent processes
+    # never overwrite each other's additions
+    with _lock, _index_lock():
+        _ensure_loaded_locked()
+        for phash, char_id, path in items:
+            _entries.setdefault(phash, []).append({"char_id": char_id, "path": path})
+            _add_to_bands(phash)
+        _save_locked()
+
+def remove_characters(char_ids: list):
+    """
+    Drop every hash belonging to deleted characters from the index.
+
+    Args:
+        char_ids: Character IDs
+    """
+    global _bands
+    char_ids = set(char_ids)
+    if not char_ids:
+        return
+    with _lock, _index_lock():
+        _ensure_loaded_locked()
+        kept = {}
+        for phash, entries in _entries.items():
+            remaining = [e for e in entries if e.get("char_id") not in char_ids]
+            if remaining:
+                kept[phash] = remaining
+        if sum(map(len, kept.values())) == sum(map(len, _entries.values())):
+            return
+        _entries.clear()
+        _entries.update(kept)
+        _bands = {}
+        for phash in _entries:
+            _add_to_bands(phash)
+        _save_locked()
+
+def add(phash: str, char_id: str, path: str):
+    """
+    Record a stored reference image.
+
+    Args:
+        phash: Hash from compute_phash()
+        char_id: Owning character ID
+        path: Saved image path
+    """
+    add_many([(phash, char_id, path)])
+
+if __name__ == "__main__":
+    # Test
+    base = Image.new("RGB", (256, 256), "white")
+    for x in range(0, 256, 32):
+        base.paste("black", (x, 0, x + 16, 256))
+    a = compute_phash(base)
+    b = compute_phash(base.resize((120, 120)))
+    print(a, b, hamming(a, b))
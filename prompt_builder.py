@@ -0,0 +1,180 @@
+"""
+Prompt Builder Module
+Single place to assemble image prompts: normalized, deduplicated, safety suffix exactly once
+"""
+import re
+import urllib.parse
+import config
+
+# Split after sentence punctuation, but not after common title abbreviations
+_CLAUSE_SPLIT = re.compile(
+    r"(?<!\bMr\.)(?<!\bMs\.)(?<!\bDr\.)(?<!\bMrs\.)(?<!\bSt\.)(?<!\bvs\.)(?<=[.;!?])\s+|\n+"
+)
+
+# Clauses shorter than this are never treated as duplicates (e.g. "Ms.")
+MIN_DEDUPE_LENGTH = 12
+
+def normalize_whitespace(text: str) -> str:
+    """Collapse all runs of whitespace (including newlines) to single spaces"""
+    return " ".join((text or "").split())
+
+def _key(fragment: str) -> str:
+    """Comparison key for a clause or fragment"""
+    return normalize_whitespace(fragment).strip(" .,;:!?").casefold()
+
+_suffix_fragments = None
+
+def _safety_fragments() -> set:
+    """Comma-separated pieces of config.SAFETY_SUFFIX, as comparison keys"""
+    global _suffix_fragments
+    if _suffix_fragments is None:
+        _suffix_fragments = {_key(f) for f in config.SAFETY_SUFFIX.split(",") if _key(f)}
+    return _suffix_fragments
+
+def split_clauses(text: str) -> list:
+    """
+    Split prompt text into clauses on sentence punctuation and newlines.
+
+    Args:
+        text: Prompt text
+
+    Returns:
+        List of non-empty, whitespace-normalized clauses (each keeps its
+        trailing punctuation)
+    """
+    clauses = (normalize_whitespace(c) for c in _CLAUSE_SPLIT.split(text or "") if c)
+    return [c for c in clauses if c]
+
+def _strip_safety_fragments(clause: str) -> str:
+    """Remove pieces of the safety suffix from a clause (it is appended once at the end)"""
+    fragments = [f for f in clause.split(",") if _key(f) not in _safety_fragments()]
+    return ",".join(fragments).strip(" ,")
+
+def dedupe_clauses(clauses: list) -> list:
+    """
+    Drop repeated clauses, keeping the first occurrence.
+
+    Args:
+        clauses: List of clauses
+
+    Returns:
+        List of unique clauses in original order
+    """
+    seen = set()
+    unique = []
+    for clause in clauses:
+        key = _key(clause)
+        if not key:
+            continue
+        if len(key) >= MIN_DEDUPE_LENGTH:
+            if key in seen:
+                continue
+            seen.add(key)
+        unique.append(clause)
+    return unique
+
+def _join(clauses: list) -> str:
+    """Join clauses into one line, adding a period where a clause has no ending"""
+    parts = []
+    for clause in clauses:
+        clause = clause.strip()
+        if clause and clause[-1] not in ".!?;:":
+            clause += "."
+        parts.append(clause)
+    return " ".join(parts)
+
+def url_length(prompt: str) -> int:
+    """Length of the Pollinations request URL for a prompt"""
+    return len(config.POLLINATIONS_API_URL) + len(urllib.parse.quote(prompt))
+
+def _fit_to_url(body: list, suffix: str, max_url_length: int) -> list:
+    """Drop trailing clauses (then words) until the final URL fits"""
+    body = list(body)
+
+    def total(clauses):
+        return url_length(_join(clauses + ([suffix] if suffix else [])))
+
+    while len(body) > 1 and total(body) > max_url_length:
+        body.pop()
+
+    if body and total(body) > max_url_length:
+        words = body[0].split()
+        while len(words) > 1 and total([" ".join(words)]) > max_url_length:
+            words.pop()
+        body = [" ".join(words)]
+    return body
+
+def build_image_prompt(*parts: str, include_safety: bool = True,
+                       max_url_length: int = None) -> str:
+    """
+    Build a canonical image prompt from pieces of text.
+
+    Whitespace is normalized, repeated clauses are dropped, any copies of the
+    safety suffix (or its pieces, such as style text) are removed from the
+    body, and the suffix is appended exactly once. If the request URL would
+    exceed the limit, trailing clauses of the body are dropped; the safety
+    suffix is never truncated.
+
+    Args:
+        *parts: Prompt pieces (scene, characters, style, ...); empty pieces are skipped
+        include_safety: Append config.SAFETY_SUFFIX
+        max_url_length: URL length limit (defaults to config.MAX_PROMPT_URL_LENGTH)
+
+    Returns:
+        Single-line prompt
+    """
+    max_url_length = max_url_length or config.MAX_PROMPT_URL_LENGTH
+
+    clauses = []
+    for part in parts:
+        if part:
+            clauses.extend(split_clauses(str(part)))
+
+    body = [_strip_safety_fragments(c) for c in clauses]
+    body = dedupe_clauses([c for c in body if c])
+
+    suffix = normalize_whitespace(config.SAFETY_SUFFIX) if include_safety else ""
+    body = _fit_to_url(body, suffix, max_url_length)
+    return _join(body + ([suffix] if suffix else []))
+
+def canonical_prompt(prompt: str) -> str:
+    """
+    Canonical form of an image prompt, used both for the request and as the cache key.
+
+    Args:
+        prompt: Prompt text (with or without the safety suffix)
+
+    Returns:
+        Prompt as produced by build_image_prompt()
+    """
+    return build_image_prompt(prompt)
+
+def describe_character(char_data: dict) -> str:
+    """
+    Get a character's visual description from either metadata format.
+
+    Args:
+        char_data: Character metadata ("visual_description" or legacy "visual_features")
+
+    Returns:
+        Visual description text (may be empty)
+    """
+    if char_data.get("visual_description"):
+        return char_data["visual_description"]
+
+    features = char_data.get("visual_features")
+    if isinstance(features, dict):
+        return ", ".join(v for v in features.values() if isinstance(v, str))
+    return ""
+
+if __name__ == "__main__":
+    # Test
+    sample = f"Kabir runs to school.  Kabir runs to school. Comic book art style. {config.SAFETY_SUFFIX}"
+    print(build_image_prompt(sample))
+
+    # Whitespace differences must not change the prompt (or its cache key)
+    spaced = sample.replace(" ", " \t ").replace(". ", ".\n\n")
+    assert canonical_prompt(spaced) == canonical_prompt(sample), "whitespace changed the prompt"
+    once = canonical_prompt(sample)
+    assert canonical_prompt(once) == once, "canonical_prompt is not idempotent"
+    print("[✓] canonical_prompt is whitespace-insensitive and idempotent")
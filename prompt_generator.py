@@ -3,10 +3,13 @@ Prompt Generator Module
 Converts stories into 6 detailed scene prompts with safety controls
 """
 import json
+import time
 import google.generativeai as genai
 from langchain_chroma import Chroma
 from langchain_huggingface import HuggingFaceEmbeddings
 import config
+import prompt_builder
+import tracing
 
 genai.configure(api_key=config.GOOGLE_API_KEY)
 
@@ -24,26 +27,80 @@ def load_retriever():
         print(f"[WARN] RAG failed: {e}")
         return None
 
-def generate_comic_prompts(story_text: str) -> list:
+def iter_json_array(chunks):
     """
-    Generate 6 detailed scene prompts from a story.
+    Incrementally parse a streamed JSON array of objects.
+    
+    Each top-level object is yielded as soon as its closing brace arrives,
+    without waiting for the rest of the array.
     
     Args:
-        story_text: Complete story text
+        chunks: Iterable of text fragments that together form a JSON array
     
-    Returns:
-        List of 6 prompt dictionaries with scene details
+    Yields:
+        Parsed objects in array order
+    
+    Raises:
+        ValueError if the stream is not a JSON array of objects
     """
-    retriever = load_retriever()
-    context = ""
+    buffer = ""
+    pos = 0             # Scan position in buffer
+    start = None        # Start of the current top-level object
+    depth = 0
+    in_string = False
+    escaped = False
+    seen_array = False
+    closed = False
     
-    # Get character visual details from RAG
-    if retriever:
-        try:
-            docs = retriever.invoke(story_text)
-            context = "\n\n".join([d.page_content for d in docs])
-        except Exception:
-            pass
+    for chunk in chunks:
+        buffer += chunk
+        while pos < len(buffer):
+            ch = buffer[pos]
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif ch == "\\":
+                    escaped = True
+                elif ch == '"':
+                    in_string = False
+            elif ch == '"':
+                in_string = True
+            elif ch == "[" and not seen_array:
+                seen_array = True
+            elif ch == "{":
+                if depth == 0:
+                    start = pos
+                depth += 1
+            elif ch == "}":
+                depth -= 1
+                if depth == 0 and start is not None:
+                    yield json.loads(buffer[start:pos + 1])
+                    # Drop consumed text so the buffer stays small
+                    buffer = buffer[pos + 1:]
+                    pos, start = -1, None
+            elif ch == "]" and depth == 0:
+                closed = True
+            elif depth == 0 and not ch.isspace() and ch != ",":
+                raise ValueError(f"Unexpected character in JSON array: {ch!r}")
+            pos += 1
+    
+    if not (seen_array and closed):
+        raise ValueError("Incomplete JSON array in response")
+
+def _build_prompt_request(story_text: str) -> str:
+    """Build the art-director prompt for a story (with RAG character context)"""
+    with tracing.span("prompts.retrieval") as span:
+        retriever = load_retriever()
+        context = ""
+        
+        # Get character visual details from RAG
+        if retriever:
+            try:
+                docs = retriever.invoke(story_text)
+                context = "\n\n".join([d.page_content for d in docs])
+                span.set(docs=len(docs), bytes=len(context.encode("utf-8")))
+            except Exception:
+                pass
     
     system_prompt = f"""You are an expert comic book art director.
 
@@ -82,26 +139,67 @@ OUTPUT FORMAT (strict JSON):
   }},
   ...
 ]"""
+    return system_prompt
 
+def stream_comic_prompts(story_text: str):
+    """
+    Generate scene prompts from a story, yielding each panel as soon as it is written.
+    
+    The Gemini response is streamed and parsed incrementally, so panel 1 can
+    be handed to the renderer while later panels are still being generated.
+    
+    Args:
+        story_text: Complete story text
+    
+    Yields:
+        Prompt dictionaries (image_prompt canonicalized with the safety suffix)
+    """
+    system_prompt = _build_prompt_request(story_text)
+    
     try:
-        model = genai.GenerativeModel(config.GEMINI_MODEL)
-        response = model.generate_content(
-            contents=[{"role": "user", "parts": [system_prompt]}],
-            generation_config={"response_mime_type": "application/json"}
-        )
-        
-        prompts = json.loads(response.text)
-        
-        # Add safety suffix to each image_prompt
-        for prompt in prompts:
-            if "image_prompt" in prompt:
-                prompt["image_prompt"] = f"{prompt['image_prompt']}. {config.SAFETY_SUFFIX}"
-        
-        return prompts
+        # Not attached: the caller's own spans run between our yields
+        with tracing.span("prompts.llm", attach=False, prompt_bytes=len(system_prompt.encode("utf-8"))) as span:
+            start = time.perf_counter()
+            model = genai.GenerativeModel(config.GEMINI_MODEL)
+            response = model.generate_content(
+                contents=[{"role": "user", "parts": [system_prompt]}],
+                generation_config={"response_mime_type": "application/json"},
+                stream=True
+            )
+            
+            received = [0]
+            def chunk_texts():
+                for chunk in response:
+                    received[0] += len(chunk.text.encode("utf-8"))
+                    yield chunk.text
+            
+            panels = 0
+            for i, prompt in enumerate(iter_json_array(chunk_texts())):
+                prompt.setdefault("panel", i + 1)
+                # Canonicalize each image_prompt (adds the safety suffix exactly once)
+                if "image_prompt" in prompt:
+                    prompt["image_prompt"] = prompt_builder.build_image_prompt(prompt["image_prompt"])
+                panels += 1
+                if panels == 1:
+                    span.set(first_panel_ms=round((time.perf_counter() - start) * 1000, 1))
+                span.set(panels=panels, bytes=received[0])
+                yield prompt
         
     except Exception as e:
         raise Exception(f"Prompt generation failed: {e}")
 
+def generate_comic_prompts(story_text: str) -> list:
+    """
+    Generate 6 detailed scene prompts from a story.
+    
+    Args:
+        story_text: Complete story text
+    
+    Returns:
+        List of 6 prompt dictionaries with scene details
+    """
+    return list(stream_comic_prompts(story_text))
+
 if __name__ == "__main__":
     # Test
     test_story = "Kabir woke up late. He rushed to school. His teacher was angry."
@@ -7,6 +7,8 @@ import google.generativeai as genai
 from langchain_chroma import Chroma
 from langchain_huggingface import HuggingFaceEmbeddings
 import config
+import prompt_builder
+import tracing
 import streamlit as st
 
 genai.configure(api_key=config.GOOGLE_API_KEY)
@@ -38,18 +40,18 @@ def load_retriever():
         return vectorstore.as_retriever(search_kwargs={"k": 4})
     return None
 
-def answer_question(query: str) -> dict:
+@tracing.traced("qa.retrieval")
+def _retrieve(query: str) -> tuple:
     """
-    Answer a user question using RAG and return answer + images.
+    Retrieve context and character images for a question.
     
     Args:
         query: User question
     
     Returns:
-        Dictionary with 'answer' (str) and 'images' (list of paths)
+        Tuple of (context, relevant_images, character_data_list)
     """
     import os
-    import comic_renderer
     
     retriever = load_retriever()
     context = ""
@@ -104,6 +106,23 @@ def answer_question(query: str) -> dict:
             print(f"[WARN] Retrieval failed: {e}")
             context = "No specific context found."
 
+    return context, relevant_images, character_data_list
+
+def answer_question(query: str) -> dict:
+    """
+    Answer a user question using RAG and return answer + images.
+    
+    Args:
+        query: User question
+    
+    Returns:
+        Dictionary with 'answer' (str) and 'images' (list of paths)
+    """
+    import os
+    import comic_renderer
+    
+    context, relevant_images, character_data_list = _retrieve(query)
+
     # Check if user is asking for an image/picture
     image_request_keywords = ["picture", "image", "photo", "show me", "give me a picture", "what does", "look like", "give image", "show image"]
     is_image_request = any(keyword in query.lower() for keyword in image_request_keywords)
@@ -121,19 +140,8 @@ def answer_question(query: str) -> dict:
                 char_name = char_data.get("name", "character")
                 character_names.append(char_name)
                 
-                # Build visual description
-                visual_desc = ""
-                if "visual_description" in char_data:
-                    visual_desc = char_data["visual_description"]
-                elif "visual_features" in char_data:
-                    # Old format - build description from features
-                    features = char_data["visual_features"]
-                    parts = []
-                    if isinstance(features, dict):
-                        for key, value in features.items():
-                            if isinstance(value, str):
-                                parts.append(value)
-                    visual_desc = ", ".join(parts)
+                # Build visual description (handles the old visual_features format)
+                visual_desc = prompt_builder.describe_character(char_data)
                 
                 role = char_data.get("role", "student")
                 
@@ -145,23 +153,30 @@ def answer_question(query: str) -> dict:
                 if len(character_names) > 1:
                     # Multiple characters - group scene
                     names_str = ", ".join(character_names)
-                    image_prompt = f"""Group scene with {names_str} from Gandhinagar School. {'; '.join(character_descriptions)}. Indian school setting, all wearing school uniforms. {config.SAFETY_SUFFIX}"""
+                    image_prompt = prompt_builder.build_image_prompt(
+                        f"Group scene with {names_str} from Gandhinagar School.",
+                        "; ".join(character_descriptions),
+                        "Indian school setting, all wearing school uniforms."
+                    )
                 else:
                     # Single character portrait
                     char_name = character_names[0]
-                    image_prompt = f"""Character portrait: {character_descriptions[0]}. Indian school student in school uniform. Upper body shot, clear face, friendly expression. {config.SAFETY_SUFFIX}"""
+                    image_prompt = prompt_builder.build_image_prompt(
+                        f"Character portrait: {character_descriptions[0]}.",
+                        "Indian school student in school uniform. Upper body shot, clear face, friendly expression."
+                    )
                 
                 # Generate image using Pollinations
-                img = comic_renderer.generate_image_from_prompt(image_prompt, panel_num=0)
+                img_bytes = comic_renderer.generate_image_bytes(image_prompt, panel_num=0)
                 
-                if img:
-                    # Save generated image
+                if img_bytes:
+                    # Save generated image (original bytes, no re-encode)
                     import tempfile
                     import uuid
+                    import image_encoder
                     temp_dir = tempfile.gettempdir()
-                    img_filename = f"qa_generated_{uuid.uuid4().hex[:8]}.png"
-                    img_path = os.path.join(temp_dir, img_filename)
-                    img.save(img_path)
+                    img_base = os.path.join(temp_dir, f"qa_generated_{uuid.uuid4().hex[:8]}")
+                    img_path = image_encoder.write_image_bytes(img_bytes, img_base)
                     relevant_images.append(img_path)
                     print(f"[✓] Generated image saved to {img_path}")
         except Exception as e:
@@ -190,9 +205,11 @@ INSTRUCTIONS:
 ANSWER:"""
 
     try:
-        model = genai.GenerativeModel(config.GEMINI_MODEL)
-        response = model.generate_content(prompt)
-        answer = response.text.strip()
+        with tracing.span("qa.llm", prompt_bytes=len(prompt.encode("utf-8"))) as span:
+            model = genai.GenerativeModel(config.GEMINI_MODEL)
+            response = model.generate_content(prompt)
+            answer = response.text.strip()
+            span.set(bytes=len(answer.encode("utf-8")))
         
         return {
             "answer": answer,
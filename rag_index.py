@@ -2,7 +2,7 @@
 RAG Index Module
 Handles vector-based character search and indexing
 """
-import os
+import re
 import json
 import uuid
 try:
@@ -26,7 +26,7 @@ except ImportError:
             self._docs.extend(docs)
         def similarity_search(self, query, k=5):
             return []
-        def delete(self, ids=None):
+        def delete(self, ids=None, **kwargs):
             pass
 
 try:
@@ -40,29 +40,30 @@ except ImportError:
         def embed_query(self, query):
             return []
 import config
+import data_store
+import tracing
 
 def get_vectorstore():
     """Get or create the vector store"""
-    embeddings = HuggingFaceEmbeddings(model_name=config.EMBEDDING_MODEL)
-    
-    vectorstore = Chroma(
-        persist_directory=config.VECTOR_DB_DIR,
-        embedding_function=embeddings,
-        collection_name="gandhinagar_school"
-    )
+    with tracing.span("rag.load_vectorstore"):
+        embeddings = HuggingFaceEmbeddings(model_name=config.EMBEDDING_MODEL)
+        
+        vectorstore = Chroma(
+            persist_directory=config.VECTOR_DB_DIR,
+            embedding_function=embeddings,
+            collection_name="gandhinagar_school"
+        )
     
     return vectorstore
 
-def add_character_to_index(char_data: dict, json_path: str):
-    """
-    Add a character to the RAG index.
-    
-    Args:
-        char_data: Character metadata dictionary
-        json_path: Path to the character JSON file
-    """
-    vectorstore = get_vectorstore()
-    
+def _add_in_batches(vectorstore, docs: list, ids: list):
+    """Write documents with one add_documents call per config.RAG_WRITE_BATCH_SIZE"""
+    size = max(1, config.RAG_WRITE_BATCH_SIZE)
+    with tracing.span("rag.write", docs=len(docs), bytes=sum(len(d.page_content.encode("utf-8")) for d in docs)):
+        for i in range(0, len(docs), size):
+            vectorstore.add_documents(docs[i:i + size], ids=ids[i:i + size])
+
+def _character_document(char_data: dict, json_path: str) -> Document:
     # Create searchable content
     content = f"""Name: {char_data.get('name', 'Unknown')}
 Role: {char_data.get('role', 'Unknown')}
@@ -73,7 +74,7 @@ Tags: {', '.join(char_data.get('tags', []))}
 Full Data:
 {json.dumps(char_data, indent=2)}"""
     
-    doc = Document(
+    return Document(
         page_content=content,
         metadata={
             "source": json_path,
@@ -82,10 +83,109 @@ Full Data:
             "character_id": char_data.get("id", "unknown")
         }
     )
+
+def add_character_to_index(char_data: dict, json_path: str):
+    """
+    Add a character to the RAG index.
     
-    vectorstore.add_documents([doc])
+    Args:
+        char_data: Character metadata dictionary
+        json_path: Path to the character JSON file
+    """
+    add_characters_to_index([(char_data, json_path)])
     print(f"[✓] Added {char_data.get('name')} to RAG index")
 
+def add_characters_to_index(items: list):
+    """
+    Add several characters to the RAG index with batched Chroma writes.
+    
+    Args:
+        items: List of (char_data, json_path) tuples
+    """
+    if not items:
+        return
+    vectorstore = get_vectorstore()
+    
+    docs = [_character_document(char_data, json_path) for char_data, json_path in items]
+    # Keyed by character ID so re-indexing an updated character replaces its entry
+    ids = [char_data.get("id") or str(uuid.uuid4()) for char_data, _ in items]
+    _add_in_batches(vectorstore, docs, ids)
+    if len(items) > 1:
+        print(f"[✓] Added {len(items)} characters to RAG index")
+
+# Paragraph breaks and markdown headings/list items start a new block
+_BLOCK_SPLIT = re.compile(r"\n\s*\n|\n(?=\s*(?:#|[-*] |\d+[.)] |\*\*))")
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+
+def chunk_id(story_id: str, index: int) -> str:
+    """Stable Chroma ID of a story chunk"""
+    return f"{story_id}::chunk-{index:03d}"
+
+def chunk_story(story_text: str, max_chars: int = None) -> list:
+    """
+    Split a story into chunks that fit the embedding model's input window.
+    
+    Paragraphs (and markdown headings/list items) are packed together up
+    to max_chars; longer paragraphs are split on sentence boundaries.
+    
+    Args:
+        story_text: Story text (plain or markdown)
+        max_chars: Chunk size limit (defaults to config.STORY_CHUNK_CHARS)
+    
+    Returns:
+        List of chunk strings (at least one for non-empty text)
+    """
+    max_chars = max_chars or config.STORY_CHUNK_CHARS
+    pieces = []
+    for block in _BLOCK_SPLIT.split(story_text or ""):
+        block = block.strip()
+        if not block:
+            continue
+        if len(block) <= max_chars:
+            pieces.append(block)
+            continue
+        current = ""
+        for sentence in _SENTENCE_SPLIT.split(block):
+            # Hard-wrap the rare sentence that is longer than a whole chunk
+            for part in (sentence[i:i + max_chars] for i in range(0, len(sentence), max_chars)):
+                if current and len(current) + 1 + len(part) > max_chars:
+                    pieces.append(current)
+                    current = part
+                else:
+                    current = f"{current} {part}" if current else part
+        if current:
+            pieces.append(current)
+    
+    chunks, current = [], ""
+    for piece in pieces:
+        if current and len(current) + 2 + len(piece) > max_chars:
+            chunks.append(current)
+            current = piece
+        else:
+            current = f"{current}\n\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+def _story_documents(story: dict) -> tuple:
+    """Build the chunk Documents and their IDs for a saved story"""
+    metadata = dict(story)
+    metadata["type"] = "story"
+    metadata["source"] = "user_generated"
+    metadata["story_id"] = story["id"]
+    # Chroma metadata values must be scalars; the text is the document itself
+    metadata.pop("content", None)
+    
+    chunks = chunk_story(story.get("content", ""))
+    docs, ids = [], []
+    for i, chunk in enumerate(chunks):
+        chunk_meta = dict(metadata, chunk_index=i, chunk_count=len(chunks))
+        # Keep the title with every chunk so a lone chunk still says which story it is
+        content = f"{story.get('title', '')}\n\n{chunk}" if story.get("title") else chunk
+        docs.append(Document(page_content=content, metadata=chunk_meta))
+        ids.append(chunk_id(story["id"], i))
+    return docs, ids
+
 def add_story_to_index(story_text: str, metadata: dict = None):
     """
     Add a story to the RAG index.
@@ -94,40 +194,77 @@ def add_story_to_index(story_text: str, metadata: dict = None):
         story_text: The full text of the story
         metadata: Optional metadata (date, title, etc.)
     """
-    vectorstore = get_vectorstore()
-    
     if metadata is None:
         metadata = {}
     
     # Ensure ID is in metadata for deletion later
     if "id" not in metadata:
         metadata["id"] = str(uuid.uuid4())
-        
-    metadata["type"] = "story"
-    metadata["source"] = "user_generated"
     
-    doc = Document(
-        page_content=story_text,
-        metadata=metadata
-    )
+    add_stories_to_index([dict(metadata, content=story_text)])
+
+def add_stories_to_index(stories: list):
+    """
+    Add several saved stories to the RAG index with batched Chroma writes.
+    
+    Each story is stored as chunks with IDs derived from the story ID;
+    chunks from a previous version of the story are removed first.
+    
+    Args:
+        stories: List of story dictionaries (as saved by story_manager)
+    """
+    if not stories:
+        return
+    vectorstore = get_vectorstore()
+    
+    docs, ids = [], []
+    for story in stories:
+        story_docs, story_ids = _story_documents(story)
+        docs.extend(story_docs)
+        ids.extend(story_ids)
     
-    # Use the ID as the document ID in Chroma
-    vectorstore.add_documents([doc], ids=[metadata["id"]])
-    print(f"[✓] Added story to RAG index (ID: {metadata['id']})")
+    _delete_stories(vectorstore, [story["id"] for story in stories])
+    _add_in_batches(vectorstore, docs, ids)
+    print(f"[✓] Added {len(stories)} stor{'y' if len(stories) == 1 else 'ies'} "
+          f"to RAG index ({len(docs)} chunks)")
 
-def delete_document(doc_id: str):
+def _delete_stories(vectorstore, doc_ids: list):
+    """Delete documents by ID together with every chunk belonging to them"""
+    doc_ids = list(doc_ids)
+    size = max(1, config.RAG_WRITE_BATCH_SIZE)
+    with tracing.span("rag.delete", docs=len(doc_ids)):
+        for i in range(0, len(doc_ids), size):
+            batch = doc_ids[i:i + size]
+            # Pre-chunking stories (and characters) are stored as one document keyed by their ID
+            vectorstore.delete(ids=batch)
+            vectorstore.delete(where={"story_id": {"$in": batch}})
+
+def delete_documents(doc_ids: list):
     """
-    Delete a document from the RAG index by ID.
+    Delete several documents (and all of their chunks) from the RAG index.
+    
+    Works for both story IDs and character IDs.
     
     Args:
-        doc_id: The ID of the document to delete
+        doc_ids: IDs of the documents to delete
     """
+    if not doc_ids:
+        return
     vectorstore = get_vectorstore()
     try:
-        vectorstore.delete(ids=[doc_id])
-        print(f"[✓] Deleted document {doc_id} from RAG index")
+        _delete_stories(vectorstore, doc_ids)
+        print(f"[✓] Deleted {len(doc_ids)} document(s) from RAG index")
     except Exception as e:
-        print(f"[WARN] Failed to delete document {doc_id}: {e}")
+        print(f"[WARN] Failed to delete documents {doc_ids}: {e}")
+
+def delete_document(doc_id: str):
+    """
+    Delete a document and all of its chunks from the RAG index by ID.
+    
+    Args:
+        doc_id: The ID of the document to delete
+    """
+    delete_documents([doc_id])
 
 def search_characters(query: str, k: int = 5) -> list:
     """
@@ -142,49 +279,27 @@ def search_characters(query: str, k: int = 5) -> list:
     """
     vectorstore = get_vectorstore()
     
-    try:
-        results = vectorstore.similarity_search(query, k=k)
-        return results
-    except Exception as e:
-        print(f"[WARN] Character search failed: {e}")
-        return []
+    with tracing.span("rag.search", k=k) as span:
+        try:
+            results = vectorstore.similarity_search(query, k=k)
+            span.set(docs=len(results))
+            return results
+        except Exception as e:
+            print(f"[WARN] Character search failed: {e}")
+            span.fail(type(e).__name__)
+            return []
 
 def get_all_characters() -> list:
     """
     Get all characters from the database.
     
+    The first call scans CHARACTERS_DIR (including legacy flat .json files);
+    later calls only re-read characters listed in the store's change journal.
+    
     Returns:
-        List of character metadata dictionaries
+        List of character metadata dictionaries (shared; copy one before modifying it)
     """
-    characters = []
-    
-    if not os.path.exists(config.CHARACTERS_DIR):
-        return characters
-    
-    for item_name in os.listdir(config.CHARACTERS_DIR):
-        item_path = os.path.join(config.CHARACTERS_DIR, item_name)
-        
-        # Check if it's a directory (new structure)
-        if os.path.isdir(item_path):
-            json_path = os.path.join(item_path, "metadata.json")
-            if os.path.exists(json_path):
-                try:
-                    with open(json_path, 'r', encoding='utf-8') as f:
-                        char_data = json.load(f)
-                        characters.append(char_data)
-                except Exception as e:
-                    print(f"[WARN] Failed to load {json_path}: {e}")
-        
-        # Check if it's a JSON file (old structure/fallback)
-        elif item_name.endswith('.json'):
-            try:
-                with open(item_path, 'r', encoding='utf-8') as f:
-                    char_data = json.load(f)
-                    characters.append(char_data)
-            except Exception as e:
-                print(f"[WARN] Failed to load {item_name}: {e}")
-    
-    return characters
+    return data_store.get_store(config.CHARACTERS_DIR, nested=True).all()
 
 if __name__ == "__main__":
     # Test
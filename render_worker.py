@@ -0,0 +1,218 @@
+"""
+Render Worker
+Background worker that runs queued prompt, comic render and portrait jobs from job_queue
+
+Usage:
+    python render_worker.py --concurrency 2
+"""
+import os
+import socket
+import threading
+import time
+import argparse
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+import config
+import job_queue
+import comic_jobs
+import comic_renderer
+import tracing
+
+# Seconds between sweeps for jobs left running by workers that stopped heartbeating
+REQUEUE_INTERVAL = 15
+
+_in_process_worker = None
+_in_process_lock = threading.Lock()
+
+def run_prompts_job(job: dict) -> dict:
+    """Generate panel prompts for a story"""
+    import prompt_generator
+
+    story = job["payload"]["story"]
+    job_queue.update_progress(job["id"], 0.1, "Writing panel prompts...")
+    prompts = prompt_generator.generate_comic_prompts(story)
+    return {"prompts": prompts}
+
+def run_render_job(job: dict) -> dict:
+    """Render (or resume) a comic from its prompts"""
+    payload = job["payload"]
+    comic_id = payload.get("comic_id")
+
+    comic_job = comic_jobs.load_job(comic_id) if comic_id else None
+    if comic_job is not None and not comic_job.get("prompts_complete", True):
+        # Its prompt stream was interrupted: generate the prompts again
+        return run_comic_job(dict(job, payload={"story": comic_job.get("story", ""), "comic_id": comic_id}))
+    if comic_job is None:
+        comic_job = comic_jobs.create_job(
+            payload["prompts"],
+            story=payload.get("story", ""),
+            comic_id=comic_id
+        )
+    comic_id = comic_job["id"]
+
+    comic_job = comic_jobs.run_job(
+        comic_id,
+        progress_callback=_progress_reporter(job),
+        should_cancel=lambda: job_queue.is_cancel_requested(job["id"])
+    )
+    return {
+        "comic_id": comic_id,
+        "status": comic_job["status"],
+        "image_paths": comic_jobs.image_paths(comic_job)
+    }
+
+def _progress_reporter(job: dict):
+    """Build a panel progress callback that reports to the queue"""
+    def on_panel_done(completed, total, panel_num, path):
+        outcome = "placeholder" if comic_renderer.is_placeholder(path) else ("done" if path else "failed")
+        job_queue.update_progress(job["id"], completed / total, f"Panel {panel_num} {outcome} ({completed}/{total})")
+    return on_panel_done
+
+def run_comic_job(job: dict) -> dict:
+    """
+    Generate prompts for a story and render the comic in one pipeline.
+
+    Prompts are streamed from Gemini and each panel starts rendering as soon
+    as its prompt is complete, instead of after the whole prompt list.
+    """
+    import prompt_generator
+
+    story = job["payload"]["story"]
+    job_queue.update_progress(job["id"], 0.0, "Writing panel prompts...")
+    comic_job = comic_jobs.run_streaming_job(
+        prompt_generator.stream_comic_prompts(story),
+        story=story,
+        comic_id=job["payload"].get("comic_id"),
+        progress_callback=_progress_reporter(job),
+        should_cancel=lambda: job_queue.is_cancel_requested(job["id"])
+    )
+    return {
+        "prompts": comic_job["prompts"],
+        "comic_id": comic_job["id"],
+        "status": comic_job["status"],
+        "image_paths": comic_jobs.image_paths(comic_job)
+    }
+
+def run_portrait_job(job: dict) -> dict:
+    """Generate a character's reference portrait (with retries)"""
+    import character_manager
+
+    char_id = job["payload"]["char_id"]
+    job_queue.update_progress(job["id"], 0.1, "Generating portrait...")
+    char_data = character_manager.generate_portrait(char_id)
+    if char_data.get("portrait_status") != character_manager.PORTRAIT_READY:
+        raise Exception(char_data.get("portrait_error", "Portrait generation failed"))
+    return {"char_id": char_id, "image_paths": char_data["image_paths"]}
+
+HANDLERS = {
+    job_queue.KIND_PROMPTS: run_prompts_job,
+    job_queue.KIND_RENDER: run_render_job,
+    job_queue.KIND_COMIC: run_comic_job,
+    job_queue.KIND_PORTRAIT: run_portrait_job,
+}
+
+def process_job(job: dict):
+    """Run a claimed job and record its outcome in the queue"""
+    handler = HANDLERS.get(job["kind"])
+    if handler is None:
+        job_queue.fail(job["id"], f"Unknown job kind: {job['kind']}")
+        return
+
+    print(f"[*] Worker started {job['kind']} job {job['id']}")
+    try:
+        # One trace per queued job; the comic ID (when known) tags every span inside
+        with tracing.trace(request_id=job["id"], comic_id=job["payload"].get("comic_id")):
+            with tracing.span(f"job.{job['kind']}"):
+                result = handler(job)
+        status = "cancelled" if job_queue.is_cancel_requested(job["id"]) else "done"
+        job_queue.complete(job["id"], result, status=status)
+        print(f"[✓] Job {job['id']} {status}")
+    except Exception as e:
+        traceback.print_exc()
+        job_queue.fail(job["id"], str(e))
+        print(f"[✗] Job {job['id']} failed: {e}")
+
+def run_worker(concurrency: int = None, poll_interval: float = None,
+               worker_id: str = None, stop_event: threading.Event = None):
+    """
+    Poll the queue and run up to `concurrency` jobs at a time.
+
+    Args:
+        concurrency: Concurrent jobs (defaults to config.WORKER_CONCURRENCY)
+        poll_interval: Seconds between polls when idle (defaults to config.WORKER_POLL_INTERVAL)
+        worker_id: Worker name used for heartbeats
+        stop_event: Optional event that stops the loop when set
+    """
+    concurrency = max(1, concurrency or config.WORKER_CONCURRENCY)
+    poll_interval = poll_interval or config.WORKER_POLL_INTERVAL
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    stop_event = stop_event or threading.Event()
+
+    print(f"[*] Render worker {worker_id} running {concurrency} job(s) at a time")
+    job_queue.heartbeat(worker_id)
+
+    active = set()
+    last_requeue = None
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="job") as executor:
+        while not stop_event.is_set():
+            job_queue.heartbeat(worker_id)
+            # Keep sweeping, so jobs of a worker that dies later are picked up too
+            if last_requeue is None or time.monotonic() - last_requeue >= REQUEUE_INTERVAL:
+                job_queue.requeue_stale()
+                last_requeue = time.monotonic()
+            active = {f for f in active if not f.done()}
+
+            claimed = False
+            while len(active) < concurrency:
+                job = job_queue.claim_next(worker_id)
+                if job is None:
+                    break
+                active.add(executor.submit(process_job, job))
+                claimed = True
+
+            if not claimed:
+                stop_event.wait(poll_interval)
+
+    print(f"[*] Render worker {worker_id} stopped")
+
+def ensure_worker_running() -> bool:
+    """
+    Start an in-process worker thread if no worker is sending heartbeats.
+
+    This keeps the app working without a separate `python render_worker.py`
+    process; jobs still run outside the Streamlit script, so reruns and
+    navigation do not abandon them.
+
+    Returns:
+        True if a new in-process worker was started
+    """
+    global _in_process_worker
+    with _in_process_lock:
+        if _in_process_worker is not None and _in_process_worker.is_alive():
+            return False
+        if job_queue.has_live_worker():
+            return False
+
+        _in_process_worker = threading.Thread(
+            target=run_worker,
+            kwargs={"worker_id": f"{socket.gethostname()}-app-{os.getpid()}"},
+            name="render-worker",
+            daemon=True
+        )
+        _in_process_worker.start()
+        return True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the background comic render worker")
+    parser.add_argument("--concurrency", type=int, default=config.WORKER_CONCURRENCY,
+                        help="Number of jobs to run at the same time")
+    parser.add_argument("--poll-interval", type=float, default=config.WORKER_POLL_INTERVAL,
+                        help="Seconds to wait between polls when the queue is empty")
+    parser.add_argument("--worker-id", default=None, help="Worker name shown in heartbeats")
+    args = parser.parse_args()
+
+    stop = threading.Event()
+    try:
+        run_worker(args.concurrency, args.poll_interval, args.worker_id, stop)
+    except KeyboardInterrupt:
+        stop.set()
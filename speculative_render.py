@@ -0,0 +1,173 @@
+"""
+Speculative Render Module
+Starts rendering an approved story's panels in the background before the user asks for the comic
+"""
+import json
+import time
+import uuid
+import hashlib
+import config
+import comic_jobs
+import job_queue
+import render_worker
+
+def prompts_key(prompts: list) -> str:
+    """
+    Hash the parts of a prompt list that affect the rendered panels.
+
+    Args:
+        prompts: List of prompt dictionaries from prompt_generator
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    canonical = [
+        {
+            "panel": p.get("panel", i + 1),
+            "image_prompt": p.get("image_prompt", ""),
+            "dialogue": p.get("dialogue", "")
+        }
+        for i, p in enumerate(prompts or [])
+    ]
+    payload = json.dumps(canonical, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def start_from_story(story: str) -> dict:
+    """
+    Queue a streaming prompts-and-render job for an approved story.
+
+    Panels start rendering while Gemini is still writing later prompts.
+    Call wait_for_prompts() to get the prompts for review.
+
+    Args:
+        story: Approved story text
+
+    Returns:
+        Dictionary with 'key' (None until the prompts are known), 'comic_id' and 'job_id'
+    """
+    comic_id = f"spec-{uuid.uuid4().hex[:10]}"
+    job = comic_jobs.create_job([], story=story, comic_id=comic_id)
+    job["prompts_complete"] = False
+    comic_jobs.save_job(job)
+    comic_jobs.mark_speculative(comic_id)
+
+    render_worker.ensure_worker_running()
+    job_id = job_queue.submit(job_queue.KIND_COMIC, {"story": story, "comic_id": comic_id})
+    print(f"[*] Streaming prompts and speculatively rendering comic {comic_id}")
+    return {"key": None, "comic_id": comic_id, "job_id": job_id}
+
+def _generate_directly(spec: dict) -> list:
+    """
+    Write the prompts in this process when no worker picked the job up in time.
+
+    The queued job is replaced by a render job for the same comic, which
+    runs whenever a worker is free.
+    """
+    import prompt_generator
+
+    comic_job = comic_jobs.load_job(spec["comic_id"]) or {}
+    story = comic_job.get("story", "")
+    print(f"[*] Worker busy, writing prompts for comic {spec['comic_id']} directly")
+    prompts = prompt_generator.generate_comic_prompts(story)
+
+    comic_jobs.create_job(prompts, story=story, comic_id=spec["comic_id"])
+    spec["job_id"] = job_queue.submit(job_queue.KIND_RENDER, {"comic_id": spec["comic_id"]})
+    spec["key"] = prompts_key(prompts)
+    return prompts
+
+def wait_for_prompts(spec: dict, poll_interval: float = None,
+                     claim_timeout: float = None, timeout: float = None) -> list:
+    """
+    Wait until a start_from_story() job has written all of its prompts.
+
+    Workers take jobs oldest first, so a comic queued earlier can hold the
+    prompt job back. If no worker claims it within claim_timeout seconds, it
+    is cancelled and the prompts are written in this process instead (the
+    panels are still rendered in the background).
+
+    Args:
+        spec: Dictionary returned by start_from_story(); its 'key' (and
+            'job_id' after a fallback) is filled in
+        poll_interval: Seconds between checks (defaults to config.WORKER_POLL_INTERVAL)
+        claim_timeout: Seconds to wait for a worker (defaults to config.SPECULATIVE_CLAIM_TIMEOUT)
+        timeout: Seconds to wait for the prompts in total (defaults to config.SPECULATIVE_PROMPT_TIMEOUT)
+
+    Returns:
+        List of prompt dictionaries
+
+    Raises:
+        Exception if the job failed, was cancelled or timed out before the prompts were complete
+    """
+    poll_interval = poll_interval or config.WORKER_POLL_INTERVAL
+    claim_timeout = claim_timeout or config.SPECULATIVE_CLAIM_TIMEOUT
+    timeout = timeout or config.SPECULATIVE_PROMPT_TIMEOUT
+    start = time.monotonic()
+    while True:
+        comic_job = comic_jobs.load_job(spec["comic_id"]) or {}
+        if comic_job.get("prompts_complete") and comic_job.get("prompts"):
+            spec["key"] = prompts_key(comic_job["prompts"])
+            return comic_job["prompts"]
+
+        queue_job = job_queue.get_status(spec["job_id"])
+        if queue_job is None or queue_job["status"] not in job_queue.ACTIVE_STATUSES:
+            # The job may have finished between the two reads
+            comic_job = comic_jobs.load_job(spec["comic_id"]) or {}
+            if comic_job.get("prompts_complete") and comic_job.get("prompts"):
+                continue
+            error = queue_job.get("error") if queue_job else "job not found"
+            raise Exception(f"Prompt generation failed: {error or 'job ' + queue_job['status']}")
+
+        waited = time.monotonic() - start
+        # cancel() only succeeds while the job is still queued, so a worker that just claimed it keeps it
+        if queue_job["status"] == "queued" and waited >= claim_timeout and job_queue.cancel(spec["job_id"]):
+            return _generate_directly(spec)
+        if waited >= timeout:
+            discard(spec)
+            raise Exception(f"Prompt generation timed out after {timeout:.0f}s")
+        time.sleep(poll_interval)
+
+def matches(spec: dict, prompts: list) -> bool:
+    """Check whether a speculative render produced exactly these prompts"""
+    return bool(spec) and bool(prompts) and spec.get("key") == prompts_key(prompts)
+
+def adopt(spec: dict) -> tuple:
+    """
+    Take over a speculative render as the user's comic.
+
+    Args:
+        spec: Dictionary returned by start_from_story()
+
+    Returns:
+        Tuple of (comic_id, render job ID); poll the job like any other render
+    """
+    comic_jobs.clear_speculative(spec["comic_id"])
+    print(f"[✓] Adopted speculative comic {spec['comic_id']}")
+    return spec["comic_id"], spec["job_id"]
+
+def discard(spec: dict):
+    """
+    Cancel a speculative render whose prompts are no longer current.
+
+    Panels already in flight finish and stay in the image cache; the comic
+    itself stays hidden.
+
+    Args:
+        spec: Dictionary returned by start_from_story()
+    """
+    if spec and job_queue.cancel(spec["job_id"]):
+        print(f"[*] Cancelled speculative render {spec['comic_id']}")
+
+def progress(spec: dict) -> float:
+    """Get the speculative render's progress (0.0 - 1.0)"""
+    queue_job = job_queue.get_status(spec["job_id"]) if spec else None
+    if not queue_job:
+        return 0.0
+    if queue_job["status"] == "done":
+        return 1.0
+    return queue_job["progress"] or 0.0
+
+if __name__ == "__main__":
+    # Test
+    sample = [{"panel": 1, "image_prompt": "School classroom", "dialogue": "Hi!"}]
+    print(prompts_key(sample))
+    print(f"Speculative rendering enabled by default: {config.SPECULATIVE_RENDERING}")
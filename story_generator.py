@@ -6,6 +6,7 @@ import google.generativeai as genai
 from langchain_chroma import Chroma
 from langchain_huggingface import HuggingFaceEmbeddings
 import config
+import tracing
 
 # Configure Gemini
 genai.configure(api_key=config.GOOGLE_API_KEY)
@@ -34,16 +35,18 @@ def generate_story(story_idea: str) -> str:
     Returns:
         Full story text (1-3 paragraphs, suitable for 6-panel comic)
     """
-    retriever = load_retriever()
-    context = ""
-    
-    # Get character context from RAG
-    if retriever:
-        try:
-            docs = retriever.invoke(story_idea)
-            context = "\n\n".join([d.page_content for d in docs])
-        except Exception as e:
-            print(f"[WARN] RAG query failed: {e}")
+    with tracing.span("story.retrieval") as span:
+        retriever = load_retriever()
+        context = ""
+        
+        # Get character context from RAG
+        if retriever:
+            try:
+                docs = retriever.invoke(story_idea)
+                context = "\n\n".join([d.page_content for d in docs])
+                span.set(docs=len(docs), bytes=len(context.encode("utf-8")))
+            except Exception as e:
+                print(f"[WARN] RAG query failed: {e}")
     
     # Build prompt
     prompt = f"""You are a creative storyteller for an all-ages comic strip.
@@ -64,9 +67,12 @@ REQUIREMENTS:
 Write the story now:"""
 
     try:
-        model = genai.GenerativeModel(config.GEMINI_MODEL)
-        response = model.generate_content(prompt)
-        return response.text.strip()
+        with tracing.span("story.llm", prompt_bytes=len(prompt.encode("utf-8"))) as span:
+            model = genai.GenerativeModel(config.GEMINI_MODEL)
+            response = model.generate_content(prompt)
+            story = response.text.strip()
+            span.set(bytes=len(story.encode("utf-8")))
+        return story
     except Exception as e:
         raise Exception(f"Story generation failed: {e}")
 
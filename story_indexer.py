@@ -0,0 +1,316 @@
+"""
+Story Indexer Module
+Write-behind RAG indexing for saved stories: changes are journaled on disk and
+embedded in batches by a background thread, so saving never waits on Chroma
+
+Usage:
+    python story_indexer.py           # index everything still pending and exit
+    python story_indexer.py --all     # re-index every saved story (e.g. after changing chunking)
+"""
+import os
+import argparse
+import json
+import time
+import uuid
+import threading
+import config
+import data_store
+
+OP_ADD = "add"
+OP_DELETE = "delete"
+OP_DONE = "done"
+OP_FAILED = "failed"
+
+# Rewrite the journal once it grows past this size (pending entries are kept)
+JOURNAL_COMPACT_BYTES = 64 * 1024
+
+_wake = threading.Event()
+_worker = None
+_worker_lock = threading.Lock()
+
+def _journal_lock():
+    return data_store.file_lock(f"{config.STORY_INDEX_JOURNAL}.lock")
+
+def _drain_lock():
+    """Held while a batch is indexed, so two processes never index the same entries"""
+    return data_store.file_lock(f"{config.STORY_INDEX_JOURNAL}.drain.lock")
+
+def _append(entries: list):
+    """Append entries to the pending-index journal (caller holds the journal lock)"""
+    os.makedirs(os.path.dirname(config.STORY_INDEX_JOURNAL) or ".", exist_ok=True)
+    with open(config.STORY_INDEX_JOURNAL, 'a', encoding='utf-8') as f:
+        for entry in entries:
+            f.write(json.dumps(entry) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    data_store.notify_change(config.STORY_INDEX_JOURNAL)
+
+def _replay() -> dict:
+    """
+    Rebuild the pending set from the journal.
+
+    An entry is cleared only by a "done" line carrying its own token, so a
+    story saved again while its previous version was being indexed stays pending.
+    A "failed" line with its token marks it failed (it gets an "error" key and
+    is not retried until the story is queued again).
+
+    Returns:
+        Dictionary of story_id -> latest pending {"op", "id", "token", "ts"[, "error"]}
+    """
+    pending = {}
+    if not os.path.exists(config.STORY_INDEX_JOURNAL):
+        return pending
+    with open(config.STORY_INDEX_JOURNAL, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # Torn last line from a crash mid-append
+            if entry.get("op") == OP_DONE:
+                current = pending.get(entry.get("id"))
+                if current and current["token"] == entry.get("token"):
+                    del pending[entry["id"]]
+            elif entry.get("op") == OP_FAILED:
+                current = pending.get(entry.get("id"))
+                if current and current["token"] == entry.get("token"):
+                    current["error"] = entry.get("error", "")
+            elif entry.get("op") in (OP_ADD, OP_DELETE):
+                pending[entry["id"]] = entry
+    return pending
+
+def _enqueue(op: str, story_ids: list, start_worker: bool = True):
+    now = time.time()
+    entries = [{"op": op, "id": story_id, "token": uuid.uuid4().hex, "ts": now} for story_id in story_ids]
+    if not entries:
+        return
+    with _journal_lock():
+        _append(entries)
+    if start_worker:
+        ensure_worker_running()
+        _wake.set()
+
+def enqueue_add(story_id: str):
+    """
+    Queue a saved story for indexing.
+
+    Args:
+        story_id: ID of a story in config.STORIES_DIR
+    """
+    _enqueue(OP_ADD, [story_id])
+
+def enqueue_delete(story_id: str):
+    """
+    Queue a story's removal from the index (replaces a pending add).
+
+    Args:
+        story_id: ID of the deleted story
+    """
+    _enqueue(OP_DELETE, [story_id])
+
+def enqueue_many(op: str, story_ids: list, start_worker: bool = True):
+    """
+    Queue many stories with a single journal write.
+
+    Args:
+        op: OP_ADD or OP_DELETE
+        story_ids: Story IDs
+        start_worker: Wake the background thread (pass False when the caller
+            runs flush_all() itself, e.g. from the command line)
+    """
+    _enqueue(op, list(story_ids), start_worker=start_worker)
+
+def _retryable(pending: dict) -> list:
+    """Pending entries that have not been marked failed"""
+    return [e for e in pending.values() if "error" not in e]
+
+def pending_ids() -> set:
+    """Get the IDs of stories whose indexing (or removal) has not finished yet"""
+    with _journal_lock():
+        return {e["id"] for e in _retryable(_replay())}
+
+def failed_ids() -> dict:
+    """
+    Get stories whose indexing kept failing and was given up.
+
+    Returns:
+        Dictionary of story_id -> error message
+    """
+    with _journal_lock():
+        return {e["id"]: e["error"] for e in _replay().values() if "error" in e}
+
+def retry_failed() -> int:
+    """
+    Queue every failed entry again.
+
+    Returns:
+        Number of stories queued
+    """
+    with _journal_lock():
+        failed = [e for e in _replay().values() if "error" in e]
+    for op in (OP_ADD, OP_DELETE):
+        _enqueue(op, [e["id"] for e in failed if e["op"] == op])
+    return len(failed)
+
+def _compact_locked(pending: dict):
+    """Drop finished entries from the journal (caller holds the journal lock)"""
+    path = config.STORY_INDEX_JOURNAL
+    if not pending:
+        if os.path.exists(path):
+            os.remove(path)
+    elif os.path.getsize(path) > JOURNAL_COMPACT_BYTES:
+        tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for entry in pending.values():
+                f.write(json.dumps(entry) + "\n")
+        os.replace(tmp_path, path)
+
+def _index_entries(store, entries: list) -> tuple:
+    """Apply journal entries to Chroma; returns (stories indexed, stories removed)"""
+    import rag_index
+
+    stories, delete_ids = [], []
+    for entry in entries:
+        if entry["op"] == OP_ADD:
+            story = store.get(entry["id"])
+            if story is not None:
+                stories.append(story)
+        else:
+            delete_ids.append(entry["id"])
+
+    if delete_ids:
+        rag_index.delete_documents(delete_ids)
+    if stories:
+        rag_index.add_stories_to_index(stories)
+    return len(stories), len(delete_ids)
+
+def flush_batch(batch_size: int = None, per_entry: bool = False) -> int:
+    """
+    Index one batch of pending stories.
+
+    Adds are embedded with a single Chroma write; stories deleted before
+    their turn are skipped. Entries are only marked done after Chroma
+    accepts them, so a crash leaves them pending for the next run. Every
+    process indexes under one cross-process drain lock, so the app, workers
+    and command line runs sharing the journal never index a batch twice.
+
+    Args:
+        batch_size: Maximum entries to process (defaults to config.STORY_INDEX_BATCH_SIZE)
+        per_entry: Index entries one at a time and mark the ones that still
+            fail as failed, instead of raising (used after the batch kept failing)
+
+    Returns:
+        Number of entries still pending afterwards (failed entries excluded)
+    """
+    batch_size = batch_size or config.STORY_INDEX_BATCH_SIZE
+    with _drain_lock():
+        return _flush_batch_locked(batch_size, per_entry)
+
+def _flush_batch_locked(batch_size: int, per_entry: bool) -> int:
+    """flush_batch() body (caller holds the drain lock)"""
+    with _journal_lock():
+        batch = sorted(_retryable(_replay()), key=lambda e: e["ts"])[:batch_size]
+    if not batch:
+        return 0
+
+    store = data_store.get_store(config.STORIES_DIR)
+    done, failed = [], []
+    indexed = removed = 0
+    if per_entry:
+        for entry in batch:
+            try:
+                added, deleted = _index_entries(store, [entry])
+            except Exception as e:
+                print(f"[✗] Giving up on indexing story {entry['id']}: {e}")
+                failed.append({"op": OP_FAILED, "id": entry["id"], "token": entry["token"],
+                               "error": str(e), "ts": time.time()})
+                continue
+            indexed, removed = indexed + added, removed + deleted
+            done.append(entry)
+    else:
+        indexed, removed = _index_entries(store, batch)
+        done = batch
+
+    with _journal_lock():
+        _append([{"op": OP_DONE, "id": e["id"], "token": e["token"], "ts": time.time()} for e in done] + failed)
+        pending = _replay()
+        _compact_locked(pending)
+
+    remaining = len(_retryable(pending))
+    print(f"[✓] Indexed {indexed} stor{'y' if indexed == 1 else 'ies'}, "
+          f"removed {removed} ({remaining} pending{f', {len(failed)} failed' if failed else ''})")
+    return remaining
+
+def flush_all(batch_size: int = None) -> int:
+    """
+    Index everything pending in the calling thread.
+
+    Args:
+        batch_size: Entries per Chroma write (defaults to config.STORY_INDEX_BATCH_SIZE)
+
+    Returns:
+        Number of entries processed
+    """
+    processed = 0
+    while True:
+        with _journal_lock():
+            before = len(_retryable(_replay()))
+        if not before:
+            return processed
+        remaining = flush_batch(batch_size)
+        processed += before - remaining
+
+def _run_worker():
+    failures = 0
+    while True:
+        _wake.wait()
+        # Let a burst of saves collect into one batch
+        time.sleep(config.STORY_INDEX_BATCH_DELAY)
+        _wake.clear()
+        try:
+            # A batch that keeps failing is split up, so one bad story cannot block the rest
+            remaining = flush_batch(per_entry=failures >= config.STORY_INDEX_MAX_RETRIES)
+            failures = 0
+        except Exception as e:
+            failures += 1
+            delay = min(60.0, config.STORY_INDEX_BATCH_DELAY * (2 ** failures))
+            print(f"[WARN] Story indexing failed, retrying in {delay:.0f}s: {e}")
+            time.sleep(delay)
+            _wake.set()
+            continue
+        if remaining:
+            _wake.set()
+
+def ensure_worker_running() -> bool:
+    """
+    Start the background indexing thread (and resume entries left pending by a restart).
+
+    Returns:
+        True if a new thread was started
+    """
+    global _worker
+    with _worker_lock:
+        if _worker is not None and _worker.is_alive():
+            return False
+        _worker = threading.Thread(target=_run_worker, name="story-indexer", daemon=True)
+        _worker.start()
+
+    if pending_ids():
+        _wake.set()
+    return True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Index saved stories into the RAG store")
+    parser.add_argument("--all", action="store_true", help="Queue every saved story before indexing")
+    args = parser.parse_args()
+
+    if args.all:
+        stories = data_store.get_store(config.STORIES_DIR).all()
+        enqueue_many(OP_ADD, [s["id"] for s in stories if s.get("id")], start_worker=False)
+
+    pending = pending_ids()
+    print(f"[*] {len(pending)} stor{'y' if len(pending) == 1 else 'ies'} pending")
+    failed = failed_ids()
+    if failed:
+        print(f"[WARN] {len(failed)} stor{'y' if len(failed) == 1 else 'ies'} failed to index "
+              f"(queue them again with --all)")
+    print(f"[✓] Processed {flush_all(config.RAG_WRITE_BATCH_SIZE)} entries")
@@ -1,43 +1,42 @@
 """
 Story Manager Module
-Handles saving, loading, and deleting stories on disk and in RAG.
+Handles saving, loading, and deleting stories on disk and in RAG (indexed write-behind).
 """
-import os
-import json
 import uuid
 from datetime import datetime
 import config
-import rag_index
+import data_store
+import story_indexer
+import tracing
+
+def _store() -> data_store.JsonStore:
+    return data_store.get_store(config.STORIES_DIR)
 
 def get_all_stories() -> list:
     """
     Get all saved stories sorted by date (newest first).
     
+    Only stories changed since the last call (per the store's change journal)
+    are re-read from disk, so other processes' saves show up without a rescan.
+    
     Returns:
-        List of story dictionaries
+        List of story dictionaries (shared; copy one before modifying it)
     """
-    stories = []
-    if not os.path.exists(config.STORIES_DIR):
-        os.makedirs(config.STORIES_DIR, exist_ok=True)
-        return stories
+    with tracing.span("stories.list") as span:
+        stories = _store().all()
         
-    for filename in os.listdir(config.STORIES_DIR):
-        if filename.endswith('.json'):
-            filepath = os.path.join(config.STORIES_DIR, filename)
-            try:
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    story_data = json.load(f)
-                    stories.append(story_data)
-            except Exception as e:
-                print(f"[WARN] Failed to load story {filename}: {e}")
-    
-    # Sort by date (newest first)
-    stories.sort(key=lambda x: x.get('created_at', ''), reverse=True)
+        # Sort by date (newest first)
+        stories.sort(key=lambda x: x.get('created_at', ''), reverse=True)
+        span.set(items=len(stories))
     return stories
 
+@tracing.traced("stories.save")
 def save_story(story_text: str, title: str = None) -> dict:
     """
-    Save a story to disk and RAG.
+    Save a story to disk and queue it for RAG indexing.
+    
+    Embedding happens later on the story_indexer thread, so this returns
+    as soon as the JSON is written.
     
     Args:
         story_text: Content of the story
@@ -46,9 +45,6 @@ def save_story(story_text: str, title: str = None) -> dict:
     Returns:
         The saved story dictionary
     """
-    if not os.path.exists(config.STORIES_DIR):
-        os.makedirs(config.STORIES_DIR, exist_ok=True)
-        
     story_id = str(uuid.uuid4())
     timestamp = datetime.now().isoformat()
     
@@ -64,22 +60,19 @@ def save_story(story_text: str, title: str = None) -> dict:
         "type": "story"
     }
     
-    # Save to disk
-    filename = f"{story_id}.json"
-    filepath = os.path.join(config.STORIES_DIR, filename)
-    
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(story_data, f, indent=2)
+    # Save to disk (atomic write + change journal entry)
+    _store().put(story_data)
         
-    # Add to RAG
-    rag_index.add_story_to_index(story_text, metadata=story_data)
+    # Index in the background (journaled, so it survives a restart)
+    story_indexer.enqueue_add(story_id)
     
-    print(f"[✓] Story '{title}' saved and indexed.")
+    print(f"[✓] Story '{title}' saved (indexing queued).")
     return story_data
 
+@tracing.traced("stories.delete")
 def delete_story(story_id: str) -> bool:
     """
-    Delete a story from disk and RAG.
+    Delete a story from disk and queue its removal from RAG.
     
     Args:
         story_id: ID of the story to delete
@@ -87,25 +80,105 @@ def delete_story(story_id: str) -> bool:
     Returns:
         True if successful, False otherwise
     """
-    filename = f"{story_id}.json"
-    filepath = os.path.join(config.STORIES_DIR, filename)
-    
     # Delete from disk
-    if os.path.exists(filepath):
-        try:
-            os.remove(filepath)
-        except Exception as e:
-            print(f"[ERR] Failed to delete file {filepath}: {e}")
-            return False
-    else:
-        print(f"[WARN] Story file {filepath} not found.")
+    try:
+        if not _store().delete(story_id):
+            print(f"[WARN] Story file {_store().path_for(story_id)} not found.")
+    except Exception as e:
+        print(f"[ERR] Failed to delete story {story_id}: {e}")
+        return False
         
-    # Delete from RAG
-    rag_index.delete_document(story_id)
+    # Delete from RAG (write-behind, replaces a pending add)
+    story_indexer.enqueue_delete(story_id)
     
     print(f"[✓] Story {story_id} deleted.")
     return True
 
+@tracing.traced("stories.import")
+def import_stories(records, index_now: bool = False) -> list:
+    """
+    Save many stories at once (e.g. from a JSONL archive).
+    
+    Files are written under one store lock and queued for indexing with a
+    single journal write; embedding and Chroma writes then happen in
+    batches of config.RAG_WRITE_BATCH_SIZE.
+    
+    Args:
+        records: Iterable of story dictionaries; "content" is required, and
+            "id", "title" and "created_at" are kept when present
+        index_now: Index in the calling thread before returning (command
+            line use) instead of on the background indexer
+    
+    Returns:
+        List of saved story dictionaries
+    """
+    stories = []
+    for record in records:
+        content = record.get("content", "")
+        if not content.strip():
+            print(f"[WARN] Skipping story without content: {record.get('id') or record.get('title')}")
+            continue
+        # IDs become file names under STORIES_DIR; never let one point elsewhere
+        if record.get("id") and not data_store.is_valid_id(record["id"]):
+            print(f"[WARN] Skipping story with invalid ID: {record['id']!r}")
+            continue
+        stories.append({
+            "id": record.get("id") or str(uuid.uuid4()),
+            "title": record.get("title") or " ".join(content.split()[:5]) + "...",
+            "content": content,
+            "created_at": record.get("created_at") or datetime.now().isoformat(),
+            "type": "story"
+        })
+    if not stories:
+        return stories
+    
+    _store().put_many(stories)
+    story_indexer.enqueue_many(story_indexer.OP_ADD, [s["id"] for s in stories], start_worker=not index_now)
+    if index_now:
+        _index_now()
+    
+    print(f"[✓] Imported {len(stories)} stories")
+    return stories
+
+def _index_now() -> bool:
+    """
+    Index queued stories in the calling thread.
+
+    The stories are already saved, so an indexing error does not fail the
+    caller: the entries stay in the journal for the background indexer
+    (which retries, then marks persistent failures, see story_indexer).
+
+    Returns:
+        True if everything queued was indexed
+    """
+    try:
+        story_indexer.flush_all(config.RAG_WRITE_BATCH_SIZE)
+        return True
+    except Exception as e:
+        print(f"[WARN] Stories saved, but indexing failed; they stay queued for retry: {e}")
+        return False
+
+@tracing.traced("stories.delete_many")
+def delete_stories(story_ids: list, index_now: bool = False) -> int:
+    """
+    Delete many stories from disk and RAG with batched writes.
+    
+    Args:
+        story_ids: IDs of the stories to delete
+        index_now: Remove them from RAG in the calling thread before returning
+    
+    Returns:
+        Number of story files removed
+    """
+    story_ids = [s for s in story_ids if data_store.is_valid_id(s)]
+    removed = _store().delete_many(story_ids)
+    story_indexer.enqueue_many(story_indexer.OP_DELETE, story_ids, start_worker=not index_now)
+    if index_now:
+        _index_now()
+    
+    print(f"[✓] Deleted {removed} of {len(story_ids)} stories")
+    return removed
+
 if __name__ == "__main__":
     # Test
     s = save_story("Once upon a time in Gandhinagar...", "Test Story")
@@ -0,0 +1,222 @@
+"""
+Text Overlay Module
+Draws dialogue boxes on comic panels with cached fonts and pixel-accurate wrapping
+"""
+import threading
+from PIL import Image, ImageDraw, ImageFont
+import config
+
+# Process-level caches shared by every render thread
+_font_cache = {}
+_glyph_widths = {}
+_cache_lock = threading.Lock()
+
+# Dialogue box layout (pixels)
+BOX_PADDING = 25
+BOX_MARGIN = 20
+BOX_BOTTOM_OFFSET = 30
+BORDER_WIDTH = 4
+LINE_SPACING = 4
+
+def get_font(path: str, size: int) -> ImageFont.ImageFont:
+    """
+    Load a TrueType font once per (path, size).
+
+    Args:
+        path: Font file path or name resolvable by Pillow
+        size: Font size in points
+
+    Returns:
+        ImageFont instance
+
+    Raises:
+        OSError if the font cannot be loaded
+    """
+    key = (path, size)
+    font = _font_cache.get(key)
+    if font is None:
+        font = ImageFont.truetype(path, size)
+        with _cache_lock:
+            _font_cache.setdefault(key, font)
+    return font
+
+def get_dialogue_font(size: int = None) -> ImageFont.ImageFont:
+    """
+    Get the dialogue font, trying config.DIALOGUE_FONT_PATHS in order.
+
+    Args:
+        size: Font size (defaults to config.DIALOGUE_FONT_SIZE)
+
+    Returns:
+        First loadable font, or Pillow's default bitmap font
+    """
+    size = size or config.DIALOGUE_FONT_SIZE
+    key = ("__dialogue__", size)
+    font = _font_cache.get(key)
+    if font is not None:
+        return font
+
+    font = None
+    for path in config.DIALOGUE_FONT_PATHS:
+        try:
+            font = get_font(path, size)
+            break
+        except OSError:
+            continue
+    if font is None:
+        font = ImageFont.load_default()
+
+    with _cache_lock:
+        _font_cache.setdefault(key, font)
+    return font
+
+def _widths_for(font) -> dict:
+    """Get the glyph width table for a font"""
+    table = _glyph_widths.get(font)
+    if table is None:
+        with _cache_lock:
+            table = _glyph_widths.setdefault(font, {})
+    return table
+
+def measure_text(text: str, font) -> float:
+    """
+    Measure the rendered width of a single line, reusing cached glyph widths.
+
+    Args:
+        text: Line of text
+        font: Font from get_font()/get_dialogue_font()
+
+    Returns:
+        Width in pixels
+    """
+    table = _widths_for(font)
+    width = 0.0
+    for char in text:
+        char_w = table.get(char)
+        if char_w is None:
+            char_w = font.getlength(char)
+            table[char] = char_w
+        width += char_w
+    return width
+
+def wrap_text(text: str, font, max_width: float) -> list:
+    """
+    Wrap text so that every line fits within max_width pixels.
+
+    Words longer than a line are broken across lines character by character.
+
+    Args:
+        text: Text to wrap
+        font: Font used for measuring
+        max_width: Available width in pixels
+
+    Returns:
+        List of (line, width) tuples
+    """
+    space_w = measure_text(" ", font)
+    lines = []
+    current, current_w = [], 0.0
+
+    for word in text.split():
+        word_w = measure_text(word, font)
+
+        # Break words that can never fit on one line
+        while word_w > max_width and len(word) > 1:
+            if current:
+                lines.append((" ".join(current), current_w))
+                current, current_w = [], 0.0
+            cut = len(word) - 1
+            while cut > 1 and measure_text(word[:cut], font) > max_width:
+                cut -= 1
+            head = word[:cut]
+            lines.append((head, measure_text(head, font)))
+            word = word[cut:]
+            word_w = measure_text(word, font)
+
+        needed = word_w if not current else current_w + space_w + word_w
+        if current and needed > max_width:
+            lines.append((" ".join(current), current_w))
+            current, current_w = [word], word_w
+        else:
+            current.append(word)
+            current_w = needed
+
+    if current:
+        lines.append((" ".join(current), current_w))
+    return lines
+
+def draw_dialogue_box(image: Image.Image, dialogue: str, font=None) -> Image.Image:
+    """
+    Draw a dialogue box near the bottom of the image, in place.
+
+    Only the bubble region is rendered: the box is drawn on a small tile and
+    pasted onto the frame, so the full image is never copied.
+
+    Args:
+        image: PIL Image (modified in place)
+        dialogue: Text to display
+        font: Optional font (defaults to get_dialogue_font())
+
+    Returns:
+        The same image, for chaining
+    """
+    if not dialogue or not dialogue.strip():
+        return image
+
+    font = font or get_dialogue_font()
+    width, height = image.size
+
+    max_box_w = width - (BOX_MARGIN * 2)
+    max_text_w = max(1, max_box_w - (BOX_PADDING * 2))
+    lines = wrap_text(dialogue, font, max_text_w)
+
+    # Line metrics from the font rather than per-call bounding boxes
+    try:
+        ascent, descent = font.getmetrics()
+        line_h = ascent + descent
+    except AttributeError:
+        line_h = font.getbbox("Ag")[3]
+    text_w = max(w for _, w in lines)
+    text_h = line_h * len(lines) + LINE_SPACING * (len(lines) - 1)
+
+    # Box dimensions
+    box_w = int(min(max_box_w, text_w + (BOX_PADDING * 2)))
+    box_h = int(text_h + (BOX_PADDING * 2))
+    box_x = (width - box_w) // 2
+    box_y = max(0, height - box_h - BOX_BOTTOM_OFFSET)
+
+    # Render the bubble on its own tile
+    tile_mode = "RGBA" if image.mode == "RGBA" else "RGB"
+    tile = Image.new(tile_mode, (box_w + 1, box_h + 1), "white")
+    draw = ImageDraw.Draw(tile)
+    draw.rectangle(
+        [(0, 0), (box_w, box_h)],
+        fill="white",
+        outline="black",
+        width=BORDER_WIDTH
+    )
+
+    # Draw text (each line centered)
+    y = BOX_PADDING
+    for line, line_w in lines:
+        x = (box_w - line_w) / 2
+        draw.text((x, y), line, fill="black", font=font)
+        y += line_h + LINE_SPACING
+
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGB")
+    image.paste(tile, (box_x, box_y))
+    return image
+
+def clear_caches():
+    """Drop all cached fonts and glyph widths"""
+    with _cache_lock:
+        _font_cache.clear()
+        _glyph_widths.clear()
+
+if __name__ == "__main__":
+    # Test
+    img = Image.new("RGB", (1024, 576), "skyblue")
+    draw_dialogue_box(img, "Relax yaar, sab set hai. The exam is tomorrow, not today!")
+    img.save("overlay_test.png")
+    print("Saved overlay_test.png")
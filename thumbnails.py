@@ -0,0 +1,153 @@
+"""
+Thumbnails Module
+Generates small preview images once per (source path, mtime, size) for gallery views
+"""
+import os
+import hashlib
+import threading
+import uuid
+from PIL import Image
+import config
+
+_lock = threading.Lock()
+_memo = {}           # (abs path, mtime_ns, size) -> thumbnail path
+_created_since_sweep = 0
+SWEEP_EVERY = 50     # Check the cache size after this many new thumbnails
+
+_stats = {
+    "hits": 0,
+    "misses": 0,
+    "evictions": 0
+}
+
+def _thumb_path(source: str, mtime_ns: int, size: int) -> str:
+    digest = hashlib.sha1(f"{source}|{mtime_ns}|{size}".encode("utf-8")).hexdigest()
+    return os.path.join(config.THUMBNAIL_DIR, digest[:2], f"{digest}.webp")
+
+def get_thumbnail(path: str, size: int = None) -> str:
+    """
+    Get a thumbnail for an image, creating it on first use.
+
+    Args:
+        path: Source image path
+        size: Longest edge in pixels (defaults to config.THUMBNAIL_SIZE)
+
+    Returns:
+        Thumbnail path, or the source path if a thumbnail cannot be made
+    """
+    size = size or config.THUMBNAIL_SIZE
+    source = os.path.abspath(path)
+    try:
+        mtime_ns = os.stat(source).st_mtime_ns
+    except OSError:
+        return path
+
+    key = (source, mtime_ns, size)
+    thumb = _memo.get(key)
+    if thumb == path:
+        # Known unreadable source; retried only once the file changes
+        return path
+    if thumb and os.path.exists(thumb):
+        with _lock:
+            _stats["hits"] += 1
+        return thumb
+
+    thumb = _thumb_path(source, mtime_ns, size)
+    if os.path.exists(thumb):
+        with _lock:
+            _stats["hits"] += 1
+            _memo[key] = thumb
+        return thumb
+
+    try:
+        _create_thumbnail(source, thumb, size)
+    except Exception as e:
+        print(f"[WARN] Failed to create thumbnail for {path}: {e}")
+        with _lock:
+            _memo[key] = path
+        return path
+
+    with _lock:
+        _stats["misses"] += 1
+        _memo[key] = thumb
+    _maybe_sweep()
+    return thumb
+
+def _create_thumbnail(source: str, thumb: str, size: int):
+    """Decode at reduced size where possible, shrink and save as WebP"""
+    with Image.open(source) as img:
+        # JPEG can decode directly at a fraction of full resolution
+        img.draft("RGB", (size, size))
+        img.thumbnail((size, size))
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+
+        os.makedirs(os.path.dirname(thumb), exist_ok=True)
+        tmp_path = f"{thumb}.{uuid.uuid4().hex[:8]}.tmp"
+        img.save(tmp_path, format="WEBP", quality=80, method=4)
+    os.replace(tmp_path, thumb)
+
+def _maybe_sweep():
+    """Evict the oldest thumbnails once the cache exceeds its size limit"""
+    global _created_since_sweep
+    with _lock:
+        _created_since_sweep += 1
+        if _created_since_sweep < SWEEP_EVERY:
+            return
+        _created_since_sweep = 0
+    evict()
+
+def evict(max_bytes: int = None) -> int:
+    """
+    Delete least recently created thumbnails until the cache fits.
+
+    Args:
+        max_bytes: Size limit (defaults to config.THUMBNAIL_CACHE_MAX_BYTES)
+
+    Returns:
+        Number of thumbnails removed
+    """
+    max_bytes = max_bytes if max_bytes is not None else config.THUMBNAIL_CACHE_MAX_BYTES
+    if not os.path.exists(config.THUMBNAIL_DIR):
+        return 0
+
+    entries = []
+    for root, dirs, files in os.walk(config.THUMBNAIL_DIR):
+        for file in files:
+            if file.endswith(".webp"):
+                file_path = os.path.join(root, file)
+                try:
+                    st = os.stat(file_path)
+                    entries.append((st.st_mtime, st.st_size, file_path))
+                except OSError:
+                    continue
+
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, file_path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(file_path)
+            total -= size
+            removed += 1
+        except OSError:
+            pass
+
+    if removed:
+        with _lock:
+            _stats["evictions"] += removed
+            _memo.clear()
+        print(f"[*] Evicted {removed} thumbnail(s)")
+    return removed
+
+def get_stats() -> dict:
+    """Get thumbnail cache hit metrics"""
+    with _lock:
+        return dict(_stats)
+
+if __name__ == "__main__":
+    # Test
+    for name in os.listdir(config.IMAGES_DIR):
+        print(f"{name} -> {get_thumbnail(os.path.join(config.IMAGES_DIR, name))}")
+    print(get_stats())
@@ -0,0 +1,420 @@
+"""
+Tracing Module
+Lightweight per-stage timing spans (durations, payload sizes, cache hits) correlated
+by request and comic ID, exported as a JSON lines log and a Prometheus text file
+
+Usage:
+    with tracing.trace(comic_id=comic_id):          # correlate everything inside
+        with tracing.span("image.fetch") as s:       # time one stage
+            data = fetch(...)
+            s.set(bytes=len(data), cache_hit=False)
+
+Spans nest: a span started inside another records it as its parent, and all
+spans inside a trace() block share its trace ID and attributes. Thread pools do
+not inherit the context on their own; submit bind(fn) instead of fn.
+"""
+import os
+import json
+import math
+import time
+import uuid
+import atexit
+import bisect
+import functools
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+import config
+
+# Histogram bucket upper bounds in seconds (Prometheus "le" labels)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+SAMPLE_WINDOW = 512     # Recent durations kept per span name for p50/p95
+RECENT_SPANS = 2000     # Finished spans kept for per-comic breakdowns
+FLUSH_INTERVAL = 1.0    # Seconds between background writes of the JSON log
+METRIC_PREFIX = "comic_span"
+
+# Active trace: {"trace_id", "span_id", "attrs"} or None
+_context = contextvars.ContextVar("comic_trace", default=None)
+
+_lock = threading.Lock()
+_metrics = {}                           # span name -> aggregate
+_recent = deque(maxlen=RECENT_SPANS)    # finished span records
+_pending = []                           # span records not yet written to the log
+_last_export = [0.0]
+_log_lock = threading.Lock()
+_flusher = None
+
+class Span:
+    """A running span; set() attaches attributes such as bytes=..., cache_hit=..., docs=..."""
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "attrs", "start", "error")
+
+    def __init__(self, name: str, parent: dict, attrs: dict):
+        self.name = name
+        self.trace_id = parent["trace_id"] if parent else os.urandom(8).hex()
+        self.span_id = os.urandom(4).hex()
+        self.parent_id = parent["span_id"] if parent else None
+        self.attrs = dict(parent["attrs"]) if parent else {}
+        self.attrs.update(attrs)
+        self.start = time.perf_counter()
+        self.error = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+        return self
+
+    def fail(self, reason: str):
+        """Count the span as an error without raising (for stages that return None on failure)"""
+        self.error = reason
+        return self
+
+class _NoopSpan:
+    def set(self, **attrs):
+        return self
+
+    def fail(self, reason: str):
+        return self
+
+_NOOP = _NoopSpan()
+
+def _reset(token, previous):
+    try:
+        _context.reset(token)
+    except ValueError:
+        # Finished in a different context (e.g. a generator resumed elsewhere)
+        _context.set(previous)
+
+@contextmanager
+def trace(**attrs):
+    """
+    Correlate every span inside the block.
+
+    Starts a new trace (one per request) unless one is already active, and
+    adds the given attributes, e.g. comic_id=... or request_id=..., to every
+    span recorded inside it. None values are ignored.
+
+    Yields:
+        The trace ID
+    """
+    previous = _context.get()
+    attrs = {k: v for k, v in attrs.items() if v is not None}
+    current = {
+        "trace_id": previous["trace_id"] if previous else os.urandom(8).hex(),
+        "span_id": previous["span_id"] if previous else None,
+        "attrs": dict(previous["attrs"], **attrs) if previous else attrs
+    }
+    token = _context.set(current)
+    try:
+        yield current["trace_id"]
+    finally:
+        _reset(token, previous)
+
+@contextmanager
+def span(name: str, attach: bool = True, **attrs):
+    """
+    Time a block as one stage.
+
+    Args:
+        name: Stage name, "<area>.<stage>" (e.g. "story.llm", "image.fetch")
+        attach: Make this span the parent of spans started inside the block;
+            pass False in generators, whose body runs interleaved with the caller
+        **attrs: Initial attributes (more can be added with Span.set)
+
+    Yields:
+        Span (a no-op object when config.TRACING_ENABLED is off)
+    """
+    if not config.TRACING_ENABLED:
+        yield _NOOP
+        return
+
+    previous = _context.get()
+    current = Span(name, previous, attrs)
+    token = None
+    if attach:
+        token = _context.set({"trace_id": current.trace_id, "span_id": current.span_id,
+                              "attrs": dict(previous["attrs"]) if previous else {}})
+    error = None
+    try:
+        yield current
+    except Exception as e:
+        error = type(e).__name__
+        raise
+    finally:
+        duration = time.perf_counter() - current.start
+        if token is not None:
+            _reset(token, previous)
+        _finish(current, duration, error or current.error)
+
+def traced(name: str):
+    """Decorator form of span() for whole functions"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def bind(func):
+    """
+    Wrap func to run in the caller's trace context (for thread pools and threads).
+
+    Each call runs in its own copy, so one bound function can run on several threads at once.
+    """
+    context = contextvars.copy_context()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return context.copy().run(func, *args, **kwargs)
+    return wrapper
+
+def current_trace_id() -> str:
+    """Trace ID of the active trace, or None"""
+    active = _context.get()
+    return active["trace_id"] if active else None
+
+# ============================================================================
+# Recording
+# ============================================================================
+def _finish(current: Span, duration: float, error: str):
+    record = {
+        "ts": round(time.time(), 3),
+        "trace_id": current.trace_id,
+        "span_id": current.span_id,
+        "parent_id": current.parent_id,
+        "name": current.name,
+        "duration_ms": round(duration * 1000, 3),
+        "status": "error" if error else "ok",
+    }
+    if error:
+        record["error"] = error
+    record.update(current.attrs)
+
+    with _lock:
+        m = _metrics.get(current.name)
+        if m is None:
+            m = _metrics[current.name] = {
+                "count": 0, "errors": 0, "sum": 0.0, "bytes": 0,
+                "cache_hits": 0, "cache_misses": 0,
+                "buckets": [0] * len(BUCKETS),
+                "samples": deque(maxlen=SAMPLE_WINDOW)
+            }
+        m["count"] += 1
+        m["sum"] += duration
+        m["samples"].append(duration)
+        index = bisect.bisect_left(BUCKETS, duration)
+        if index < len(BUCKETS):
+            m["buckets"][index] += 1
+        if error:
+            m["errors"] += 1
+        if isinstance(current.attrs.get("bytes"), int):
+            m["bytes"] += current.attrs["bytes"]
+        if "cache_hit" in current.attrs:
+            m["cache_hits" if current.attrs["cache_hit"] else "cache_misses"] += 1
+        _recent.append(record)
+        if config.TRACE_LOG_PATH:
+            _pending.append(record)
+
+    if _flusher is None:
+        _start_flusher()
+
+def _start_flusher():
+    """Start the thread that writes the log and metrics file off the request path"""
+    global _flusher
+    with _log_lock:
+        if _flusher is not None:
+            return
+        _flusher = threading.Thread(target=_flush_loop, name="trace-flusher", daemon=True)
+        _flusher.start()
+
+def _flush_loop():
+    while True:
+        time.sleep(FLUSH_INTERVAL)
+        flush()
+
+def flush():
+    """Write buffered spans to the JSON log, and the metrics file if TRACE_EXPORT_INTERVAL has passed"""
+    with _lock:
+        records = _pending[:]
+        del _pending[:]
+        export_due = (config.TRACE_METRICS_PATH and
+                      time.monotonic() - _last_export[0] >= config.TRACE_EXPORT_INTERVAL)
+        if export_due:
+            _last_export[0] = time.monotonic()
+
+    if records:
+        _write_log(records)
+    if export_due:
+        export_metrics()
+
+def _write_log(records: list):
+    """Append JSON lines to config.TRACE_LOG_PATH (rotated to .1 past TRACE_LOG_MAX_BYTES)"""
+    path = config.TRACE_LOG_PATH
+    if not path:
+        return
+    lines = "".join(json.dumps(record, default=str) + "\n" for record in records)
+    try:
+        with _log_lock:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            if os.path.exists(path) and os.path.getsize(path) > config.TRACE_LOG_MAX_BYTES:
+                os.replace(path, path + ".1")
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(lines)
+    except OSError as e:
+        print(f"[WARN] Trace log write failed: {e}")
+
+# ============================================================================
+# Export
+# ============================================================================
+def _percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile (0 for an empty list)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+def _label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def render_prometheus() -> str:
+    """
+    Render the aggregated spans in the Prometheus text exposition format.
+
+    Returns:
+        Metrics text (histogram of durations plus error, payload and cache counters)
+    """
+    with _lock:
+        snapshot = {name: dict(m, buckets=list(m["buckets"])) for name, m in _metrics.items()}
+
+    lines = [
+        f"# HELP {METRIC_PREFIX}_duration_seconds Time spent in each pipeline stage",
+        f"# TYPE {METRIC_PREFIX}_duration_seconds histogram",
+    ]
+    for name, m in sorted(snapshot.items()):
+        label = f'span="{_label(name)}"'
+        cumulative = 0
+        for bound, count in zip(BUCKETS, m["buckets"]):
+            cumulative += count
+            lines.append(f'{METRIC_PREFIX}_duration_seconds_bucket{{{label},le="{bound}"}} {cumulative}')
+        lines.append(f'{METRIC_PREFIX}_duration_seconds_bucket{{{label},le="+Inf"}} {m["count"]}')
+        lines.append(f'{METRIC_PREFIX}_duration_seconds_sum{{{label}}} {m["sum"]:.6f}')
+        lines.append(f'{METRIC_PREFIX}_duration_seconds_count{{{label}}} {m["count"]}')
+
+    counters = [
+        ("errors_total", "Spans that ended with an exception", lambda m: [("", m["errors"])]),
+        ("payload_bytes_total", "Payload bytes recorded by each stage", lambda m: [("", m["bytes"])]),
+        ("cache_requests_total", "Cache lookups by result",
+         lambda m: [(',result="hit"', m["cache_hits"]), (',result="miss"', m["cache_misses"])]
+         if m["cache_hits"] or m["cache_misses"] else []),
+    ]
+    for suffix, help_text, values in counters:
+        lines.append(f"# HELP {METRIC_PREFIX}_{suffix} {help_text}")
+        lines.append(f"# TYPE {METRIC_PREFIX}_{suffix} counter")
+        for name, m in sorted(snapshot.items()):
+            for extra, value in values(m):
+                lines.append(f'{METRIC_PREFIX}_{suffix}{{span="{_label(name)}"{extra}}} {value}')
+    return "\n".join(lines) + "\n"
+
+def export_metrics(path: str = None) -> str:
+    """
+    Write the Prometheus metrics file atomically (for a textfile collector or local scraper).
+
+    Args:
+        path: Destination (defaults to config.TRACE_METRICS_PATH)
+
+    Returns:
+        Path written, or None if no path is configured
+    """
+    path = path or config.TRACE_METRICS_PATH
+    if not path:
+        return None
+    try:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(render_prometheus())
+        os.replace(tmp_path, path)
+        return path
+    except OSError as e:
+        print(f"[WARN] Metrics export failed: {e}")
+        return None
+
+def _flush_at_exit():
+    _last_export[0] = 0.0
+    if _metrics:
+        flush()
+
+atexit.register(_flush_at_exit)
+
+def get_summary() -> dict:
+    """
+    Get per-stage statistics for this process.
+
+    Returns:
+        Dictionary of span name -> {"count", "errors", "p50_ms", "p95_ms",
+        "total_ms", "bytes", "cache_hits", "cache_misses"}
+    """
+    with _lock:
+        snapshot = {name: (dict(m), list(m["samples"])) for name, m in _metrics.items()}
+    return {
+        name: {
+            "count": m["count"],
+            "errors": m["errors"],
+            "p50_ms": round(_percentile(samples, 50) * 1000, 2),
+            "p95_ms": round(_percentile(samples, 95) * 1000, 2),
+            "total_ms": round(m["sum"] * 1000, 2),
+            "bytes": m["bytes"],
+            "cache_hits": m["cache_hits"],
+            "cache_misses": m["cache_misses"]
+        }
+        for name, (m, samples) in snapshot.items()
+    }
+
+def comic_breakdown(comic_id: str = None) -> tuple:
+    """
+    Time spent per stage for one comic, from the recent spans of this process.
+
+    Args:
+        comic_id: Comic to summarize (defaults to the most recently traced comic)
+
+    Returns:
+        Tuple of (comic_id, {span name: {"count", "total_ms"}}); (None, {}) if none was traced
+    """
+    with _lock:
+        records = list(_recent)
+    if comic_id is None:
+        comic_id = next((r["comic_id"] for r in reversed(records) if r.get("comic_id")), None)
+        if comic_id is None:
+            return None, {}
+
+    stages = {}
+    for record in records:
+        if record.get("comic_id") == comic_id:
+            stage = stages.setdefault(record["name"], {"count": 0, "total_ms": 0.0})
+            stage["count"] += 1
+            stage["total_ms"] = round(stage["total_ms"] + record["duration_ms"], 3)
+    return comic_id, stages
+
+def reset():
+    """Clear the aggregated metrics and recent spans of this process"""
+    with _lock:
+        _metrics.clear()
+        _recent.clear()
+        del _pending[:]
+
+if __name__ == "__main__":
+    # Test
+    with trace(comic_id="demo"):
+        with span("demo.outer") as outer:
+            with span("demo.inner", cache_hit=False) as inner:
+                time.sleep(0.01)
+                inner.set(bytes=1024)
+            outer.set(cache_hit=True)
+    print(json.dumps(get_summary(), indent=2))
+    print(comic_breakdown())
+    print(render_prometheus())
+    flush()
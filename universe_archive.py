@@ -0,0 +1,148 @@
+"""
+Universe Archive Module
+Bulk import/export of stories and characters as JSONL archives, and batch deletes
+
+Usage:
+    python universe_archive.py export universe.jsonl.gz
+    python universe_archive.py import universe.jsonl.gz
+    python universe_archive.py import stories.jsonl --kind story
+    python universe_archive.py delete --stories ID [ID ...] --characters ID [ID ...]
+
+Archive lines are {"kind": "story" | "character", "record": {...}}; character
+records embed their reference images. Plain story or character dictionaries
+(one per line) are accepted too. Files ending in .gz are gzip-compressed.
+"""
+import argparse
+import time
+import config
+import data_store
+
+KIND_STORY = "story"
+KIND_CHARACTER = "character"
+
+def _kind_of(line: dict, default: str = None) -> tuple:
+    """Split an archive line into (kind, record)"""
+    if "kind" in line and "record" in line:
+        return line["kind"], line["record"]
+    if default:
+        return default, line
+    if "content" in line:
+        return KIND_STORY, line
+    return KIND_CHARACTER, line
+
+def export_universe(path: str, include_images: bool = True) -> dict:
+    """
+    Write every story and character to one JSONL archive.
+
+    Args:
+        path: Output file (.jsonl or .jsonl.gz)
+        include_images: Embed character reference images
+
+    Returns:
+        Counts {"story": n, "character": n}
+    """
+    import story_manager
+    import character_manager
+
+    counts = {KIND_STORY: 0, KIND_CHARACTER: 0}
+
+    def lines():
+        for story in story_manager.get_all_stories():
+            counts[KIND_STORY] += 1
+            yield {"kind": KIND_STORY, "record": story}
+        for char_data in character_manager.export_characters(include_images):
+            counts[KIND_CHARACTER] += 1
+            yield {"kind": KIND_CHARACTER, "record": char_data}
+
+    data_store.write_jsonl(path, lines())
+    print(f"[✓] Exported {counts[KIND_STORY]} stories and {counts[KIND_CHARACTER]} characters to {path}")
+    return counts
+
+def import_universe(path: str, kind: str = None, batch_size: int = None) -> dict:
+    """
+    Import a JSONL archive, writing stores and RAG in batches.
+
+    Stories are indexed in the calling thread so the index is complete
+    when this returns; if indexing fails, the saved stories stay queued for
+    the background indexer instead of failing the import.
+
+    Args:
+        path: Archive file (.jsonl or .jsonl.gz)
+        kind: Treat every plain line as this kind ("story" or "character")
+        batch_size: Records per batch (defaults to config.RAG_WRITE_BATCH_SIZE)
+
+    Returns:
+        Counts {"story": n, "character": n}
+    """
+    import story_manager
+    import character_manager
+
+    batch_size = batch_size or config.RAG_WRITE_BATCH_SIZE
+    importers = {
+        KIND_STORY: lambda records: story_manager.import_stories(records, index_now=True),
+        KIND_CHARACTER: character_manager.import_characters
+    }
+    pending = {KIND_STORY: [], KIND_CHARACTER: []}
+    counts = {KIND_STORY: 0, KIND_CHARACTER: 0}
+
+    def flush(record_kind):
+        if pending[record_kind]:
+            counts[record_kind] += len(importers[record_kind](pending[record_kind]))
+            pending[record_kind] = []
+
+    for line in data_store.iter_jsonl(path):
+        record_kind, record = _kind_of(line, kind)
+        if record_kind not in pending:
+            print(f"[WARN] Skipping unknown record kind: {record_kind}")
+            continue
+        pending[record_kind].append(record)
+        if len(pending[record_kind]) >= batch_size:
+            flush(record_kind)
+    for record_kind in pending:
+        flush(record_kind)
+    return counts
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import/export stories and characters")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = sub.add_parser("export", help="Write the whole universe to a JSONL archive")
+    export_parser.add_argument("path", help="Output file (.jsonl or .jsonl.gz)")
+    export_parser.add_argument("--no-images", action="store_true", help="Leave character images out")
+
+    import_parser = sub.add_parser("import", help="Import a JSONL archive")
+    import_parser.add_argument("path", help="Archive file (.jsonl or .jsonl.gz)")
+    import_parser.add_argument("--kind", choices=[KIND_STORY, KIND_CHARACTER], default=None,
+                               help="Kind of plain (unwrapped) records")
+    import_parser.add_argument("--batch-size", type=int, default=config.RAG_WRITE_BATCH_SIZE,
+                               help="Records per store/Chroma batch")
+
+    delete_parser = sub.add_parser("delete", help="Delete stories and characters by ID")
+    delete_parser.add_argument("--stories", nargs="*", default=[], help="Story IDs")
+    delete_parser.add_argument("--characters", nargs="*", default=[], help="Character IDs")
+
+    args = parser.parse_args()
+    start = time.perf_counter()
+
+    if args.command == "export":
+        export_universe(args.path, include_images=not args.no_images)
+    elif args.command == "import":
+        counts = import_universe(args.path, kind=args.kind, batch_size=args.batch_size)
+        print(f"[✓] Imported {counts[KIND_STORY]} stories and {counts[KIND_CHARACTER]} characters")
+    else:
+        import story_manager
+        import character_manager
+        if args.stories:
+            story_manager.delete_stories(args.stories, index_now=True)
+        if args.characters:
+            character_manager.delete_characters(args.characters)
+
+    if args.command != "export":
+        # Saved data is reported above; indexing problems are reported on their own
+        import story_indexer
+        waiting, failed = story_indexer.pending_ids(), story_indexer.failed_ids()
+        if waiting or failed:
+            print(f"[WARN] Search index not up to date: {len(waiting)} stor{'y' if len(waiting) == 1 else 'ies'} "
+                  f"still queued, {len(failed)} failed (the app's indexer retries queued ones)")
+
+    print(f"[*] Done in {time.perf_counter() - start:.1f}s")